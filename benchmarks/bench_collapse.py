@@ -0,0 +1,69 @@
+# benchmarks/bench_collapse.py
+"""Compare the vectorized ``collapse_replicates`` with the original loop.
+
+Usage: python -m benchmarks.bench_collapse [--wells 10000 100000] [--repeat 3]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synth import StudySpec, make_study, parsed_frame
+from ddct_pipeline.converters import collapse_replicates
+
+
+def legacy_collapse_replicates(df: pd.DataFrame) -> pd.DataFrame:
+    """The per-group Python loop ``collapse_replicates`` used to be."""
+    grouped = df.groupby(["sample_id", "gene", "source_file", "original_sample_id"])
+    collapsed = []
+
+    for (sid, gene, src, orig), group in grouped:
+        ct_vals = tuple(round(v, 2) for v in group["ct"].tolist())
+        ct_mean = round(np.mean(ct_vals), 2)
+
+        collapsed.append({
+            "Sample ID": sid,
+            "Gene": gene,
+            "Ct": ct_mean,
+            "Replicates": list(ct_vals),
+            "n": len(ct_vals),
+            "Original Sample ID": orig,
+            "Source File": src
+        })
+
+    return pd.DataFrame(collapsed)
+
+
+def make_wells(n_wells: int, seed: int = 0) -> pd.DataFrame:
+    spec = StudySpec(plates=max(1, round(n_wells / 384)), wells=384, targets=8, seed=seed)
+    return parsed_frame(make_study(spec))
+
+
+def _best_of(fn, df, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(df)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wells", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'wells':>8} {'groups':>8} {'legacy (s)':>11} {'vectorized (s)':>15} {'speed-up':>9}")
+    for n in args.wells:
+        df = make_wells(n)
+        t_old, old = _best_of(legacy_collapse_replicates, df, args.repeat)
+        t_new, new = _best_of(collapse_replicates, df, args.repeat)
+        pd.testing.assert_frame_equal(old, new)
+        print(f"{len(df):>8} {len(new):>8} {t_old:>11.3f} {t_new:>15.3f} {t_old / t_new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# benchmarks/bench_out_of_core.py
+"""Peak memory and time of in-memory vs partitioned (out-of-core) ΔΔCt.
+
+Usage: python -m benchmarks.bench_out_of_core [--plates 20 80] [--targets 24]
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synth import StudySpec, make_study, parsed_frame
+from ddct_pipeline.analysis import run_analysis
+from ddct_pipeline.converters import collapse_replicates
+from ddct_pipeline.dtypes import format_bytes
+from ddct_pipeline.partitioned import process_ddct_dataset, read_results, write_ct_dataset
+
+
+def _measure(fn):
+    """Result, seconds and traced peak bytes of ``fn()``."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plates", type=int, nargs="+", default=[20, 80])
+    parser.add_argument("--targets", type=int, default=24)
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>8} {'genes':>6} {'in-memory':>20} {'out-of-core':>20}")
+    for plates in args.plates:
+        study = make_study(StudySpec(plates=plates, targets=args.targets))
+        df_long = collapse_replicates(parsed_frame(study))
+        ct_df = df_long[["Sample ID", "Gene", "Ct"]]
+
+        expected, t_mem, peak_mem = _measure(lambda: run_analysis(ct_df, study.config, study.sample_metadata))
+        with tempfile.TemporaryDirectory() as tmp:
+            ct_path = write_ct_dataset(df_long, f"{tmp}/ct")
+            out_dir, t_ooc, peak_ooc = _measure(
+                lambda: process_ddct_dataset(ct_path, study.config, study.sample_metadata)
+            )
+            pd.testing.assert_frame_equal(read_results(out_dir), expected, check_exact=True)
+
+        print(f"{len(ct_df):>8} {ct_df['Gene'].nunique():>6} "
+              f"{t_mem:>8.2f}s {format_bytes(peak_mem):>10} {t_ooc:>8.2f}s {format_bytes(peak_ooc):>10}")
+
+
+if __name__ == "__main__":
+    main()
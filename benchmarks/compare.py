@@ -0,0 +1,47 @@
+# benchmarks/compare.py
+"""Compare two ``benchmarks.run`` result files stage by stage.
+
+Usage: python -m benchmarks.compare baseline.json candidate.json [--threshold 1.15]
+
+Exits with status 1 if any stage got slower than ``threshold`` × baseline.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def _index(path: Path) -> dict:
+    data = json.loads(path.read_text())
+    return {(r["scenario"], r["stage"]): r for r in data["results"]}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=1.15, help="slowdown ratio counted as a regression")
+    parser.add_argument("--metric", choices=["best", "median"], default="median")
+    args = parser.parse_args(argv)
+
+    base, cand = _index(args.baseline), _index(args.candidate)
+    regressions = 0
+    print(f"{'scenario':<28} {'stage':<24} {'baseline':>10} {'candidate':>10} {'ratio':>7}")
+    for key in sorted(base.keys() & cand.keys()):
+        old, new = base[key][args.metric], cand[key][args.metric]
+        ratio = new / old if old else float("inf")
+        flag = ""
+        if ratio > args.threshold:
+            flag = "  ← slower"
+            regressions += 1
+        print(f"{key[0]:<28} {key[1]:<24} {old:>10.4f} {new:>10.4f} {ratio:>6.2f}x{flag}")
+
+    for key in sorted(base.keys() ^ cand.keys()):
+        print(f"{key[0]:<28} {key[1]:<24} (only in {'baseline' if key in base else 'candidate'})")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
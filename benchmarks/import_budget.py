@@ -0,0 +1,97 @@
+# benchmarks/import_budget.py
+"""Cold-start import budget for the Streamlit app, measured with ``-X importtime``.
+
+Usage: python -m benchmarks.import_budget [--runs 3] [--scale 1.0]
+
+Each target is imported in a fresh interpreter after ``streamlit`` itself, so
+the reported cost is what the app adds on top of Streamlit. Exits with status
+1 if a target exceeds its budget or pulls in a heavy library at startup.
+"""
+
+import argparse
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY = ("pandas", "numpy", "pyarrow", "plotly")
+
+
+@dataclass
+class Target:
+    module: str
+    budget_ms: float
+    forbidden: tuple[str, ...] = HEAVY
+
+
+# Page modules call run() on import, so their cost includes rendering the
+# page in bare mode. Pages that need pandas/plotly import them themselves.
+TARGETS = [
+    Target("streamlit_app", 60),
+    Target("interface.home", 150),
+]
+
+
+def parse_importtime(stderr: str, after: str = "streamlit") -> dict[str, tuple[int, int]]:
+    """Map module → (self µs, cumulative µs) for modules imported after ``after``.
+
+    importtime prints children before their parent, so everything below the
+    top-level ``after`` line was imported by the statements that follow it.
+    """
+    modules, seen_baseline = {}, False
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not seen_baseline:
+            seen_baseline = name.strip() == after and not name[1:].startswith(" ")
+            continue
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure(module: str) -> dict[str, tuple[int, int]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import streamlit; import {module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def check(target: Target, runs: int, scale: float) -> bool:
+    best, modules = None, {}
+    for _ in range(runs):
+        found = measure(target.module)
+        ms = found.get(target.module, (0, 0))[1] / 1000
+        if best is None or ms < best:
+            best, modules = ms, found
+
+    heavy = sorted({m.split(".")[0] for m in modules} & set(target.forbidden))
+    budget = target.budget_ms * scale
+    ok = best <= budget and not heavy
+    print(f"{target.module:<24} {best:>8.1f} ms  budget {budget:>6.0f} ms  {'ok' if ok else 'FAIL'}")
+    if heavy:
+        print(f"  imports {', '.join(heavy)} at startup")
+    if not ok:
+        slowest = sorted(modules.items(), key=lambda kv: kv[1][0], reverse=True)[:5]
+        for name, (self_us, _) in slowest:
+            print(f"  {self_us / 1000:>8.1f} ms  {name}")
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check cold-start import cost against a budget.")
+    parser.add_argument("--runs", type=int, default=3, help="best of N fresh interpreters")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow CI machines)")
+    args = parser.parse_args(argv)
+
+    results = [check(t, args.runs, args.scale) for t in TARGETS]
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# benchmarks/run.py
+"""Time each pipeline stage on synthetic studies.
+
+Usage:
+    python -m benchmarks.run [--preset default] [--repeat 3] [-o results.json]
+    python -m benchmarks.compare baseline.json results.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synth import StudySpec, make_study, parsed_frame, write_workbooks
+from ddct_pipeline.analysis import prepare_ct_frame
+from ddct_pipeline.converters import collapse_replicates, df_to_rows, parse_excel_ct_file
+from ddct_pipeline.processor import process_ddct
+from ddct_pipeline.validators import validate_rows
+
+PRESETS = {
+    "smoke": [
+        StudySpec(plates=1, wells=96, targets=2, grouping={"Treatment": 2}),
+    ],
+    "default": [
+        StudySpec(plates=1, wells=96, targets=4),
+        StudySpec(plates=10, wells=384, targets=24),
+        StudySpec(plates=50, wells=384, targets=96, grouping={"Treatment": 4, "Sex": 2, "Timepoint": 3}),
+    ],
+    "full": [
+        StudySpec(plates=1, wells=96, targets=4),
+        StudySpec(plates=10, wells=384, targets=24),
+        StudySpec(plates=50, wells=384, targets=96, grouping={"Treatment": 4, "Sex": 2, "Timepoint": 3}),
+        StudySpec(plates=200, wells=384, targets=500, grouping={"Treatment": 4, "Sex": 2, "Timepoint": 3, "Site": 5}),
+    ],
+}
+
+
+def _time(fn, repeat: int):
+    times, out = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return times, out
+
+
+def _record(scenario: StudySpec, stage: str, times: list[float], rows_in: int, rows_out: int, **extra) -> dict:
+    return {
+        "scenario": scenario.label,
+        "params": {**scenario.__dict__},
+        "stage": stage,
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "times": times,
+        "best": min(times),
+        "median": statistics.median(times),
+        **extra,
+    }
+
+
+def _named_buffer(path: Path) -> BytesIO:
+    buf = BytesIO(path.read_bytes())
+    buf.name = path.name
+    return buf
+
+
+def bench_scenario(spec: StudySpec, repeat: int, parse_plates: int) -> list[dict]:
+    from interface.plotting.plot_ddct import build_ddct_plot  # plotly only when benchmarking plots
+
+    study = make_study(spec)
+    records = []
+
+    # parse_excel_ct_file: a bounded number of workbooks, reported per file
+    with tempfile.TemporaryDirectory() as tmp:
+        n_files = min(parse_plates, spec.plates)
+        sub = study.wells[study.wells["plate"] < n_files]
+        paths = write_workbooks(replace(study, wells=sub), Path(tmp))
+        buffers = [_named_buffer(p) for p in paths]
+        times, frames = _time(lambda: [parse_excel_ct_file(b) for b in buffers], repeat)
+        rows_out = sum(len(f) for f in frames)
+        records.append(_record(spec, "parse_excel_ct_file", [t / n_files for t in times], len(sub), rows_out,
+                               files=n_files, unit="per file"))
+
+    wells = parsed_frame(study)
+    times, collapsed = _time(lambda: collapse_replicates(wells), repeat)
+    records.append(_record(spec, "collapse_replicates", times, len(wells), len(collapsed)))
+
+    ct_frame = prepare_ct_frame(collapsed[["Sample ID", "Gene", "Ct"]], study.config["grouping_variables"],
+                                study.sample_metadata)
+    times, rows = _time(lambda: df_to_rows(ct_frame), repeat)
+    records.append(_record(spec, "df_to_rows", times, len(ct_frame), len(rows)))
+
+    times, results = _time(lambda: process_ddct(rows, study.config), repeat)
+    records.append(_record(spec, "process_ddct", times, len(rows), len(results)))
+
+    times, errors = _time(lambda: validate_rows(rows, study.config), repeat)
+    records.append(_record(spec, "validate_rows", times, len(rows), len(errors)))
+
+    group_by = [study.config["grouping_variables"][0].name]
+    for kind in ("bar", "box"):
+        times, _ = _time(lambda: build_ddct_plot(results, genes=study.config["genes"], group_by=group_by,
+                                                 kind=kind, y_scale="Fold Change"), repeat)
+        records.append(_record(spec, f"build_ddct_plot[{kind}]", times, len(results), 0))
+
+    return records
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ΔΔCt pipeline stages on synthetic studies.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="default")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--parse-plates", type=int, default=10, help="workbooks to parse per scenario")
+    parser.add_argument("-o", "--output", type=Path, help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    records = []
+    print(f"{'scenario':<28} {'stage':<24} {'rows in':>9} {'best (s)':>10} {'median (s)':>11}")
+    for spec in PRESETS[args.preset]:
+        for rec in bench_scenario(spec, args.repeat, args.parse_plates):
+            records.append(rec)
+            print(f"{rec['scenario']:<28} {rec['stage']:<24} {rec['rows_in']:>9} {rec['best']:>10.4f} {rec['median']:>11.4f}")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps({"environment": environment(), "preset": args.preset,
+                                           "results": records}, indent=2))
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# benchmarks/synth.py
+"""Seeded synthetic qPCR studies shaped like QuantStudio exports."""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ddct_pipeline.types import GroupingVariable
+
+WELL_ROWS = {96: 8, 384: 16}
+
+RESULTS_PREAMBLE = [
+    ("Block Type", "384-Well Block"),
+    ("Calibration Background is expired ", "No"),
+    ("Chemistry", "SYBR_GREEN"),
+    ("Experiment Barcode", ""),
+    ("Experiment Comment", ""),
+    ("Experiment File Name", "synthetic.eds"),
+    ("Experiment Name", "synthetic"),
+    ("Experiment Run End Time", "2024-01-01 00:00:00 PM PST"),
+    ("Experiment Type", "Comparative Cт (ΔΔCт)"),
+    ("Instrument Name", "QS5"),
+    ("Instrument Serial Number", "000000000"),
+    ("Instrument Type", "QuantStudio™ 5 System"),
+    ("Passive Reference", "ROX"),
+    ("Quantification Cycle Method", "Ct"),
+    ("Signal Smoothing On", "true"),
+    ("Stage/ Cycle where Analysis is performed", "Stage 2, Step 2"),
+    ("User Name", ""),
+]
+
+RESULTS_COLUMNS = [
+    "Well", "Well Position", "Omit", "Sample Name", "Target Name", "Task",
+    "Reporter", "Quencher", "CT", "Ct Mean", "Ct SD", "Amp Status",
+]
+
+
+@dataclass
+class StudySpec:
+    plates: int = 1
+    wells: int = 384
+    targets: int = 8
+    replicates: int = 3
+    grouping: dict[str, int] = field(default_factory=lambda: {"Treatment": 3, "Sex": 2})
+    undetermined_rate: float = 0.02
+    seed: int = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.plates}x{self.wells}w_{self.targets}t_{len(self.grouping)}v"
+
+
+@dataclass
+class Study:
+    spec: StudySpec
+    wells: pd.DataFrame             # one row per well, parse_excel_ct_file columns + well/plate
+    sample_metadata: dict[str, dict[str, str]]
+    config: dict
+
+    @property
+    def reference_genes(self) -> list[str]:
+        return self.config["reference_genes"]
+
+
+def _well_positions(wells: int) -> np.ndarray:
+    rows = WELL_ROWS[wells]
+    cols = wells // rows
+    idx = np.arange(wells)
+    letters = np.array([chr(ord("A") + r) for r in range(rows)])
+    return np.char.add(letters[idx // cols], (idx % cols + 1).astype(str))
+
+
+def make_study(spec: StudySpec) -> Study:
+    """Generate a study: wells, per-sample metadata and a matching config.
+
+    Wells are filled plate by plate with ``replicates`` consecutive wells per
+    (sample, target) slot; every sample is measured for every target, so large
+    panels spread one sample across several plates.
+    """
+    rng = np.random.default_rng(spec.seed)
+    n_wells = spec.plates * spec.wells
+    n_slots = n_wells // spec.replicates
+    n_samples = max(1, n_slots // spec.targets)
+    n_slots = n_samples * spec.targets
+
+    slot = np.repeat(np.arange(n_slots), spec.replicates)
+    well_idx = np.arange(len(slot))
+    sample = slot // spec.targets
+    target = slot % spec.targets
+    plate = well_idx // spec.wells
+
+    sample_names = np.array([f"S{i:05d}" for i in range(n_samples)])
+    target_names = np.array(["REF1"] + [f"T{i:03d}" for i in range(1, spec.targets)])
+    levels = {
+        name: [f"{name[:3].lower()}{j}" for j in range(k)]
+        for name, k in spec.grouping.items()
+    }
+    assignments = {name: rng.integers(0, len(vals), n_samples) for name, vals in levels.items()}
+
+    # Ct = target baseline + sample loading + group effect on targets + noise
+    target_base = rng.uniform(18, 30, spec.targets)
+    sample_load = rng.normal(0, 0.8, n_samples)
+    effect = np.zeros(len(slot))
+    for name, assign in assignments.items():
+        per_level = rng.normal(0, 1.0, (len(levels[name]), spec.targets))
+        per_level[:, 0] = 0  # reference gene is stable
+        effect += per_level[assign[sample], target]
+    ct = target_base[target] + sample_load[sample] + effect + rng.normal(0, 0.15, len(slot))
+    ct[rng.random(len(slot)) < spec.undetermined_rate] = np.nan
+
+    wells = pd.DataFrame({
+        "sample_id": sample_names[sample],
+        "gene": target_names[target],
+        "ct": ct,
+        "well": well_idx % spec.wells + 1,
+        "plate": plate,
+        "source_file": np.char.add(np.char.add("plate_", np.char.zfill(plate.astype(str), 3)), ".xlsx"),
+    })
+    wells["original_sample_id"] = wells["sample_id"]
+
+    sample_metadata = {
+        sid: {name: levels[name][assignments[name][i]] for name in levels}
+        for i, sid in enumerate(sample_names)
+    }
+    grouping_vars = [GroupingVariable(name=name, values=["N/A"] + vals) for name, vals in levels.items()]
+    config = {
+        "genes": list(target_names),
+        "reference_genes": ["REF1"],
+        "grouping_variables": grouping_vars,
+        "reference_grouping": grouping_vars[0].name,
+        "reference_condition": levels[grouping_vars[0].name][0],
+        "groups": {gv.name: gv.values for gv in grouping_vars},
+    }
+    return Study(spec=spec, wells=wells, sample_metadata=sample_metadata, config=config)
+
+
+def parsed_frame(study: Study) -> pd.DataFrame:
+    """What ``parse_excel_ct_file`` returns for every plate, concatenated."""
+    df = study.wells.dropna(subset=["ct"])
+    return df[["sample_id", "gene", "ct", "source_file", "original_sample_id"]].reset_index(drop=True)
+
+
+def results_sheet(plate_wells: pd.DataFrame, wells: int) -> pd.DataFrame:
+    """Lay out one plate as a QuantStudio "Results" sheet (preamble, blank row, table)."""
+    ct = plate_wells["ct"].to_numpy()
+    table = pd.DataFrame({
+        "Well": plate_wells["well"].to_numpy(),
+        "Well Position": _well_positions(wells)[plate_wells["well"].to_numpy() - 1],
+        "Omit": False,
+        "Sample Name": plate_wells["sample_id"].to_numpy(),
+        "Target Name": plate_wells["gene"].to_numpy(),
+        "Task": "UNKNOWN",
+        "Reporter": "SYBR",
+        "Quencher": "None",
+        "CT": np.where(np.isnan(ct), "Undetermined", np.round(ct, 3).astype(object)),
+        "Ct Mean": np.nan,
+        "Ct SD": np.nan,
+        "Amp Status": np.where(np.isnan(ct), "No Amp", "Amp"),
+    }, columns=RESULTS_COLUMNS)
+
+    width = len(RESULTS_COLUMNS)
+    preamble = [[k, v] + [None] * (width - 2) for k, v in RESULTS_PREAMBLE]
+    block = preamble + [[None] * width, RESULTS_COLUMNS] + table.to_numpy(dtype=object).tolist()
+    return pd.DataFrame(block)
+
+
+def write_workbooks(study: Study, directory: Path) -> list[Path]:
+    """Write one .xlsx per plate; returns the paths in plate order."""
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for plate, plate_wells in study.wells.groupby("plate", sort=True):
+        path = directory / f"plate_{plate:03d}.xlsx"
+        sheet = results_sheet(plate_wells, study.spec.wells)
+        with pd.ExcelWriter(path) as writer:
+            sheet.to_excel(writer, sheet_name="Results", header=False, index=False)
+        paths.append(path)
+    return paths
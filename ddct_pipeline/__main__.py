@@ -0,0 +1,7 @@
+# ddct_pipeline/__main__.py
+
+import sys
+
+from ddct_pipeline.cli import main
+
+sys.exit(main())
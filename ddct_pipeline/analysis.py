@@ -0,0 +1,39 @@
+# ddct_pipeline/analysis.py
+
+from typing import Optional
+
+import pandas as pd
+
+from ddct_pipeline.converters import df_to_rows
+from ddct_pipeline.metadata import attach_metadata
+from ddct_pipeline.processor import process_contrasts, process_ddct
+from ddct_pipeline.types import GroupingVariable
+
+# Display column names used in session state → pipeline column names
+CT_COLUMNS = {"Sample ID": "sample_id", "Gene": "gene", "Ct": "ct"}
+
+
+def prepare_ct_frame(
+    ct_df: pd.DataFrame,
+    grouping_variables: list[GroupingVariable],
+    sample_metadata: Optional[dict[str, dict[str, str]]] = None
+) -> pd.DataFrame:
+    """Turn the session Ct table ("Sample ID"/"Gene"/"Ct") into pipeline input."""
+    df = ct_df.rename(columns=CT_COLUMNS)
+    df["ct"] = pd.to_numeric(df["ct"], errors="coerce")
+    return attach_metadata(df, grouping_variables, sample_metadata)
+
+
+def run_analysis(
+    ct_df: pd.DataFrame,
+    config: dict,
+    sample_metadata: Optional[dict[str, dict[str, str]]] = None
+) -> pd.DataFrame:
+    """Metadata merge → ``CtRow`` conversion → ΔΔCt, as run by the app and CLI.
+
+    With ``config["contrasts"]`` set, returns the long multi-contrast table.
+    """
+    df = prepare_ct_frame(ct_df, config.get("grouping_variables", []), sample_metadata)
+    if config.get("contrasts"):
+        return process_contrasts(df_to_rows(df), config, config["contrasts"])
+    return process_ddct(df_to_rows(df), config)
@@ -0,0 +1,130 @@
+# ddct_pipeline/bootstrap.py
+"""Percentile bootstrap confidence intervals for group means (e.g. ΔΔCt).
+
+Biological replicates are resampled with replacement within each group.
+Groups of equal size are resampled together as a (resamples × groups × n)
+index array, so a block of resamples is a handful of array operations
+regardless of the number of groups.
+
+Resamples are split into fixed blocks, each with its own child seed of
+``SeedSequence(seed)``, so results depend only on the seed, never on how
+many workers ran the blocks.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ddct_pipeline.instrumentation import stage
+from ddct_pipeline.types import BootstrapSettings
+
+BLOCK_SIZE = 1000            # resamples per seeded block
+MAX_BLOCK_ELEMENTS = 4_000_000  # cap on drawn indices held at once
+POOL_MIN_DRAWS = 200_000_000    # below this many draws a pool costs more than it saves
+DEFAULT_MAX_WORKERS = 8
+
+Buckets = list[tuple[np.ndarray, np.ndarray]]  # (group indices, values as groups × n)
+
+
+def _size_buckets(values: np.ndarray, group_ids: np.ndarray) -> Buckets:
+    """Group values into one (groups × n) matrix per distinct group size."""
+    keep = ~np.isnan(values) & (group_ids >= 0)
+    values, group_ids = values[keep], group_ids[keep]
+    order = np.argsort(group_ids, kind="stable")
+    values, group_ids = values[order], group_ids[order]
+
+    starts = np.flatnonzero(np.r_[True, group_ids[1:] != group_ids[:-1]]) if len(group_ids) else np.empty(0, dtype=int)
+    counts = np.diff(np.r_[starts, len(group_ids)])
+    return [
+        (group_ids[starts[counts == n]], values[starts[counts == n, None] + np.arange(n)])
+        for n in np.unique(counts)
+    ]
+
+
+def _resample_block(buckets: Buckets, n_groups: int, size: int, seed: np.random.SeedSequence) -> np.ndarray:
+    """Bootstrap means of every group for ``size`` resamples, shape (size, n_groups)."""
+    rng = np.random.default_rng(seed)
+    means = np.full((size, n_groups), np.nan)
+    for groups, matrix in buckets:
+        n_members = matrix.shape[1]
+        step = max(1, MAX_BLOCK_ELEMENTS // (size * n_members))
+        for lo in range(0, len(groups), step):
+            part = matrix[lo:lo + step]
+            draws = rng.integers(0, n_members, size=(size, len(part), n_members))
+            means[:, groups[lo:lo + step]] = np.take_along_axis(part[None], draws, axis=2).mean(axis=2)
+    return means
+
+
+def _worker_count(settings: BootstrapSettings, n_blocks: int, draws: int) -> int:
+    if settings.max_workers is not None:
+        return max(1, min(settings.max_workers, n_blocks))
+    if draws < POOL_MIN_DRAWS:
+        return 1
+    return max(1, min(DEFAULT_MAX_WORKERS, os.cpu_count() or 1, n_blocks))
+
+
+def bootstrap_means(
+    values,
+    group_ids,
+    n_groups: Optional[int] = None,
+    settings: Optional[BootstrapSettings] = None
+) -> np.ndarray:
+    """Resampled group means, shape (resamples, n_groups); NaN for empty groups.
+
+    ``group_ids`` are integer codes (e.g. ``GroupBy.ngroup()``); negative
+    codes and NaN values are ignored.
+    """
+    settings = settings or BootstrapSettings()
+    values = np.asarray(values, dtype=float)
+    group_ids = np.asarray(group_ids, dtype=np.int64)
+    if n_groups is None:
+        n_groups = int(group_ids.max()) + 1 if len(group_ids) else 0
+
+    buckets = _size_buckets(values, group_ids)
+    sizes = [min(BLOCK_SIZE, settings.resamples - lo) for lo in range(0, settings.resamples, BLOCK_SIZE)]
+    seeds = np.random.SeedSequence(settings.seed).spawn(len(sizes))
+    draws = settings.resamples * sum(m.size for _, m in buckets)
+
+    workers = _worker_count(settings, len(sizes), draws)
+    if workers == 1:
+        blocks = [_resample_block(buckets, n_groups, size, seed) for size, seed in zip(sizes, seeds)]
+    else:
+        # Same spawn-only policy as the parse pool (Streamlit is multi-threaded).
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            blocks = list(pool.map(
+                _resample_block, [buckets] * len(sizes), [n_groups] * len(sizes), sizes, seeds
+            ))
+    return np.concatenate(blocks) if blocks else np.empty((0, n_groups))
+
+
+def bootstrap_ci(
+    values,
+    group_ids,
+    n_groups: Optional[int] = None,
+    settings: Optional[BootstrapSettings] = None
+) -> pd.DataFrame:
+    """Per-group mean, percentile CI bounds and n, one row per group code."""
+    settings = settings or BootstrapSettings()
+    values = np.asarray(values, dtype=float)
+    group_ids = np.asarray(group_ids, dtype=np.int64)
+    if n_groups is None:
+        n_groups = int(group_ids.max()) + 1 if len(group_ids) else 0
+
+    with stage("bootstrap_ci", values) as timing:
+        keep = ~np.isnan(values) & (group_ids >= 0)
+        n = np.bincount(group_ids[keep], minlength=n_groups)
+        sums = np.bincount(group_ids[keep], weights=values[keep], minlength=n_groups)
+        mean = np.divide(sums, n, out=np.full(n_groups, np.nan), where=n > 0)
+
+        means = bootstrap_means(values, group_ids, n_groups, settings)
+        alpha = (1 - settings.confidence) / 2
+        low, high = np.full(n_groups, np.nan), np.full(n_groups, np.nan)
+        filled = n > 0
+        if len(means) and filled.any():
+            low[filled], high[filled] = np.quantile(means[:, filled], [alpha, 1 - alpha], axis=0)
+        return timing.out(pd.DataFrame({"mean": mean, "ci_low": low, "ci_high": high, "n": n}))
@@ -0,0 +1,208 @@
+# ddct_pipeline/cache.py
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+import pandas as pd
+
+from ddct_pipeline.converters import PARSER_VERSION, parse_excel_ct_file
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("DDCT_CACHE_DIR", Path.home() / ".cache" / "ddct_pipeline"))
+DEFAULT_MEMORY_ENTRIES = 64
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+DISK_SUFFIX = ".parquet"
+
+
+def read_file_bytes(file) -> bytes:
+    """Return the raw content of an uploaded file, path or binary handle."""
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    if isinstance(file, (str, os.PathLike)):
+        return Path(file).read_bytes()
+    pos = file.tell()
+    data = file.read()
+    file.seek(pos)
+    return data
+
+
+def with_source_name(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """Re-stamp ``source_file`` on a cached parse uploaded under another name."""
+    if (df["source_file"] != name).any():
+        df["source_file"] = name
+    return df
+
+
+class ParseCache:
+    """Two-tier (memory + disk) LRU cache for parsed instrument files.
+
+    Entries are content-addressed: the key is a hash of the file bytes and
+    ``PARSER_VERSION``, so the same export uploaded again under any name hits
+    the cache and a parser change invalidates everything at once. The disk
+    tier is bounded by total size and evicts least-recently-used entries.
+
+    Disk entries are Parquet, never pickles, so a directory shared with
+    colleagues holds data only; an entry that cannot be read is a miss.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = DEFAULT_CACHE_DIR,
+        max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        max_disk_bytes: int = DEFAULT_DISK_BYTES,
+    ):
+        self.directory = Path(directory) if directory else None
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, pd.DataFrame] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if self.directory is not None:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+            except OSError:
+                self.directory = None  # read-only home etc. → memory tier only
+
+    # --- Keys ---
+
+    @staticmethod
+    def key_for(*parts: bytes | str) -> str:
+        h = hashlib.sha256(PARSER_VERSION.encode())
+        for part in parts:
+            h.update(b"\0")
+            h.update(part.encode() if isinstance(part, str) else part)
+        return h.hexdigest()
+
+    # --- Lookup / store ---
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self._memory[key].copy()
+
+        df = self._disk_get(key)
+        with self._lock:
+            if df is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            self._memory_put(key, df)
+        return df.copy()
+
+    def put(self, key: str, df: pd.DataFrame):
+        with self._lock:
+            self._memory_put(key, df)
+        self._disk_put(key, df)
+
+    def get_or_compute(self, key: str, compute: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        df = self.get(key)
+        if df is None:
+            df = compute()
+            self.put(key, df)
+        return df
+
+    def parse_key(self, data: bytes, **kwargs) -> str:
+        return self.key_for("parse", repr(sorted(kwargs.items())), data)
+
+    def parse(self, file, **kwargs) -> pd.DataFrame:
+        """Cached ``parse_excel_ct_file``; ``source_file`` follows the current upload name."""
+        key = self.parse_key(read_file_bytes(file), **kwargs)
+        df = self.get_or_compute(key, lambda: parse_excel_ct_file(file, **kwargs))
+        return with_source_name(df, getattr(file, "name", str(file)))
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.directory is not None:
+            for path in self.directory.glob(f"*{DISK_SUFFIX}"):
+                path.unlink(missing_ok=True)
+
+    @property
+    def hits(self) -> int:
+        return self.stats["memory_hits"] + self.stats["disk_hits"]
+
+    @property
+    def misses(self) -> int:
+        return self.stats["misses"]
+
+    # --- Tiers ---
+
+    def _memory_put(self, key: str, df: pd.DataFrame):
+        self._memory[key] = df
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _disk_path(self, key: str) -> Path:
+        return self.directory / f"{key}{DISK_SUFFIX}"
+
+    def _disk_get(self, key: str) -> Optional[pd.DataFrame]:
+        if self.directory is None:
+            return None
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = self._disk_path(key)
+        try:
+            table = pq.read_table(path)
+            df = table.to_pandas()
+            # List cells (e.g. "Replicates") come back as arrays; restore plain lists.
+            for field in table.schema:
+                if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+                    df[field.name] = pd.Series(table.column(field.name).to_pylist(), index=df.index, dtype=object)
+            os.utime(path)  # mtime doubles as the LRU timestamp
+            return df
+        except Exception:  # missing, truncated, foreign or written by another version: a miss
+            return None
+
+    def _disk_put(self, key: str, df: pd.DataFrame):
+        if self.directory is None:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = self._disk_path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            pq.write_table(pa.Table.from_pandas(df), tmp)
+            os.replace(tmp, path)
+        except (OSError, pa.ArrowException, TypeError, ValueError):  # e.g. mixed-type columns: memory tier only
+            tmp.unlink(missing_ok=True)
+            return
+        self._disk_evict()
+
+    def _disk_evict(self):
+        entries = []
+        for path in self.directory.glob(f"*{DISK_SUFFIX}"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            with self._lock:
+                self.stats["evictions"] += 1
+
+
+_default_cache: Optional[ParseCache] = None
+
+
+def get_default_cache() -> ParseCache:
+    """Process-wide cache shared by every session of the app."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ParseCache()
+    return _default_cache
@@ -0,0 +1,284 @@
+# ddct_pipeline/cli.py
+"""Headless batch ΔΔCt analysis.
+
+    python -m ddct_pipeline EXPORTS... --config study.json [-o results/] [-j 8]
+
+EXPORTS are instrument workbooks, directories containing them, or glob
+patterns. The config file is JSON::
+
+    {
+      "reference_genes": ["GAPDH"],
+      "reference_condition": "control",
+      "reference_grouping": "Treatment",          # optional, defaults to the first variable
+      "grouping_variables": {"Treatment": ["control", "treated"]},
+      "sample_metadata": "samples.csv",            # CSV/TSV/Excel keyed by "Sample ID",
+                                                   # path relative to the config file
+      "contrasts": [                               # optional: several baselines in one run
+        {"grouping": "Treatment", "condition": "control"},
+        {"grouping": "Treatment", "condition": "treated", "genes": ["IL6"]}
+      ]
+    }
+
+``--call-ct`` ignores the instruments' Ct column and re-calls Ct from the
+"Amplification Data" sheets with one baseline and threshold for all runs.
+``--melt-qc`` reads the "Melt Curve Raw Data" sheets, writes per-well Tm and
+peak counts to ``melt_qc.csv`` and drops flagged wells before collapsing.
+``--replicate-qc`` drops technical replicates far from their group median
+(and, with ``--outlier-test``, Grubbs/Dixon outliers) and lists them in
+``replicate_outliers.csv``.
+``--out-of-core DIR`` stores the collapsed Ct table in DIR as a Parquet
+dataset partitioned by gene and run and computes ΔΔCt one gene at a time;
+``ddct_results.csv`` then lists the same rows grouped by gene. DIR's
+``ct``, ``delta`` and ``ddct`` subfolders must be new, empty or from an
+earlier out-of-core run.
+
+Writes ``ct_replicates.csv`` (collapsed Ct table) and ``ddct_results.csv``
+(long format with a ``contrast`` column when contrasts are given);
+``--timings`` additionally dumps per-stage timings as JSON lines.
+"""
+
+import argparse
+import glob
+import json
+import sys
+from pathlib import Path
+from typing import Optional, Union
+
+import pandas as pd
+
+from ddct_pipeline.analysis import prepare_ct_frame
+from ddct_pipeline.cache import ParseCache
+from ddct_pipeline.converters import collapse_replicates, df_to_rows
+from ddct_pipeline.ct_calling import CT_METHODS, call_ct_frame
+from ddct_pipeline.dtypes import float32_ct, format_bytes, memory_report
+from ddct_pipeline.instrumentation import collect
+from ddct_pipeline.melt import attach_melt_qc, melt_qc
+from ddct_pipeline.metadata import SampleMetadata, match_samples, read_metadata_sheet, validate_metadata_sheet
+from ddct_pipeline.parallel import concat_results, parse_files_parallel
+from ddct_pipeline.partitioned import (
+    check_writable,
+    iter_results,
+    process_ddct_dataset,
+    validate_dataset,
+    write_ct_dataset
+)
+from ddct_pipeline.processor import process_contrasts, process_ddct
+from ddct_pipeline.replicate_qc import QC_TESTS, flag_replicate_outliers
+from ddct_pipeline.types import Contrast, CtCallSettings, GroupingVariable, ReplicateQCSettings
+from ddct_pipeline.validators import validate_rows
+
+EXPORT_SUFFIXES = {".xls", ".xlsx"}
+
+
+def find_exports(inputs: list[str]) -> list[Path]:
+    """Expand directories and glob patterns into a sorted, de-duplicated file list."""
+    found = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            candidates = path.rglob("*")
+        elif path.exists():
+            candidates = [path]
+        else:
+            candidates = (Path(p) for p in glob.glob(item, recursive=True))
+        found.update(
+            p.resolve() for p in candidates
+            if p.is_file() and p.suffix.lower() in EXPORT_SUFFIXES and not p.name.startswith("~$")
+        )
+    return sorted(found)
+
+
+def load_config(path: Path) -> tuple[dict, Union[SampleMetadata, pd.DataFrame]]:
+    """Read a study config file into an ``ExperimentConfig`` plus sample metadata.
+
+    A metadata sheet is returned as a frame indexed by sample ID.
+    """
+    raw = json.loads(path.read_text())
+
+    variables = raw.get("grouping_variables", {})
+    if isinstance(variables, dict):
+        grouping_vars = [GroupingVariable(name=k, values=list(v)) for k, v in variables.items()]
+    else:
+        grouping_vars = [GroupingVariable(**gv) for gv in variables]
+
+    # process_ddct resolves the reference condition in the first grouping variable
+    ref_grouping = raw.get("reference_grouping") or (grouping_vars[0].name if grouping_vars else "")
+    grouping_vars.sort(key=lambda gv: gv.name != ref_grouping)
+
+    metadata = raw.get("sample_metadata") or {}
+    if isinstance(metadata, str):
+        metadata = read_metadata_sheet(path.parent / metadata)
+
+    config = {
+        "genes": raw.get("genes", []),
+        "reference_genes": raw.get("reference_genes", []),
+        "grouping_variables": grouping_vars,
+        "reference_grouping": ref_grouping,
+        "reference_condition": raw.get("reference_condition", ""),
+        "groups": {gv.name: gv.values for gv in grouping_vars},
+        "contrasts": [
+            Contrast(grouping=c.get("grouping", ref_grouping), condition=c["condition"], genes=c.get("genes"))
+            for c in raw.get("contrasts", [])
+        ],
+    }
+    return config, metadata
+
+
+def _log(msg: str):
+    print(msg, file=sys.stderr)
+
+
+def _preview(items: list[str], limit: int = 10) -> str:
+    more = f" (+{len(items) - limit} more)" if len(items) > limit else ""
+    return ", ".join(items[:limit]) + more
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m ddct_pipeline",
+        description="Batch ΔΔCt analysis of instrument exports."
+    )
+    parser.add_argument("inputs", nargs="+", help="export files, directories or glob patterns")
+    parser.add_argument("-c", "--config", type=Path, required=True, help="study config (JSON)")
+    parser.add_argument("-o", "--output-dir", type=Path, default=Path("."), help="where to write result tables")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="parser processes (default: min(8, CPUs))")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the parse cache")
+    parser.add_argument("--timings", metavar="PATH", help="append per-stage timings as JSON lines (- for stderr)")
+    parser.add_argument("--track-memory", action="store_true", help="include peak memory in --timings (slower)")
+    parser.add_argument("--float32", action="store_true", help="hold Ct and derived values as float32")
+    parser.add_argument("--call-ct", choices=CT_METHODS, help="re-call Ct from amplification curves")
+    parser.add_argument("--threshold", type=float, help="Ct threshold on baseline-subtracted signal (default: auto)")
+    parser.add_argument("--baseline", type=int, nargs=2, metavar=("START", "END"), default=(3, 15),
+                        help="baseline cycles for --call-ct (default: 3 15)")
+    parser.add_argument("--melt-qc", action="store_true", help="exclude wells flagged by melt-curve QC")
+    parser.add_argument("--replicate-qc", action="store_true", help="exclude outlying technical replicates")
+    parser.add_argument("--outlier-test", choices=QC_TESTS, default="none", help="test for --replicate-qc")
+    parser.add_argument("--out-of-core", type=Path, metavar="DIR",
+                        help="stream ΔΔCt one gene at a time through a Parquet dataset in DIR")
+    args = parser.parse_args(argv)
+
+    with float32_ct(args.float32):
+        if not args.timings:
+            return _run(args)
+
+        with collect(track_memory=args.track_memory) as timings:
+            status = _run(args)
+    timings.write_jsonl(args.timings)
+    return status
+
+
+def _run(args: argparse.Namespace) -> int:
+
+    files = find_exports(args.inputs)
+    if not files:
+        _log("No export files found.")
+        return 2
+
+    config, sample_metadata = load_config(args.config)
+    cache = None if args.no_cache else ParseCache()
+
+    results = []
+    curves = args.call_ct is not None
+    parse_options = {"curves": curves, "include_well": args.melt_qc}
+    for result in parse_files_parallel(files, max_workers=args.workers, cache=cache, **parse_options):
+        results.append(result)
+        if result.error is None:
+            _log(f"✅ {result.name}: {len(result.df)} rows parsed.")
+        else:
+            _log(f"❌ {result.name}: {result.error}")
+
+    combined = concat_results(results)
+    if combined is None:
+        _log("No files could be parsed.")
+        return 1
+
+    if curves:
+        settings = CtCallSettings(
+            method=args.call_ct,
+            threshold=args.threshold,
+            baseline_start=args.baseline[0],
+            baseline_end=args.baseline[1]
+        )
+        combined, threshold = call_ct_frame(combined, settings, include_well=args.melt_qc)
+        _log(f"Ct called for {len(combined)} well(s) at threshold {threshold:.4g}.")
+
+    melt_rows = None
+    if args.melt_qc:
+        parsed = [files[r.index] for r in results if r.error is None]
+        melt = concat_results(parse_files_parallel(parsed, max_workers=args.workers, cache=cache, melt=True))
+        if melt is None:
+            _log("⚠️ No melt-curve data found; melt QC skipped.")
+        else:
+            melt_rows = attach_melt_qc(combined, melt_qc(melt))
+            flagged = ~melt_rows["melt_ok"]
+            _log(f"Melt QC: excluding {int(flagged.sum())} of {len(melt_rows)} well(s).")
+            combined = melt_rows[~flagged]
+
+    outliers = None
+    if args.replicate_qc:
+        flagged = flag_replicate_outliers(combined, ReplicateQCSettings(test=args.outlier_test))
+        outliers = flagged[flagged["outlier"]]
+        _log(f"Replicate QC: excluding {len(outliers)} of {len(flagged)} well(s).")
+        combined = flagged[~flagged["outlier"]]
+
+    df_long = collapse_replicates(combined)
+    ct_df = df_long[["Sample ID", "Gene", "Ct"]]
+    if not config["genes"]:
+        config["genes"] = sorted(ct_df["Gene"].unique())
+
+    if isinstance(sample_metadata, pd.DataFrame):
+        report = validate_metadata_sheet(sample_metadata, config["grouping_variables"], ct_df["Sample ID"])
+        _log(f"Metadata sheet: {report.matched} sample(s) matched.")
+        if report.unmatched_samples:
+            _log(f"⚠️ Not in the Ct data: {_preview(report.unmatched_samples)}")
+        if report.missing_samples:
+            _log(f"⚠️ No metadata for: {_preview(report.missing_samples)}")
+        for name, values in report.invalid_values.items():
+            _log(f"⚠️ {name}: value(s) not in the config: {_preview(values)}")
+        sample_metadata = match_samples(sample_metadata, ct_df["Sample ID"])
+
+    if args.out_of_core:
+        try:
+            check_writable(*(args.out_of_core / name for name in ("ct", "delta", "ddct")))
+        except FileExistsError as e:
+            _log(f"❌ {e}")
+            return 2
+        ct_path = write_ct_dataset(df_long, args.out_of_core / "ct")
+        errors = validate_dataset(ct_path, config)
+    else:
+        rows = df_to_rows(prepare_ct_frame(ct_df, config["grouping_variables"], sample_metadata))
+        errors = validate_rows(rows, config)
+    if errors:
+        for err in errors:
+            _log(f"❌ {err}")
+        return 1
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    df_long.to_csv(args.output_dir / "ct_replicates.csv", index=False)
+    if melt_rows is not None:
+        melt_rows.to_csv(args.output_dir / "melt_qc.csv", index=False)
+    if outliers is not None:
+        outliers.to_csv(args.output_dir / "replicate_outliers.csv", index=False)
+
+    if args.out_of_core:
+        del results, combined, df_long, ct_df, melt_rows, outliers  # keep only the dataset
+        result_dir = process_ddct_dataset(ct_path, config, sample_metadata, work_dir=args.out_of_core)
+        n_rows = 0
+        with open(args.output_dir / "ddct_results.csv", "w", newline="") as out:
+            for i, part in enumerate(iter_results(result_dir)):
+                part.to_csv(out, index=False, header=i == 0)
+                n_rows += len(part)
+        _log(f"Wrote {n_rows} result rows to {args.output_dir}.")
+        return 0
+
+    if config["contrasts"]:
+        result_df = process_contrasts(rows, config, config["contrasts"])
+    else:
+        result_df = process_ddct(rows, config)
+    memory = memory_report(result_df)
+    _log(f"Results: {format_bytes(memory['bytes'])} in memory "
+         f"({format_bytes(memory['saved_bytes'])} saved by categorical labels/float32).")
+
+    result_df.to_csv(args.output_dir / "ddct_results.csv", index=False)
+    _log(f"Wrote {len(result_df)} result rows to {args.output_dir}.")
+    return 0
@@ -1,42 +1,22 @@
 # ddct_pipeline/converters.py
 
 import pandas as pd
+from ddct_pipeline.dtypes import compact_frame
+from ddct_pipeline.instrumentation import stage
 from ddct_pipeline.types import CtRow
 import numpy as np
 
 def df_to_rows(df: pd.DataFrame) -> list[CtRow]:
-    return [
-        CtRow(
-            sample_id=row["sample_id"],
-            gene=row["gene"],
-            ct=row["ct"],
-            metadata={k: row[k] for k in row.index if k not in {"sample_id", "gene", "ct"}}
-        )
-        for _, row in df.iterrows()
-    ]
-
-def rows_to_df(rows: list[CtRow]) -> pd.DataFrame:
-    data = []
-    for r in rows:
-        base = {
-            "sample_id": r.sample_id,
-            "gene": r.gene,
-            "ct": r.ct  # <- could be tuple
-        }
-        base.update(r.metadata)
-        data.append(base)
-    return pd.DataFrame(data)
-
-def df_to_rows(df: pd.DataFrame) -> list[CtRow]:
-    return [
-        CtRow(
-            sample_id=row["sample_id"],
-            gene=row["gene"],
-            ct=row["ct"],
-            metadata={k: row[k] for k in row.index if k not in {"sample_id", "gene", "ct"}}
-        )
-        for _, row in df.iterrows()
-    ]
+    with stage("df_to_rows", df) as timing:
+        return timing.out([
+            CtRow(
+                sample_id=row["sample_id"],
+                gene=row["gene"],
+                ct=row["ct"],
+                metadata={k: row[k] for k in row.index if k not in {"sample_id", "gene", "ct"}}
+            )
+            for _, row in df.iterrows()
+        ])
 
 def rows_to_df(rows: list[CtRow]) -> pd.DataFrame:
     data = []
@@ -52,60 +32,235 @@ def rows_to_df(rows: list[CtRow]) -> pd.DataFrame:
 
 # --- NEW Excel parser utils ---
 
+# Bump whenever parse/collapse output changes; cached parses are keyed on it.
+PARSER_VERSION = "3"
+
+RESULTS_SHEET = "Results"
+AMPLIFICATION_SHEET = "Amplification Data"
+MELT_SHEET = "Melt Curve Raw Data"
+
 EXPECTED_COLUMNS = {
     "sample name": "sample_id",
     "target name": "gene",
     "ct": "ct"
 }
 
-def parse_excel_ct_file(file) -> pd.DataFrame:
-    """Parse and clean Ct data from a single Excel file."""
-    raw = pd.read_excel(file, sheet_name="Results", header=None)
+OPTIONAL_COLUMNS = {
+    "well": "well"
+}
+
+CURVE_COLUMNS = {
+    "well": "well",
+    "cycle": "cycle"
+}
+
+# Fluorescence column of the amplification sheet, in order of preference.
+FLUORESCENCE_COLUMNS = ["rn", "delta rn"]
+
+MELT_COLUMNS = {
+    "well": "well",
+    "temperature": "temperature"
+}
+MELT_SIGNAL_COLUMNS = ["fluorescence"]
+
+
+def _normalize_cells(block: np.ndarray) -> np.ndarray:
+    """Lowercase/strip every cell of an object block in one vectorized pass."""
+    flat = pd.Series(block.ravel(), dtype=object).astype(str).str.strip().str.lower()
+    return flat.to_numpy(dtype=object).reshape(block.shape)
+
+
+def _find_header_row(block: np.ndarray, keys: tuple[str, ...] = ("sample name", "target name")) -> int | None:
+    if block.size == 0:
+        return None
+    cells = _normalize_cells(block)
+    is_header = np.logical_and.reduce([(cells == key).any(axis=1) for key in keys])
+    return int(is_header.argmax()) if is_header.any() else None
+
+
+def _header_positions(block: np.ndarray, header_row_idx: int) -> dict[str, int]:
+    header = [
+        v.strip().lower() if isinstance(v, str) else None
+        for v in block[header_row_idx]
+    ]
+    positions = {}
+    for idx, name in enumerate(header):
+        positions.setdefault(name, idx)
+    return positions
+
+
+def _infer_column(values: np.ndarray) -> pd.Series:
+    """Infer a column dtype the way a header-based ``read_excel`` would."""
+    col = pd.Series(values, dtype=object)
+    try:
+        return pd.to_numeric(col)
+    except (ValueError, TypeError):
+        return col.infer_objects()
 
-    header_row_idx = None
-    for i, row in raw.iterrows():
-        row_vals = row.astype(str).str.lower().str.strip().tolist()
-        if "sample name" in row_vals and "target name" in row_vals:
-            header_row_idx = i
-            break
 
+def parse_excel_ct_file(
+    file,
+    include_well: bool = False,
+    curves: bool = False,
+    melt: bool = False
+) -> pd.DataFrame:
+    """Parse and clean Ct data from a single Excel file.
+
+    The "Results" sheet is read once; the header row is located in the
+    in-memory block and only the sample/target/Ct (and optionally well)
+    columns below it are materialized.
+
+    With ``curves=True`` the "Amplification Data" sheet is returned instead,
+    one row per well × cycle, for ``ct_calling.call_ct_frame``; with
+    ``melt=True`` the "Melt Curve Raw Data" sheet, one row per well ×
+    reading, for ``melt.melt_qc``.
+    """
+    with stage("parse_excel_ct_file") as timing:
+        if curves:
+            return timing.out(_parse_well_sheet(file, AMPLIFICATION_SHEET, CURVE_COLUMNS, FLUORESCENCE_COLUMNS))
+        if melt:
+            return timing.out(_parse_well_sheet(file, MELT_SHEET, MELT_COLUMNS, MELT_SIGNAL_COLUMNS))
+        return timing.out(_parse_results_sheet(file, include_well))
+
+
+def _parse_results_sheet(file, include_well: bool) -> pd.DataFrame:
+    with stage("parse_excel_ct_file.read_excel"):
+        block = pd.read_excel(file, sheet_name=RESULTS_SHEET, header=None).to_numpy(dtype=object)
+
+    header_row_idx = _find_header_row(block)
     if header_row_idx is None:
         raise ValueError("Could not find header row.")
 
-    df = pd.read_excel(file, sheet_name="Results", header=header_row_idx)
-    df.columns = df.columns.str.strip().str.lower()
+    positions = _header_positions(block, header_row_idx)
 
-    if not all(col in df.columns for col in EXPECTED_COLUMNS):
-        missing = [col for col in EXPECTED_COLUMNS if col not in df.columns]
+    if not all(col in positions for col in EXPECTED_COLUMNS):
+        missing = [col for col in EXPECTED_COLUMNS if col not in positions]
         raise ValueError(f"Missing required columns: {missing}")
 
-    df = df[list(EXPECTED_COLUMNS.keys())].rename(columns=EXPECTED_COLUMNS)
+    wanted = dict(EXPECTED_COLUMNS)
+    if include_well and "well" in positions:
+        wanted.update(OPTIONAL_COLUMNS)
+
+    body = block[header_row_idx + 1:]
+    df = pd.DataFrame({
+        new: _infer_column(body[:, positions[old]])
+        for old, new in wanted.items()
+    })
+
     df["ct"] = pd.to_numeric(df["ct"], errors="coerce")
     df = df.dropna(subset=["sample_id", "gene", "ct"])
-    df = df[df["ct"].apply(lambda x: isinstance(x, (int, float)))]
     df["source_file"] = file.name
     df["original_sample_id"] = df["sample_id"]
 
-    return df
+    # Ct stays float64 here: parses are cached across sessions and settings.
+    return compact_frame(df, REPLICATE_KEYS, float32=False)
+
+
+def _parse_well_sheet(file, sheet_name: str, axis: dict[str, str], signals: list[str]) -> pd.DataFrame:
+    """Per-well readings of ``sheet_name``, labelled with the Results sheet's sample/target names.
+
+    ``axis`` maps the sheet's well/x-axis headers to column names; the first
+    of ``signals`` present becomes "fluorescence". Wells are matched on
+    (well, target), or on the well alone when the sheet has no target
+    column; wells without a Results row are dropped.
+    """
+    with stage("parse_excel_ct_file.read_excel"):
+        sheets = pd.read_excel(file, sheet_name=[RESULTS_SHEET, sheet_name], header=None)
+    results = sheets[RESULTS_SHEET].to_numpy(dtype=object)
+    readings = sheets[sheet_name].to_numpy(dtype=object)
+
+    results_row = _find_header_row(results, ("sample name", "target name", "well"))
+    readings_row = _find_header_row(readings, tuple(axis))
+    if results_row is None or readings_row is None:
+        raise ValueError("Could not find header row.")
+
+    positions = _header_positions(readings, readings_row)
+    signal = next((c for c in signals if c in positions), None)
+    if signal is None:
+        raise ValueError(f"Missing fluorescence column: one of {signals}")
+
+    body = readings[readings_row + 1:]
+    values = {"well": _infer_column(body[:, positions["well"]])}
+    for old, new in axis.items():
+        if new != "well":
+            values[new] = pd.to_numeric(pd.Series(body[:, positions[old]]), errors="coerce")
+    values["fluorescence"] = pd.to_numeric(pd.Series(body[:, positions[signal]]), errors="coerce")
+    curves = pd.DataFrame(values)
+    on = ["well"]
+    if "target name" in positions:
+        curves["gene"] = _infer_column(body[:, positions["target name"]])
+        on.append("gene")
+
+    result_positions = _header_positions(results, results_row)
+    result_body = results[results_row + 1:]
+    wells = pd.DataFrame({
+        new: _infer_column(result_body[:, result_positions[old]])
+        for old, new in {**OPTIONAL_COLUMNS, "sample name": "sample_id", "target name": "gene"}.items()
+    }).dropna().drop_duplicates(on)
+
+    df = curves.dropna(subset=list(axis.values())).merge(wells, on=on, how="inner")
+    df["source_file"] = file.name
+    df["original_sample_id"] = df["sample_id"]
+    return compact_frame(df, REPLICATE_KEYS + ["well"], float32=False)
+
+
+REPLICATE_KEYS = ["sample_id", "gene", "source_file", "original_sample_id"]
+
+COLLAPSED_COLUMNS = ["Sample ID", "Gene", "Ct", "Replicates", "n", "Original Sample ID", "Source File"]
+COLLAPSED_LABELS = ["Sample ID", "Gene", "Original Sample ID", "Source File"]
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    # Replicates are rounded with Python's correctly-rounded round(); np.round
+    # scales by 100 first and can land on the other side of a tie.
+    return np.array([round(v, 2) for v in values.tolist()], dtype=float)
 
 
 def collapse_replicates(df: pd.DataFrame) -> pd.DataFrame:
-    """Collapse technical replicates and compute mean Ct."""
-    grouped = df.groupby(["sample_id", "gene", "source_file", "original_sample_id"])
-    collapsed = []
-
-    for (sid, gene, src, orig), group in grouped:
-        ct_vals = tuple(round(v, 2) for v in group["ct"].tolist())
-        ct_mean = round(np.mean(ct_vals), 2)
-
-        collapsed.append({
-            "Sample ID": sid,
-            "Gene": gene,
-            "Ct": ct_mean,
-            "Replicates": list(ct_vals),
-            "n": len(ct_vals),
-            "Original Sample ID": orig,
-            "Source File": src
-        })
-
-    return pd.DataFrame(collapsed)
+    """Collapse technical replicates and compute mean Ct.
+
+    Groups are formed once with ``ngroup``; rows are stably sorted by group so
+    every per-group quantity (mean, n, replicate list) comes from contiguous
+    slices instead of a Python loop over groups.
+    """
+    with stage("collapse_replicates", df) as timing:
+        return timing.out(_collapse_replicates(df))
+
+
+def _collapse_replicates(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.dropna(subset=REPLICATE_KEYS)
+    if df.empty:
+        return pd.DataFrame(columns=COLLAPSED_COLUMNS)
+
+    group_ids = df.groupby(REPLICATE_KEYS, sort=True).ngroup().to_numpy()
+    order = np.argsort(group_ids, kind="stable")  # keep in-file replicate order
+    sorted_ids = group_ids[order]
+
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    ends = np.r_[starts[1:], len(sorted_ids)]
+    counts = ends - starts
+
+    rounded = _round2(df["ct"].to_numpy(dtype=float)[order])
+    # Row-wise means over (groups x n) blocks, one block per distinct
+    # replicate count, reproduce np.mean's summation order bit-for-bit; the
+    # mean has always been rounded as a NumPy scalar, i.e. np.round.
+    means = np.empty(len(starts))
+    for n in np.unique(counts):
+        sel = counts == n
+        block = rounded[starts[sel, None] + np.arange(n)]
+        means[sel] = block.mean(axis=1)
+    means = np.round(means, 2)
+
+    flat = rounded.tolist()
+    replicates = [flat[s:e] for s, e in zip(starts.tolist(), ends.tolist())]
+
+    first = df.iloc[order[starts]]
+    return compact_frame(pd.DataFrame({
+        "Sample ID": first["sample_id"].array,
+        "Gene": first["gene"].array,
+        "Ct": means,
+        "Replicates": replicates,
+        "n": counts,
+        "Original Sample ID": first["original_sample_id"].array,
+        "Source File": first["source_file"].array
+    }), COLLAPSED_LABELS, float32=False)
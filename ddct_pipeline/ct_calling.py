@@ -0,0 +1,162 @@
+# ddct_pipeline/ct_calling.py
+"""Ct calling from raw amplification curves.
+
+Curves from every plate are laid out as one dense (wells × cycles) array
+(plates with fewer cycles are padded with NaN), so baseline subtraction and
+Ct calling are a few array operations over all wells at once, with one
+threshold shared by every run::
+
+    curves = concat_results(parse_files_parallel(files, curves=True))
+    ct_long = call_ct_frame(curves, CtCallSettings())
+    df_long = collapse_replicates(ct_long)
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ddct_pipeline.converters import REPLICATE_KEYS
+from ddct_pipeline.dtypes import compact_frame
+from ddct_pipeline.instrumentation import stage
+from ddct_pipeline.types import CtCallSettings
+
+CT_METHODS = ("threshold", "sdm")
+WELL_KEYS = ["source_file", "well", "gene"]
+
+
+def curve_matrix(curves: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """Long curves → (one row per plate well and target, fluorescence wells × cycles, cycles)."""
+    curves = curves.dropna(subset=["cycle"])
+    well_ids = curves.groupby(WELL_KEYS, observed=True, sort=True).ngroup().to_numpy()
+    cycles = np.unique(curves["cycle"].to_numpy(dtype=float))
+    n_wells = int(well_ids.max()) + 1 if len(well_ids) else 0
+
+    fluorescence = np.full((n_wells, len(cycles)), np.nan)
+    columns = np.searchsorted(cycles, curves["cycle"].to_numpy(dtype=float))
+    fluorescence[well_ids, columns] = curves["fluorescence"].to_numpy(dtype=float)
+
+    first = np.unique(well_ids, return_index=True)[1]
+    wells = curves.iloc[first].reset_index(drop=True)
+    return wells.drop(columns=["cycle", "fluorescence"]), fluorescence, cycles
+
+
+def subtract_baseline(
+    fluorescence: np.ndarray,
+    cycles: np.ndarray,
+    start: int,
+    end: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Subtract a per-well linear baseline fitted over cycles ``start``–``end``.
+
+    Returns the corrected curves and each well's residual SD over the window.
+    """
+    window = (cycles >= start) & (cycles <= end)
+    x = np.broadcast_to(cycles[window], (len(fluorescence), window.sum()))
+    y = fluorescence[:, window]
+    valid = ~np.isnan(y)
+    n = valid.sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = np.where(valid, x, 0).sum(axis=1) / n
+        y_mean = np.nansum(y, axis=1) / n
+        dx = np.where(valid, x - x_mean[:, None], 0)
+        slope = np.nansum(dx * (y - y_mean[:, None]), axis=1) / (dx * dx).sum(axis=1)
+        slope = np.nan_to_num(slope)  # a single baseline cycle gives a flat baseline
+        intercept = y_mean - slope * x_mean
+
+        corrected = fluorescence - (intercept[:, None] + slope[:, None] * cycles)
+        residual = corrected[:, window]
+        noise = np.sqrt(np.nansum(residual * residual, axis=1) / np.maximum(n - 2, 1))
+    return corrected, noise
+
+
+def auto_threshold(noise: np.ndarray, factor: float) -> float:
+    """One threshold for all wells: ``factor`` × the median baseline SD."""
+    noise = noise[np.isfinite(noise) & (noise > 0)]
+    return float(factor * np.median(noise)) if len(noise) else np.nan
+
+
+def threshold_ct(corrected: np.ndarray, cycles: np.ndarray, threshold: float) -> np.ndarray:
+    """Fractional cycle where each curve last rises through ``threshold`` (linear interpolation).
+
+    Using the last upward crossing ignores early noise spikes. Curves that
+    never cross, or start above the threshold, get NaN.
+    """
+    if corrected.size == 0:
+        return np.full(len(corrected), np.nan)
+    below = corrected < threshold
+    n_cycles = corrected.shape[1]
+    last_below = n_cycles - 1 - np.argmax(below[:, ::-1], axis=1)
+    ok = below.any(axis=1) & (last_below < n_cycles - 1)
+
+    rows = np.flatnonzero(ok)
+    i = last_below[ok]
+    y0, y1 = corrected[rows, i], corrected[rows, i + 1]
+    x0, x1 = cycles[i], cycles[i + 1]
+
+    ct = np.full(len(corrected), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ct[rows] = x0 + (threshold - y0) / (y1 - y0) * (x1 - x0)
+    return ct
+
+
+def sdm_ct(corrected: np.ndarray, cycles: np.ndarray, threshold: float) -> np.ndarray:
+    """Cycle of the second-derivative maximum, refined by a parabola through its neighbours.
+
+    Only curves that reach ``threshold`` are called; the rest get NaN.
+    """
+    ct = np.full(len(corrected), np.nan)
+    if corrected.shape[1] < 5:
+        return ct
+    second = np.gradient(np.gradient(corrected, cycles, axis=1), cycles, axis=1)
+    amplified = np.nanmax(np.where(np.isnan(corrected), -np.inf, corrected), axis=1) >= threshold
+    k = np.argmax(np.where(np.isnan(second), -np.inf, second), axis=1)
+    ok = amplified & (k > 0) & (k < corrected.shape[1] - 1)
+
+    rows, k = np.flatnonzero(ok), k[ok]
+    y0, y1, y2 = second[rows, k - 1], second[rows, k], second[rows, k + 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        offset = np.where(y0 - 2 * y1 + y2 != 0, 0.5 * (y0 - y2) / (y0 - 2 * y1 + y2), 0.0)
+    ct[rows] = cycles[k] + offset * (cycles[k + 1] - cycles[k - 1]) / 2
+    return ct
+
+
+def call_ct(
+    fluorescence: np.ndarray,
+    cycles: np.ndarray,
+    settings: Optional[CtCallSettings] = None
+) -> tuple[np.ndarray, float]:
+    """Ct for every row of a (wells × cycles) array, plus the threshold that was used."""
+    settings = settings or CtCallSettings()
+    if settings.method not in CT_METHODS:
+        raise ValueError(f"Unknown Ct calling method '{settings.method}'.")
+    cycles = np.asarray(cycles, dtype=float)
+
+    corrected, noise = subtract_baseline(fluorescence, cycles, settings.baseline_start, settings.baseline_end)
+    threshold = settings.threshold
+    if threshold is None:
+        threshold = auto_threshold(noise, settings.threshold_sd)
+    if settings.method == "sdm":
+        return sdm_ct(corrected, cycles, threshold), threshold
+    return threshold_ct(corrected, cycles, threshold), threshold
+
+
+def call_ct_frame(
+    curves: pd.DataFrame,
+    settings: Optional[CtCallSettings] = None,
+    include_well: bool = False
+) -> tuple[pd.DataFrame, float]:
+    """Call Ct for all wells in ``curves`` at once; rows match ``parse_excel_ct_file``.
+
+    Wells without a Ct (no amplification) are dropped, like "Undetermined"
+    rows of the Results sheet. Also returns the threshold used.
+    """
+    with stage("call_ct", curves) as timing:
+        wells, fluorescence, cycles = curve_matrix(curves)
+        ct, threshold = call_ct(fluorescence, cycles, settings)
+
+        df = wells[REPLICATE_KEYS + (["well"] if include_well else [])].copy()
+        df.insert(2, "ct", ct)
+        df = df.dropna(subset=["ct"]).reset_index(drop=True)
+        return timing.out(compact_frame(df, REPLICATE_KEYS, float32=False)), threshold
@@ -0,0 +1,100 @@
+# ddct_pipeline/dtypes.py
+"""Memory-lean column types for pipeline frames.
+
+Label columns (sample, gene and file names, grouping variables) repeat across
+targets and replicates, so they are stored as categoricals with sorted
+categories; groupby then works on integer codes and keeps the same group
+order as plain strings. The conversion depends only on the values present,
+so frames built along different paths (e.g. the incremental engine) end up
+with identical dtypes. Ct can optionally be held as float32::
+
+    with float32_ct():
+        results = run_analysis(ct_df, config, sample_metadata)
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from ddct_pipeline.instrumentation import stage
+
+CT_VALUE_COLUMNS = ("ct", "Ct")
+
+_float32: ContextVar[bool] = ContextVar("ddct_float32_ct", default=False)
+
+
+@contextmanager
+def float32_ct(enabled: bool = True) -> Iterator[None]:
+    """Store Ct columns as float32 in every ``compact_frame`` call in this context."""
+    token = _float32.set(enabled)
+    try:
+        yield
+    finally:
+        _float32.reset(token)
+
+
+def float32_enabled() -> bool:
+    """Whether ``compact_frame`` currently stores Ct as float32."""
+    return _float32.get()
+
+
+def _is_label(s: pd.Series) -> bool:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return False
+    return pd.api.types.is_string_dtype(s.dtype) or s.dtype == object
+
+
+def compact_frame(
+    df: pd.DataFrame,
+    labels: Optional[Iterable[str]] = None,
+    float32: Optional[bool] = None
+) -> pd.DataFrame:
+    """String columns (or just ``labels``) → categorical; Ct → float32 if enabled.
+
+    ``float32`` defaults to the surrounding ``float32_ct`` setting.
+    """
+    if float32 is None:
+        float32 = float32_enabled()
+    labels = set(df.columns if labels is None else labels)
+
+    with stage("compact_frame", df) as timing:
+        changes = {}
+        for col in df.columns:
+            s = df[col]
+            if float32 and col in CT_VALUE_COLUMNS and pd.api.types.is_float_dtype(s.dtype):
+                if s.dtype != np.float32:
+                    changes[col] = s.astype(np.float32)
+            elif col in labels and _is_label(s):
+                try:
+                    changes[col] = s.astype("category")
+                except TypeError:  # list cells (e.g. "Replicates")
+                    continue
+        if changes:
+            df = df.assign(**changes)
+        return timing.out(df)
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def memory_report(df: pd.DataFrame) -> dict[str, int]:
+    """Current size of ``df`` and what it would take with plain string/float64 columns."""
+    plain = df.astype({
+        col: (object if isinstance(dtype, pd.CategoricalDtype) else np.float64)
+        for col, dtype in df.dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype) or dtype == np.float32
+    })
+    current, before = frame_bytes(df), frame_bytes(plain)
+    return {"bytes": current, "plain_bytes": before, "saved_bytes": before - current}
+
+
+def format_bytes(n: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GiB"
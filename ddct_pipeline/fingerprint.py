@@ -0,0 +1,17 @@
+# ddct_pipeline/fingerprint.py
+
+import hashlib
+
+import pandas as pd
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Cheap content hash of a DataFrame (values, index, columns and dtypes)."""
+    h = hashlib.sha1()
+    h.update(repr((df.shape, list(df.columns), [str(t) for t in df.dtypes])).encode())
+    try:
+        hashed = pd.util.hash_pandas_object(df, index=True)
+    except TypeError:  # unhashable cells, e.g. replicate lists
+        hashed = pd.util.hash_pandas_object(df.astype(str), index=True)
+    h.update(hashed.to_numpy().tobytes())
+    return h.hexdigest()
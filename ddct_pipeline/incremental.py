@@ -0,0 +1,163 @@
+# ddct_pipeline/incremental.py
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ddct_pipeline.analysis import prepare_ct_frame
+from ddct_pipeline.converters import df_to_rows
+from ddct_pipeline.dtypes import float32_enabled
+from ddct_pipeline.fingerprint import frame_fingerprint
+from ddct_pipeline.metadata import attach_metadata
+from ddct_pipeline.processor import (
+    aggregate_replicates,
+    apply_delta_ct,
+    apply_delta_delta_ct,
+    contrast_delta_delta_ct,
+    reference_ct,
+    reference_means,
+    rows_to_frame
+)
+
+DELTA_CT_COLUMNS = ["ref_ct", "ΔCt"]
+DELTA_DELTA_CT_COLUMNS = ["ΔCt_ref", "ΔΔCt", "Fold Change"]
+
+
+class IncrementalDDCT:
+    """ΔΔCt engine that keeps its intermediate stages between runs.
+
+    ``run`` takes the same inputs as ``analysis.run_analysis`` and diffs them
+    against the previous call:
+
+    - new Ct data or grouping variables → full recompute
+    - new reference genes → reference Ct, ΔCt and everything after
+    - new reference condition → per-gene reference ΔCt and ΔΔCt
+    - edited sample metadata → metadata columns; if samples moved in or out of
+      the reference condition, only the genes measured on them get a new
+      reference ΔCt / ΔΔCt
+
+    Every path uses the ``processor`` stage functions, so the result matches
+    ``process_ddct`` exactly (``process_contrasts`` if ``config["contrasts"]``
+    is set).
+    """
+
+    def __init__(self):
+        self.delta: Optional[pd.DataFrame] = None  # per-sample/gene Ct + ref_ct + ΔCt
+        self.ref_cts: Optional[pd.Series] = None
+        self.ref_means: Optional[pd.Series] = None
+        self.result: Optional[pd.DataFrame] = None
+        self.last_update: str = ""  # which path the last run took
+
+        self._ct_key = None
+        self._ref_genes = None
+        self._reference = None
+        self._metadata: Optional[pd.DataFrame] = None
+
+    def run(
+        self,
+        ct_df: pd.DataFrame,
+        config: dict,
+        sample_metadata: Optional[dict[str, dict[str, str]]] = None
+    ) -> pd.DataFrame:
+        grouping_vars = config.get("grouping_variables", [])
+        # Ct dtype depends on float32_ct, so toggling it needs a full recompute.
+        ct_key = (frame_fingerprint(ct_df), tuple(gv.name for gv in grouping_vars), float32_enabled())
+        ref_genes = list(config["reference_genes"])
+        reference = (grouping_vars[0].name, config["reference_condition"])
+
+        if self.result is None or ct_key != self._ct_key:
+            df = prepare_ct_frame(ct_df, grouping_vars, sample_metadata)
+            self.delta = aggregate_replicates(rows_to_frame(df_to_rows(df)))
+            self._metadata = self._resolve_metadata(grouping_vars, sample_metadata)
+            self._ct_key = ct_key
+            self._update_reference_ct(ref_genes)
+            self._update_reference_means(reference)
+            self.last_update = "full"
+            return self._output(config)
+
+        previous = self._metadata
+        changed = self._update_metadata(grouping_vars, sample_metadata)
+
+        if ref_genes != self._ref_genes:
+            self._update_reference_ct(ref_genes)
+            self._update_reference_means(reference)
+            self.last_update = "reference genes"
+        elif reference != self._reference:
+            self._update_reference_means(reference)
+            self.last_update = "reference condition"
+        elif reference[0] in changed:
+            grouping_var, ref_cond = reference
+            was_ref = previous[grouping_var] == ref_cond
+            is_ref = self._metadata[grouping_var] == ref_cond
+            moved = self._metadata.index[(was_ref != is_ref).to_numpy()]
+            genes = self.delta.loc[self.delta["sample_id"].isin(moved), "gene"].unique()
+            self._update_reference_means(reference, genes)
+            self.last_update = f"metadata ({len(genes)} gene(s))" if len(genes) else "metadata"
+        else:
+            self.last_update = "metadata" if changed else "unchanged"
+
+        return self._output(config)
+
+    def _output(self, config: dict) -> pd.DataFrame:
+        # Contrasts all reuse the cached ΔCt stage.
+        if config.get("contrasts"):
+            return contrast_delta_delta_ct(self.delta, config["contrasts"])
+        return self.result.copy()
+
+    # --- Stages ---
+
+    def _update_reference_ct(self, ref_genes: list[str]):
+        base = self.delta.drop(columns=DELTA_CT_COLUMNS, errors="ignore")
+        self.ref_cts = reference_ct(base, ref_genes)
+        self.delta = apply_delta_ct(base, self.ref_cts)
+        self._ref_genes = ref_genes
+
+    def _update_reference_means(self, reference: tuple[str, str], genes=None):
+        grouping_var, ref_cond = reference
+        if genes is None:
+            self.ref_means = reference_means(self.delta, grouping_var, ref_cond)
+            self.result = apply_delta_delta_ct(self.delta, self.ref_means)
+            self._reference = reference
+            return
+
+        if not len(genes):
+            return
+        subset = self.delta[self.delta["gene"].isin(genes)]
+        fresh = reference_means(subset, grouping_var, ref_cond)
+        self.ref_means = pd.concat([self.ref_means.drop(genes, errors="ignore"), fresh]).rename("ΔCt_ref")
+
+        # Same arithmetic as apply_delta_delta_ct, restricted to the touched genes
+        rows = self.result["gene"].isin(genes)
+        ref = self.result.loc[rows, "gene"].map(self.ref_means).astype(float)
+        ddct = self.result.loc[rows, "ΔCt"] - ref
+        self.result.loc[rows, "ΔCt_ref"] = ref
+        self.result.loc[rows, "ΔΔCt"] = ddct
+        self.result.loc[rows, "Fold Change"] = 2 ** (-ddct)
+
+    # --- Metadata ---
+
+    def _resolve_metadata(self, grouping_vars, sample_metadata) -> pd.DataFrame:
+        samples = pd.DataFrame({"sample_id": np.asarray(self.delta["sample_id"].unique(), dtype=object)})
+        return attach_metadata(samples, grouping_vars, sample_metadata).set_index("sample_id")
+
+    def _update_metadata(self, grouping_vars, sample_metadata) -> dict[str, pd.Index]:
+        """Refresh metadata columns; returns the changed samples per variable."""
+        resolved = self._resolve_metadata(grouping_vars, sample_metadata)
+        changed = {}
+        for col in resolved.columns:
+            old, new = self._metadata[col], resolved[col]
+            diff = ~((old == new) | (old.isna() & new.isna()))
+            if diff.any():
+                changed[col] = resolved.index[diff.to_numpy()]
+
+        for col in changed:
+            for frame in (self.delta, self.result):
+                # Rebuild from Python objects so the dtype is inferred exactly
+                # as process_ddct's DataFrame constructor (then rows_to_frame's
+                # categorical conversion) would.
+                values = pd.Series(frame["sample_id"].map(resolved[col]).tolist(), index=frame.index)
+                frame[col] = values.astype("category")
+
+        self._metadata = resolved
+        return changed
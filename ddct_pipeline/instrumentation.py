@@ -0,0 +1,152 @@
+# ddct_pipeline/instrumentation.py
+"""Per-stage timing, row counts and (optionally) peak memory.
+
+Pipeline functions wrap their stages in ``stage(...)``; nothing is recorded
+unless a caller opened a ``collect()`` block, so the disabled cost is one
+context-variable lookup per stage::
+
+    with collect(track_memory=True) as timings:
+        df = collapse_replicates(parse_excel_ct_file(f))
+    timings.to_frame()
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Iterator, Optional
+
+_active: ContextVar[Optional["Collector"]] = ContextVar("ddct_collector", default=None)
+
+
+def _count(obj: Any) -> Optional[int]:
+    if obj is None or isinstance(obj, int):
+        return obj
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    seconds: float = 0.0
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    peak_bytes: Optional[int] = None
+    depth: int = 0
+    started_at: float = 0.0
+
+
+@dataclass
+class _Open:
+    record: StageRecord
+    t0: float
+    mem_base: int = 0
+    child_peak: int = 0
+
+    def out(self, obj, rows: Optional[int] = None):
+        """Record the stage output size and hand the object back."""
+        self.record.rows_out = rows if rows is not None else _count(obj)
+        return obj
+
+
+class _Disabled:
+    __slots__ = ()
+
+    def out(self, obj, rows: Optional[int] = None):
+        return obj
+
+
+_DISABLED = _Disabled()
+
+
+@dataclass
+class Collector:
+    track_memory: bool = False
+    records: list[StageRecord] = field(default_factory=list)
+    _stack: list[_Open] = field(default_factory=list)
+
+    def extend(self, records: list[StageRecord]):
+        """Adopt records collected elsewhere (e.g. in a worker process)."""
+        depth = len(self._stack)
+        for r in records:
+            self.records.append(StageRecord(**{**asdict(r), "depth": r.depth + depth}))
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame([asdict(r) for r in self.records])
+
+    def to_jsonl(self) -> str:
+        return "".join(json.dumps(asdict(r), ensure_ascii=False) + "\n" for r in self.records)
+
+    def write_jsonl(self, path: str):
+        """Append records as JSON lines to ``path`` ("-" for stderr)."""
+        if path == "-":
+            sys.stderr.write(self.to_jsonl())
+            return
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(self.to_jsonl())
+
+
+def current() -> Optional[Collector]:
+    return _active.get()
+
+
+def extend(records: list[StageRecord]):
+    collector = _active.get()
+    if collector is not None:
+        collector.extend(records)
+
+
+@contextmanager
+def collect(track_memory: bool = False) -> Iterator[Collector]:
+    """Record every ``stage`` entered in this context."""
+    collector = Collector(track_memory=track_memory)
+    started_tracing = track_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    token = _active.set(collector)
+    try:
+        yield collector
+    finally:
+        _active.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+@contextmanager
+def stage(name: str, rows_in: Any = None):
+    collector = _active.get()
+    if collector is None:
+        yield _DISABLED
+        return
+
+    record = StageRecord(stage=name, rows_in=_count(rows_in), depth=len(collector._stack), started_at=time.time())
+    collector.records.append(record)
+    handle = _Open(record, 0.0)
+    if collector.track_memory and tracemalloc.is_tracing():
+        handle.mem_base, peak = tracemalloc.get_traced_memory()
+        if collector._stack:
+            parent = collector._stack[-1]
+            parent.child_peak = max(parent.child_peak, peak)
+        tracemalloc.reset_peak()
+    collector._stack.append(handle)
+    handle.t0 = time.perf_counter()
+    try:
+        yield handle
+    finally:
+        record.seconds = time.perf_counter() - handle.t0
+        collector._stack.pop()
+        if collector.track_memory and tracemalloc.is_tracing():
+            # Nested stages reset the peak, so carry children's peaks upward.
+            peak = max(tracemalloc.get_traced_memory()[1], handle.child_peak)
+            record.peak_bytes = peak - handle.mem_base
+            if collector._stack:
+                parent = collector._stack[-1]
+                parent.child_peak = max(parent.child_peak, peak)
+            tracemalloc.reset_peak()
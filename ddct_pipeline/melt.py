@@ -0,0 +1,170 @@
+# ddct_pipeline/melt.py
+"""Melt-curve specificity QC.
+
+Melt readings of every plate are laid out as dense (wells × readings)
+temperature and fluorescence arrays (NaN-padded), so the derivative, peak
+finding and Tm refinement run over all wells at once. Each well gets its
+Tm, its number of -dF/dT peaks and a flag; ``attach_melt_qc`` joins them onto
+the per-well replicate table so flagged wells can be dropped before
+``collapse_replicates``::
+
+    melt = concat_results(parse_files_parallel(files, melt=True))
+    rows = attach_melt_qc(rows, melt_qc(melt))
+    df_long = collapse_replicates(rows[rows["melt_ok"]])
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ddct_pipeline.instrumentation import stage
+from ddct_pipeline.types import MeltQCSettings
+
+WELL_KEYS = ["source_file", "well", "gene"]
+
+FLAG_OK = ""
+FLAG_NO_PEAK = "no peak"
+FLAG_MULTIPLE_PEAKS = "multiple peaks"
+FLAG_TM_SHIFT = "Tm shift"
+FLAG_NO_MELT_DATA = "no melt data"
+
+
+def melt_matrix(melt: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """Long melt readings → (one row per plate well and target, temperature, fluorescence).
+
+    Readings are ordered by temperature within each well; both arrays are
+    (wells × readings) and NaN-padded where a well has fewer readings.
+    """
+    melt = melt.dropna(subset=["temperature", "fluorescence"])
+    well_ids = melt.groupby(WELL_KEYS, observed=True, sort=True).ngroup().to_numpy()
+    order = np.lexsort((melt["temperature"].to_numpy(dtype=float), well_ids))
+    well_ids = well_ids[order]
+
+    starts = np.flatnonzero(np.r_[True, well_ids[1:] != well_ids[:-1]]) if len(well_ids) else np.empty(0, dtype=int)
+    counts = np.diff(np.r_[starts, len(well_ids)])
+    position = np.arange(len(well_ids)) - np.repeat(starts, counts)
+
+    shape = (len(starts), int(counts.max()) if len(counts) else 0)
+    temperature, fluorescence = np.full(shape, np.nan), np.full(shape, np.nan)
+    temperature[well_ids, position] = melt["temperature"].to_numpy(dtype=float)[order]
+    fluorescence[well_ids, position] = melt["fluorescence"].to_numpy(dtype=float)[order]
+
+    wells = melt.iloc[order[starts]].reset_index(drop=True)
+    return wells.drop(columns=["temperature", "fluorescence"]), temperature, fluorescence
+
+
+def _moving_average(values: np.ndarray, width: int) -> np.ndarray:
+    """Row-wise centred moving average that skips NaN (NaN stays NaN)."""
+    if width <= 1:
+        return values
+    half = width // 2
+    filled = np.pad(np.nan_to_num(values), ((0, 0), (half + 1, half)))
+    valid = np.pad((~np.isnan(values)).astype(float), ((0, 0), (half + 1, half)))
+    sums = np.cumsum(filled, axis=1)
+    counts = np.cumsum(valid, axis=1)
+    window_sum = sums[:, width:] - sums[:, :-width]
+    window_count = counts[:, width:] - counts[:, :-width]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = window_sum / window_count
+    return np.where(np.isnan(values), np.nan, out)
+
+
+def melt_derivative(temperature: np.ndarray, fluorescence: np.ndarray, smoothing: int = 3) -> np.ndarray:
+    """Smoothed -dF/dT by central differences; the first and last reading are NaN."""
+    derivative = np.full(fluorescence.shape, np.nan)
+    if fluorescence.shape[1] >= 3:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            derivative[:, 1:-1] = -(fluorescence[:, 2:] - fluorescence[:, :-2]) / (temperature[:, 2:] - temperature[:, :-2])
+    return _moving_average(derivative, smoothing)
+
+
+def find_peaks(
+    temperature: np.ndarray,
+    derivative: np.ndarray,
+    settings: MeltQCSettings
+) -> tuple[np.ndarray, np.ndarray]:
+    """Tm (of the tallest peak) and number of peaks for every well."""
+    n_wells, n_readings = derivative.shape
+    tm, n_peaks = np.full(n_wells, np.nan), np.zeros(n_wells, dtype=int)
+    if n_readings < 3:
+        return tm, n_peaks
+
+    # Peaks closer than min_separation merge: a reading must be the maximum
+    # of a window that wide (in readings, from the median temperature step).
+    step = np.nanmedian(np.diff(temperature, axis=1)) if n_readings > 1 else np.nan
+    reach = max(1, int(round(settings.min_separation / step))) if np.isfinite(step) and step > 0 else 1
+    d = np.where(np.isnan(derivative), -np.inf, derivative)
+    padded = np.pad(d, ((0, 0), (reach, reach)), constant_values=-np.inf)
+    local_max = padded[:, :n_readings].copy()
+    for shift in range(1, 2 * reach + 1):  # running max over shifted views, not over wells
+        np.maximum(local_max, padded[:, shift:shift + n_readings], out=local_max)
+
+    # Heights are relative to the well's tallest peak and, so that flat
+    # (non-amplified) wells show no peak at all, to the typical well's.
+    tallest = d.max(axis=1)
+    typical = np.median(tallest[np.isfinite(tallest)]) if np.isfinite(tallest).any() else 0.0
+    floor = settings.min_peak_height * np.maximum(tallest, typical)
+    rising = np.c_[np.zeros((n_wells, 1), bool), d[:, 1:] > d[:, :-1]]  # plateaus count once
+    peaks = (d == local_max) & rising & (d > 0) & (d >= floor[:, None])
+    n_peaks = peaks.sum(axis=1)
+
+    rows = np.flatnonzero(n_peaks > 0)
+    k = np.argmax(d[rows], axis=1)
+    inner = (k > 0) & (k < n_readings - 1)
+    kk = np.clip(k, 1, n_readings - 2)
+    y0, y1, y2 = d[rows, kk - 1], d[rows, kk], d[rows, kk + 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = y0 - 2 * y1 + y2
+        offset = np.where(inner & np.isfinite(denom) & (denom != 0), 0.5 * (y0 - y2) / denom, 0.0)
+        span = (temperature[rows, kk + 1] - temperature[rows, kk - 1]) / 2
+    tm[rows] = temperature[rows, k] + np.nan_to_num(offset * span)
+    return tm, n_peaks
+
+
+def melt_qc(melt: pd.DataFrame, settings: Optional[MeltQCSettings] = None) -> pd.DataFrame:
+    """One row per plate well and target: Tm, number of peaks and a QC flag.
+
+    A well is flagged when it has no peak, more than one peak, or a Tm more
+    than ``tm_tolerance`` from the median Tm of its target across all plates.
+    """
+    settings = settings or MeltQCSettings()
+    with stage("melt_qc", melt) as timing:
+        wells, temperature, fluorescence = melt_matrix(melt)
+        derivative = melt_derivative(temperature, fluorescence, settings.smoothing)
+        tm, n_peaks = find_peaks(temperature, derivative, settings)
+
+        qc = wells[[c for c in ["sample_id", *WELL_KEYS] if c in wells.columns]].copy()
+        qc["tm"] = tm
+        qc["n_peaks"] = n_peaks
+        target_tm = qc.groupby("gene", observed=True)["tm"].transform("median")
+
+        flag = np.full(len(qc), FLAG_OK, dtype=object)
+        flag[(np.abs(tm - target_tm.to_numpy(dtype=float)) > settings.tm_tolerance)] = FLAG_TM_SHIFT
+        flag[n_peaks > 1] = FLAG_MULTIPLE_PEAKS
+        flag[n_peaks == 0] = FLAG_NO_PEAK
+        qc["melt_flag"] = flag
+        qc["melt_ok"] = flag == FLAG_OK
+        return timing.out(qc)
+
+
+def attach_melt_qc(rows: pd.DataFrame, qc: pd.DataFrame) -> pd.DataFrame:
+    """Join Tm, peak count and flag onto per-well Ct rows (parsed with ``include_well=True``).
+
+    Wells without melt readings keep ``melt_ok`` True and are flagged
+    "no melt data".
+    """
+    if "well" not in rows.columns:
+        raise ValueError("Melt-curve QC needs the well of every Ct row; parse with include_well=True.")
+    keys = [k for k in WELL_KEYS if k in qc.columns]
+    columns = ["tm", "n_peaks", "melt_flag", "melt_ok"]
+    table = qc[columns].set_axis(pd.MultiIndex.from_frame(qc[keys].astype(object)))
+    found = table.reindex(pd.MultiIndex.from_frame(rows[keys].astype(object)))
+
+    out = rows.copy()
+    missing = found["melt_ok"].isna().to_numpy()
+    out["tm"] = found["tm"].to_numpy(dtype=float)
+    out["n_peaks"] = found["n_peaks"].fillna(0).to_numpy(dtype=int)
+    out["melt_flag"] = np.where(missing, FLAG_NO_MELT_DATA, found["melt_flag"].to_numpy(dtype=object))
+    out["melt_ok"] = np.where(missing, True, found["melt_ok"].to_numpy(dtype=object)).astype(bool)
+    return out
@@ -0,0 +1,131 @@
+# ddct_pipeline/metadata.py
+"""Sample metadata as a table: sheet import, bulk validation and the join onto Ct rows.
+
+A metadata sheet is a CSV/TSV/Excel table with a "Sample ID" column and one
+column per grouping variable. Sample IDs are matched on their text form, so
+``7`` in the sheet finds sample ``"7"`` (or ``7``) in the Ct table.
+"""
+
+from pathlib import Path
+from typing import IO, Optional, Union
+
+import pandas as pd
+
+from ddct_pipeline.types import GroupingVariable, MetadataSheetReport
+
+SAMPLE_ID_COLUMN = "Sample ID"
+
+SampleMetadata = dict[str, dict[str, str]]
+
+
+def read_metadata_sheet(source: Union[str, Path, IO], name: Optional[str] = None) -> pd.DataFrame:
+    """Read a sheet keyed by "Sample ID"; every cell is text, blanks are missing.
+
+    ``name`` gives the file name (and so the format) for file-like sources
+    such as Streamlit uploads.
+    """
+    suffix = Path(name or getattr(source, "name", None) or str(source)).suffix.lower()
+    if suffix in {".xls", ".xlsx"}:
+        sheet = pd.read_excel(source, dtype=str)
+    else:
+        sep = "\t" if suffix in {".tsv", ".txt"} else ","
+        sheet = pd.read_csv(source, sep=sep, dtype=str, skipinitialspace=True)
+
+    sheet.columns = [str(c).strip() for c in sheet.columns]
+    if SAMPLE_ID_COLUMN not in sheet.columns:
+        raise ValueError(f"Metadata sheet needs a '{SAMPLE_ID_COLUMN}' column.")
+
+    sheet = sheet.apply(lambda col: col.str.strip()).replace("", None)
+    sheet = sheet.dropna(subset=[SAMPLE_ID_COLUMN])
+    return sheet.drop_duplicates(SAMPLE_ID_COLUMN, keep="last").set_index(SAMPLE_ID_COLUMN)
+
+
+def metadata_frame(
+    sample_metadata: Union[SampleMetadata, pd.DataFrame, None],
+    names: list[str]
+) -> pd.DataFrame:
+    """``{sample: {var: value}}`` (or a frame indexed by sample) → one column per name."""
+    if isinstance(sample_metadata, pd.DataFrame):
+        table = sample_metadata
+    else:
+        table = pd.DataFrame.from_dict(sample_metadata or {}, orient="index")
+    return table.reindex(columns=names)
+
+
+def match_samples(sheet: pd.DataFrame, sample_ids) -> pd.DataFrame:
+    """Re-key ``sheet`` by the Ct table's own sample IDs; unknown IDs are dropped."""
+    ids = pd.Index(pd.unique(pd.Series(sample_ids, dtype=object)))
+    by_text = pd.Series(ids, index=ids.astype(str))
+    keys = sheet.index.astype(str)
+    matched = sheet[keys.isin(by_text.index)]
+    matched.index = pd.Index(by_text.loc[matched.index.astype(str)].to_numpy(), name=SAMPLE_ID_COLUMN)
+    return matched
+
+
+def validate_metadata_sheet(
+    sheet: pd.DataFrame,
+    grouping_variables: list[GroupingVariable],
+    sample_ids
+) -> MetadataSheetReport:
+    """Check a sheet against the configured variables and the samples in the Ct table."""
+    sheet_ids = sheet.index.astype(str)
+    ct_ids = pd.Index(pd.unique(pd.Series(sample_ids, dtype=object))).astype(str)
+
+    variables = {gv.name: gv for gv in grouping_variables if gv.name != "Samples"}
+    invalid = {}
+    for name, gv in variables.items():
+        if name not in sheet.columns:
+            continue
+        col = sheet[name]
+        bad = col.notna() & ~col.isin(gv.values)
+        if bad.any():
+            invalid[name] = sorted(col[bad].unique())
+
+    return MetadataSheetReport(
+        matched=int(sheet_ids.isin(ct_ids).sum()),
+        unmatched_samples=sorted(sheet_ids[~sheet_ids.isin(ct_ids)]),
+        missing_samples=sorted(ct_ids[~ct_ids.isin(sheet_ids)]),
+        invalid_values=invalid,
+        missing_columns=[name for name in variables if name not in sheet.columns],
+        ignored_columns=[c for c in sheet.columns if c not in variables],
+    )
+
+
+def merge_metadata_sheet(
+    sample_metadata: Optional[SampleMetadata],
+    sheet: pd.DataFrame,
+    grouping_variables: list[GroupingVariable],
+    sample_ids
+) -> SampleMetadata:
+    """Overlay the sheet's non-blank cells on the current metadata of the Ct table's samples."""
+    names = [gv.name for gv in grouping_variables]
+    current = metadata_frame(sample_metadata, names)
+    incoming = match_samples(sheet, sample_ids).reindex(columns=names)
+    merged = incoming.combine_first(current).reindex(columns=names)
+    merged = merged.astype(object).where(merged.notna(), None)
+    return merged.to_dict("index")
+
+
+def attach_metadata(
+    df: pd.DataFrame,
+    grouping_variables: list[GroupingVariable],
+    sample_metadata: Union[SampleMetadata, pd.DataFrame, None] = None
+) -> pd.DataFrame:
+    """Add one column per grouping variable, joined on ``sample_id`` in one merge.
+
+    The implicit "Samples" variable falls back to the sample ID itself.
+    """
+    names = [gv.name for gv in grouping_variables]
+    if not names:
+        return df
+
+    table = metadata_frame(sample_metadata, names).astype(object)
+    sample_ids = df["sample_id"].to_numpy(dtype=object)
+    values = table.reindex(pd.Index(sample_ids))
+    if "Samples" in names:
+        values["Samples"] = values["Samples"].fillna(pd.Series(sample_ids, index=values.index))
+
+    out = df.copy()
+    for name in names:
+        out[name] = values[name].to_numpy(dtype=object)
+    return out
@@ -0,0 +1,122 @@
+# ddct_pipeline/parallel.py
+
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+
+from ddct_pipeline import instrumentation
+from ddct_pipeline.cache import ParseCache, read_file_bytes, with_source_name
+from ddct_pipeline.converters import parse_excel_ct_file
+from ddct_pipeline.dtypes import compact_frame
+
+DEFAULT_MAX_WORKERS = 8
+
+
+@dataclass
+class ParseResult:
+    index: int  # position in the input list, used to restore upload order
+    name: str
+    df: Optional[pd.DataFrame] = None
+    error: Optional[str] = None
+    cached: bool = False
+
+
+def _parse_bytes(name: str, data: bytes, kwargs: dict) -> pd.DataFrame:
+    buffer = io.BytesIO(data)
+    buffer.name = name
+    return parse_excel_ct_file(buffer, **kwargs)
+
+
+def _parse_bytes_timed(name: str, data: bytes, kwargs: dict, track_memory: bool):
+    """Worker entry point that ships its stage records back to the parent."""
+    with instrumentation.collect(track_memory) as timings:
+        df = _parse_bytes(name, data, kwargs)
+    return df, timings.records
+
+
+def _worker_count(n_jobs: int, max_workers: Optional[int]) -> int:
+    limit = max_workers or min(DEFAULT_MAX_WORKERS, os.cpu_count() or 1)
+    return max(1, min(limit, n_jobs))
+
+
+def parse_files_parallel(
+    files: Iterable,
+    max_workers: Optional[int] = None,
+    cache: Optional[ParseCache] = None,
+    **kwargs
+) -> Iterator[ParseResult]:
+    """Parse instrument exports across a bounded process pool.
+
+    Yields one ``ParseResult`` per file as soon as it finishes (cache hits
+    first), so callers can report progress; sort on ``index`` to recover the
+    input order. Uploaded files are shipped to workers as raw bytes.
+    """
+    jobs = []
+    for index, file in enumerate(files):
+        name = getattr(file, "name", str(file))
+        try:
+            data = read_file_bytes(file)
+        except OSError as e:
+            yield ParseResult(index, name, error=str(e))
+            continue
+
+        key = cache.parse_key(data, **kwargs) if cache is not None else None
+        hit = cache.get(key) if cache is not None else None
+        if hit is not None:
+            yield ParseResult(index, name, df=with_source_name(hit, name), cached=True)
+        else:
+            jobs.append((index, name, data, key))
+
+    if not jobs:
+        return
+
+    workers = _worker_count(len(jobs), max_workers)
+    if workers == 1:
+        for index, name, data, key in jobs:
+            yield _finish(index, name, key, cache, lambda: _parse_bytes(name, data, kwargs))
+        return
+
+    # Forking a multi-threaded server (Streamlit) is unsafe; always spawn.
+    ctx = multiprocessing.get_context("spawn")
+    collector = instrumentation.current()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        if collector is None:
+            futures = {
+                pool.submit(_parse_bytes, name, data, kwargs): (index, name, key)
+                for index, name, data, key in jobs
+            }
+        else:
+            futures = {
+                pool.submit(_parse_bytes_timed, name, data, kwargs, collector.track_memory): (index, name, key)
+                for index, name, data, key in jobs
+            }
+        for future in as_completed(futures):
+            index, name, key = futures[future]
+            yield _finish(index, name, key, cache, future.result)
+
+
+def _finish(index: int, name: str, key: Optional[str], cache: Optional[ParseCache], result) -> ParseResult:
+    try:
+        df = result()
+    except Exception as e:
+        return ParseResult(index, name, error=str(e))
+    if isinstance(df, tuple):
+        df, records = df
+        instrumentation.extend(records)
+    if cache is not None:
+        cache.put(key, df)
+    return ParseResult(index, name, df=df)
+
+
+def concat_results(results: Iterable[ParseResult]) -> Optional[pd.DataFrame]:
+    """Concatenate successful parses in input order, independent of finish order."""
+    frames = [r.df for r in sorted(results, key=lambda r: r.index) if r.df is not None]
+    if not frames:
+        return None
+    # Per-file categories differ, so concat yields strings; re-categorize once.
+    return compact_frame(pd.concat(frames, ignore_index=True), float32=False)
@@ -0,0 +1,216 @@
+# ddct_pipeline/partitioned.py
+"""Out-of-core ΔΔCt over a partitioned on-disk Ct table.
+
+The collapsed Ct table is written once as a Parquet dataset partitioned by
+gene and run (``Gene=<gene>/Source File=<run>/``). Every ΔΔCt reduction is
+either per sample over the reference genes (reference Ct) or per gene
+(replicate aggregation, reference-condition mean ΔCt), so the analysis
+streams the dataset one gene at a time:
+
+1. reference Ct from the reference genes' partitions, one value per sample
+2. per gene: replicate aggregation and ΔCt, written to ``delta/``, and the
+   gene's mean reference-condition ΔCt
+3. per gene: ΔΔCt and fold change from ``delta/`` into ``ddct/``
+
+Peak memory is one gene's rows (over all runs) plus per-sample tables, so
+it grows with the samples per gene but not with the number of genes, runs
+or sites. Every step is the ``processor`` stage function applied to one
+gene's rows, so ``read_results`` equals ``process_ddct`` (or
+``process_contrasts``) exactly::
+
+    write_ct_dataset(ct_df, "study/ct")
+    out_dir = process_ddct_dataset("study/ct", config, sample_metadata)
+    results = read_results(out_dir)
+"""
+
+import shutil
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from ddct_pipeline.analysis import prepare_ct_frame
+from ddct_pipeline.dtypes import compact_frame
+from ddct_pipeline.instrumentation import stage
+from ddct_pipeline.metadata import SampleMetadata
+from ddct_pipeline.processor import (
+    aggregate_replicates,
+    apply_delta_ct,
+    apply_delta_delta_ct,
+    clean_ct_frame,
+    contrast_delta_delta_ct,
+    reference_ct,
+    reference_means
+)
+from ddct_pipeline.validators import validate_config
+
+GENE_COLUMN = "Gene"
+RUN_COLUMN = "Source File"
+CT_COLUMNS = ["Sample ID", "Gene", "Ct"]
+MARKER = ".ddct_partitioned"  # marks directories _fresh_dir may clear; dot files are not read as data
+ROW_COLUMN = "_row"  # position in the input table; replicate order within a gene
+PARTITIONING = ds.partitioning(pa.schema([(GENE_COLUMN, pa.string()), (RUN_COLUMN, pa.string())]), flavor="hive")
+
+PathLike = Union[str, Path]
+
+
+def check_writable(*paths: PathLike):
+    """Raise FileExistsError unless every path is new, empty or written by this module."""
+    for path in map(Path, paths):
+        if path.exists() and (not path.is_dir() or any(path.iterdir())) and not (path / MARKER).is_file():
+            raise FileExistsError(f"{path} is not empty and was not written by the out-of-core pipeline.")
+
+
+def _fresh_dir(path: PathLike) -> Path:
+    """An empty directory at ``path``, clearing it only if this module created it."""
+    check_writable(path)
+    path = Path(path)
+    if (path / MARKER).is_file():
+        shutil.rmtree(path)
+    path.mkdir(parents=True, exist_ok=True)
+    (path / MARKER).touch()
+    return path
+
+
+def write_ct_dataset(ct_df: pd.DataFrame, path: PathLike) -> Path:
+    """Collapsed Ct table ("Sample ID"/"Gene"/"Ct", optional "Source File") → Parquet dataset.
+
+    ``path`` must be new, empty or an earlier dataset, which is replaced. Labels are stored as strings; a table
+    without a run column is partitioned by gene only.
+    """
+    with stage("partitioned.write", ct_df) as timing:
+        runs = ct_df[RUN_COLUMN].astype(str) if RUN_COLUMN in ct_df.columns else None
+        frame = pd.DataFrame({
+            "Sample ID": ct_df["Sample ID"].astype(str).to_numpy(dtype=object),
+            GENE_COLUMN: ct_df["Gene"].astype(str).to_numpy(dtype=object),
+            "Ct": pd.to_numeric(ct_df["Ct"], errors="coerce").to_numpy(),
+            RUN_COLUMN: None if runs is None else runs.to_numpy(dtype=object),
+            ROW_COLUMN: range(len(ct_df)),
+        })
+        table = pa.Table.from_pandas(frame, preserve_index=False).cast(pa.schema([
+            ("Sample ID", pa.string()), (GENE_COLUMN, pa.string()), ("Ct", pa.float64()),
+            (RUN_COLUMN, pa.string()), (ROW_COLUMN, pa.int64()),
+        ]))
+        ds.write_dataset(
+            table, _fresh_dir(path), format="parquet", partitioning=PARTITIONING,
+            existing_data_behavior="overwrite_or_ignore"
+        )
+        return timing.out(Path(path), rows=len(ct_df))
+
+
+def open_ct_dataset(path: PathLike) -> ds.Dataset:
+    return ds.dataset(path, format="parquet", partitioning=PARTITIONING)
+
+
+def dataset_genes(dataset: ds.Dataset) -> list[str]:
+    """Genes with at least one partition, sorted like the categorical ``gene`` column."""
+    return sorted({ds.get_partition_keys(f.partition_expression)[GENE_COLUMN] for f in dataset.get_fragments()})
+
+
+def read_gene(dataset: ds.Dataset, gene: str) -> pd.DataFrame:
+    """One gene's Ct rows over all runs, in input order."""
+    table = dataset.to_table(columns=CT_COLUMNS + [ROW_COLUMN], filter=ds.field(GENE_COLUMN) == gene)
+    df = table.to_pandas().sort_values(ROW_COLUMN, kind="stable", ignore_index=True)
+    return df.drop(columns=ROW_COLUMN)
+
+
+def iter_genes(dataset: ds.Dataset) -> Iterator[tuple[str, pd.DataFrame]]:
+    for gene in dataset_genes(dataset):
+        yield gene, read_gene(dataset, gene)
+
+
+def validate_dataset(path: PathLike, config: dict) -> list[str]:
+    """``validate_rows`` for a Ct dataset, reading only the missing Ct values."""
+    dataset = open_ct_dataset(path)
+    errors = validate_config(set(dataset_genes(dataset)), config)
+    missing = dataset.to_table(
+        columns=["Sample ID", GENE_COLUMN, ROW_COLUMN], filter=ds.field("Ct").is_null(nan_is_null=True)
+    ).to_pandas().sort_values(ROW_COLUMN, kind="stable")
+    errors.extend(
+        f"Missing Ct value for sample '{sid}', gene '{gene}'"
+        for sid, gene in zip(missing["Sample ID"], missing[GENE_COLUMN])
+    )
+    return errors
+
+
+def _stack(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate per-gene frames; labels are re-categorized over the union."""
+    return compact_frame(pd.concat(frames, ignore_index=True))
+
+
+def process_ddct_dataset(
+    ct_path: PathLike,
+    config: dict,
+    sample_metadata: Union[SampleMetadata, pd.DataFrame, None] = None,
+    work_dir: Optional[PathLike] = None
+) -> Path:
+    """ΔΔCt of a Ct dataset, one gene in memory at a time; returns the result directory.
+
+    ΔCt partitions go to ``work_dir/delta`` and results to ``work_dir/ddct``
+    (``work_dir`` defaults to the dataset's parent), one Parquet file per
+    gene; like ``write_ct_dataset``, only new, empty or earlier output
+    directories are used. With ``config["contrasts"]`` set, results are the long
+    multi-contrast table.
+    """
+    dataset = open_ct_dataset(ct_path)
+    work = Path(work_dir) if work_dir is not None else Path(ct_path).parent
+    check_writable(work / "delta", work / "ddct")
+    delta_dir, out_dir = _fresh_dir(work / "delta"), _fresh_dir(work / "ddct")
+    grouping_vars = config["grouping_variables"]
+    genes = dataset_genes(dataset)
+
+    def gene_frame(gene: str) -> pd.DataFrame:
+        return aggregate_replicates(clean_ct_frame(prepare_ct_frame(read_gene(dataset, gene), grouping_vars, sample_metadata)))
+
+    with stage("partitioned.process_ddct", genes) as timing:
+        # Reference Ct: the reference genes' rows only, sorted as in the full table.
+        ref_genes = config["reference_genes"]
+        refs = [gene_frame(g) for g in genes if g in set(ref_genes)]
+        ref_frame = _stack(refs).sort_values(["sample_id", "gene"], kind="stable") if refs else None
+        ref_cts = reference_ct(ref_frame, ref_genes) if refs else pd.Series(dtype=float, name="ref_ct")
+        ref_cts.index = ref_cts.index.astype(object)
+        del refs, ref_frame
+
+        # Pass 1: ΔCt per gene, plus the per-gene reference-condition means.
+        contrasts = config.get("contrasts")
+        ref_cond, grouping_var = config["reference_condition"], grouping_vars[0].name
+        parts, ref_means = [], []
+        for i, gene in enumerate(genes):
+            df = gene_frame(gene)
+            if df.empty:
+                continue
+            df = apply_delta_ct(df, ref_cts)
+            if not contrasts:
+                ref_means.append(reference_means(df, grouping_var, ref_cond))
+            part = delta_dir / f"part-{i:05d}.parquet"
+            df.to_parquet(part, index=False)
+            parts.append(part)
+
+        # Pass 2: stream the ΔCt partitions back through ΔΔCt.
+        ref_means = pd.concat(ref_means) if ref_means else pd.Series(dtype=float, name="ΔCt_ref")
+        ref_means.index = ref_means.index.astype(object)
+        rows = 0
+        for part in parts:
+            df = pd.read_parquet(part)
+            out = contrast_delta_delta_ct(df, contrasts) if contrasts else apply_delta_delta_ct(df, ref_means)
+            out.to_parquet(out_dir / part.name, index=False)
+            rows += len(out)
+        return timing.out(out_dir, rows=rows)
+
+
+def iter_results(path: PathLike) -> Iterator[pd.DataFrame]:
+    """Result partitions one gene at a time, e.g. to stream them into a CSV."""
+    for part in sorted(Path(path).glob("*.parquet")):
+        yield pd.read_parquet(part)
+
+
+def read_results(path: PathLike) -> pd.DataFrame:
+    """All result partitions in ``process_ddct`` row order (contrast, sample, gene)."""
+    frames = list(iter_results(path))
+    if not frames:
+        return pd.DataFrame()
+    df = _stack(frames)
+    keys = ["contrast"] * ("contrast" in df.columns) + ["sample_id", "gene"]
+    return df.sort_values(keys, kind="stable", ignore_index=True)
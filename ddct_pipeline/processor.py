@@ -2,7 +2,9 @@ import pandas as pd
 import numpy as np
 
 from interface.backend.session_schema import ExperimentConfig
-from ddct_pipeline.types import CtRow
+from ddct_pipeline.dtypes import compact_frame
+from ddct_pipeline.instrumentation import stage
+from ddct_pipeline.types import Contrast, CtRow
 
 def geo_mean(series):
     series = pd.to_numeric(series, errors="coerce")
@@ -10,42 +12,162 @@ def geo_mean(series):
     return np.exp(np.mean(np.log(series))) if not series.empty else np.nan
 
 
-def process_ddct(rows: list[CtRow], config: ExperimentConfig) -> pd.DataFrame:
-    # Convert CtRows to DataFrame
-    df = pd.DataFrame([{
-        "sample_id": r.sample_id,
-        "gene": r.gene,
-        "ct": geo_mean(r.ct) if isinstance(r.ct, (tuple, list)) else r.ct,
-        **r.metadata
-    } for r in rows])
+def geo_mean_groups(values: pd.Series, grouped) -> np.ndarray:
+    """``geo_mean`` of every group of ``grouped`` at once, one value per group in group order.
+
+    Positive values are sorted by group code and averaged as rows of
+    (groups x n) blocks, one block per distinct group size, which sums in the
+    same order as ``np.mean`` on each group (bit-for-bit for float64).
+    """
+    ids = grouped.ngroup().to_numpy()
+    values = pd.to_numeric(values, errors="coerce").to_numpy()
+    keep = (values > 0) & (ids >= 0)
+    ids, logs = ids[keep], np.log(values[keep])
+
+    order = np.argsort(ids, kind="stable")
+    ids, logs = ids[order], logs[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if len(ids) else np.empty(0, dtype=int)
+    counts = np.diff(np.r_[starts, len(ids)])
+
+    means = np.full(grouped.ngroups, np.nan, dtype=logs.dtype)
+    for n in np.unique(counts):
+        sel = starts[counts == n]
+        means[ids[sel]] = logs[sel[:, None] + np.arange(n)].mean(axis=1)
+    return np.exp(means)
 
+
+# --- Stages ---
+# process_ddct is the composition of these; the incremental and batch
+# engines re-run individual stages on subsets of rows.
+
+def rows_to_frame(rows: list[CtRow]) -> pd.DataFrame:
+    with stage("process_ddct.rows_to_frame", rows) as timing:
+        df = pd.DataFrame([{
+            "sample_id": r.sample_id,
+            "gene": r.gene,
+            "ct": geo_mean(r.ct) if isinstance(r.ct, (tuple, list)) else r.ct,
+            **r.metadata
+        } for r in rows])
+        return timing.out(clean_ct_frame(df))
+
+
+def clean_ct_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Numeric Ct, positive values only, labels as categoricals."""
     df["ct"] = pd.to_numeric(df["ct"], errors="coerce")
     df = df[df["ct"] > 0]  # geometric mean requires positive values
+    # Sample, gene and metadata become categoricals so every later
+    # groupby/join works on codes.
+    return compact_frame(df, [c for c in df.columns if c != "ct"])
 
-    # Step 1: Average technical replicates using geometric mean
+
+def aggregate_replicates(df: pd.DataFrame) -> pd.DataFrame:
+    """Step 1: one row per (sample, gene) with the geometric-mean Ct."""
     metadata_keys = [k for k in df.columns if k not in {"sample_id", "gene", "ct"}]
 
-    df["n"] = 1  # replicate count
-    df = df.groupby(["sample_id", "gene"], as_index=False).agg({
-        "ct": geo_mean,
-        "n": "count",
-        **{k: "first" for k in metadata_keys}
-    })
+    with stage("process_ddct.aggregate_replicates", df) as timing:
+        df = df.assign(n=1)  # replicate count
+        grouped = df.groupby(["sample_id", "gene"], as_index=False, sort=True, observed=True)
+        out = grouped.agg({"n": "count", **{k: "first" for k in metadata_keys}})
+        out.insert(2, "ct", geo_mean_groups(df["ct"], grouped))
+        return timing.out(out)
+
+
+def reference_ct(df: pd.DataFrame, ref_genes: list[str]) -> pd.Series:
+    """Per-sample geometric mean Ct of the reference genes."""
+    with stage("process_ddct.reference_ct", df) as timing:
+        df = df[df["gene"].isin(ref_genes)]
+        grouped = df.groupby("sample_id", sort=True, observed=True)["ct"]
+        return timing.out(pd.Series(geo_mean_groups(df["ct"], grouped), index=grouped.size().index, name="ref_ct"))
+
+
+def apply_delta_ct(df: pd.DataFrame, ref_cts: pd.Series) -> pd.DataFrame:
+    """Step 2: ΔCt = Ct - refCt"""
+    with stage("process_ddct.delta_ct", df) as timing:
+        df = df.join(ref_cts, on="sample_id")
+        df["ΔCt"] = df["ct"] - df["ref_ct"]
+        return timing.out(df)
+
+
+def reference_means(df: pd.DataFrame, grouping_var: str, ref_cond: str) -> pd.Series:
+    """Per-gene mean ΔCt of the reference condition."""
+    with stage("process_ddct.reference_means", df) as timing:
+        return timing.out(df[df[grouping_var] == ref_cond].groupby("gene")["ΔCt"].mean().rename("ΔCt_ref"))
+
+
+def apply_delta_delta_ct(df: pd.DataFrame, ref_means: pd.Series) -> pd.DataFrame:
+    """Steps 3-4: ΔΔCt = ΔCt - ref(ΔCt), then fold change."""
+    with stage("process_ddct.delta_delta_ct", df) as timing:
+        df = df.join(ref_means, on="gene")
+        df["ΔΔCt"] = df["ΔCt"] - df["ΔCt_ref"]
+        df["Fold Change"] = 2 ** (-df["ΔΔCt"])
+        return timing.out(df)
+
+
+def contrast_delta_delta_ct(df: pd.DataFrame, contrasts: list[Contrast]) -> pd.DataFrame:
+    """Steps 3-4 against several baselines at once; long format with a ``contrast`` column.
+
+    The reference ΔCt of every (contrast, gene) comes from a single groupby
+    and ΔΔCt / fold change are computed over all contrasts' rows together.
+    Each contrast's rows equal ``apply_delta_delta_ct`` for that baseline.
+    """
+    unique: dict[str, Contrast] = {}
+    for c in contrasts:
+        unique.setdefault(c.label, c)
+    labels = list(unique)
+
+    with stage("process_ddct.contrasts", df) as timing:
+        rows, ref_rows = [], []
+        for c in unique.values():
+            in_scope = df["gene"].isin(c.genes).to_numpy() if c.genes else np.ones(len(df), dtype=bool)
+            rows.append(np.flatnonzero(in_scope))
+            ref_rows.append(np.flatnonzero(in_scope & (df[c.grouping] == c.condition).to_numpy()))
+
+        def stacked(parts):
+            codes = np.repeat(np.arange(len(parts)), [len(p) for p in parts])
+            return np.concatenate(parts), pd.Categorical.from_codes(codes, categories=labels)
+
+        ref_idx, ref_contrast = stacked(ref_rows)
+        ref = df.iloc[ref_idx][["gene", "ΔCt"]].assign(contrast=ref_contrast)
+        ref_means = ref.groupby(["contrast", "gene"], observed=True)["ΔCt"].mean().rename("ΔCt_ref")
+
+        row_idx, row_contrast = stacked(rows)
+        out = df.iloc[row_idx].reset_index(drop=True)
+        out.insert(0, "contrast", row_contrast)
+        out = out.join(ref_means, on=["contrast", "gene"])
+        out["ΔΔCt"] = out["ΔCt"] - out["ΔCt_ref"]
+        out["Fold Change"] = 2 ** (-out["ΔΔCt"])
+        return timing.out(out)
+
+
+def process_ddct(rows: list[CtRow], config: ExperimentConfig) -> pd.DataFrame:
+    with stage("process_ddct", rows) as timing:
+        return timing.out(_process_ddct(rows, config))
+
+
+def process_contrasts(rows: list[CtRow], config: ExperimentConfig, contrasts: list[Contrast]) -> pd.DataFrame:
+    """``process_ddct`` for every contrast, sharing steps 1-2."""
+    with stage("process_contrasts", rows) as timing:
+        return timing.out(contrast_delta_delta_ct(_delta_ct(rows, config), contrasts))
+
+
+def _delta_ct(rows: list[CtRow], config: ExperimentConfig) -> pd.DataFrame:
+    # Convert CtRows to DataFrame
+    df = rows_to_frame(rows)
+
+    # Step 1: Average technical replicates using geometric mean
+    df = aggregate_replicates(df)
 
     # Step 2: ΔCt = Ct - refCt
-    ref_genes = config["reference_genes"]
-    ref_cts = df[df["gene"].isin(ref_genes)].groupby("sample_id")["ct"].apply(geo_mean).rename("ref_ct")
-    df = df.join(ref_cts, on="sample_id")
-    df["ΔCt"] = df["ct"] - df["ref_ct"]
+    return apply_delta_ct(df, reference_ct(df, config["reference_genes"]))
+
+
+def _process_ddct(rows: list[CtRow], config: ExperimentConfig) -> pd.DataFrame:
+    df = _delta_ct(rows, config)
 
     # Step 3: ΔΔCt = ΔCt - ref(ΔCt)
     ref_cond = config["reference_condition"]
     grouping_var = config["grouping_variables"][0].name
-    ref_means = df[df[grouping_var] == ref_cond].groupby("gene")["ΔCt"].mean().rename("ΔCt_ref")
-    df = df.join(ref_means, on="gene")
-    df["ΔΔCt"] = df["ΔCt"] - df["ΔCt_ref"]
-
-    # Step 4: Fold change
-    df["Fold Change"] = 2 ** (-df["ΔΔCt"])
+    df = apply_delta_delta_ct(df, reference_means(df, grouping_var, ref_cond))
 
+    # Step 4: Fold change (in apply_delta_delta_ct)
     return df
@@ -0,0 +1,141 @@
+# ddct_pipeline/renaming.py
+"""Sample/gene reconciliation on the collapsed Ct table.
+
+Renames are resolved on the distinct labels of each column (its categories),
+never per row: explicit ``{old: new}`` mappings win, then ``RenameRule``s are
+applied in order to the text of the remaining labels. Rows are then re-keyed
+through the categorical codes and rows that now share a (Sample ID, Gene)
+pair are merged by ``recollapse_replicates``.
+"""
+
+import re
+from itertools import chain
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ddct_pipeline.converters import COLLAPSED_LABELS
+from ddct_pipeline.instrumentation import stage
+from ddct_pipeline.types import RenameRule
+
+RENAME_KINDS = ("exact", "prefix", "regex")
+COLLAPSE_KEYS = ["Sample ID", "Gene"]
+
+
+def rule_errors(rules: list[RenameRule]) -> dict[int, str]:
+    """Problems that would stop ``rename_labels`` (unknown kind, bad regex or replacement), by rule index."""
+    errors = {}
+    for i, rule in enumerate(rules):
+        if rule.kind not in RENAME_KINDS:
+            errors[i] = f"Rule {i + 1}: unknown match type '{rule.kind}'."
+        elif rule.kind == "regex":
+            try:
+                compiled = re.compile(rule.pattern)
+            except re.error as e:
+                errors[i] = f"Rule {i + 1}: invalid regex '{rule.pattern}' ({e})."
+                continue
+            try:
+                # Substituting into "" still parses the template: bad escapes and group references fail here.
+                compiled.sub(rule.replacement, "")
+            except (re.error, IndexError) as e:
+                errors[i] = f"Rule {i + 1}: invalid replacement '{rule.replacement}' ({e})."
+    return errors
+
+
+def check_rules(rules: list[RenameRule]) -> list[str]:
+    return list(rule_errors(rules).values())
+
+
+def valid_rules(rules: list[RenameRule]) -> list[RenameRule]:
+    """``rules`` without the ones ``rule_errors`` reports."""
+    errors = rule_errors(rules)
+    return [rule for i, rule in enumerate(rules) if i not in errors]
+
+
+def _apply_rule(text: pd.Series, rule: RenameRule) -> pd.Series:
+    if rule.kind == "exact":
+        return text.where(text != rule.pattern, rule.replacement)
+    if rule.kind == "prefix":
+        hit = text.str.startswith(rule.pattern)
+        return text.where(~hit, rule.replacement + text.str.slice(len(rule.pattern)))
+    return text.str.replace(rule.pattern, rule.replacement, regex=True)
+
+
+def resolve_labels(
+    labels: pd.Index,
+    mapping: Optional[dict] = None,
+    rules: Optional[list[RenameRule]] = None
+) -> np.ndarray:
+    """New label for each entry of ``labels`` (object array, same order).
+
+    Labels no rule or mapping touches keep their original value and type.
+    """
+    labels = pd.Index(labels, dtype=object)
+    mapping = mapping or {}
+    text = pd.Series(labels.astype(str), dtype=object)
+    for rule in rules or []:
+        if rule.pattern:
+            text = _apply_rule(text, rule)
+
+    out = labels.to_numpy(dtype=object, copy=True)
+    changed = (text != labels.astype(str)).to_numpy()
+    out[changed] = text.to_numpy(dtype=object)[changed]
+
+    mapped = labels.isin(list(mapping))
+    out[mapped] = labels[mapped].map(mapping).to_numpy(dtype=object)
+    return out
+
+
+def rename_labels(
+    df: pd.DataFrame,
+    mappings: Optional[dict[str, dict]] = None,
+    rules: Optional[list[RenameRule]] = None
+) -> pd.DataFrame:
+    """Apply per-column mappings and rules in one pass over each column's categories."""
+    mappings, rules = mappings or {}, rules or []
+    errors = check_rules(rules)
+    if errors:
+        raise ValueError("\n".join(errors))
+
+    with stage("rename_labels", df) as timing:
+        changes = {}
+        for col in set(mappings) | {r.column for r in rules}:
+            col_rules = [r for r in rules if r.column == col]
+            if col not in df.columns or not (mappings.get(col) or col_rules):
+                continue
+            values = df[col].astype("category")
+            old = values.cat.categories
+            new = resolve_labels(old, mappings.get(col), col_rules)
+            if (new == old.to_numpy(dtype=object)).all():
+                continue
+            # Merged names share a code; categories come out sorted as in compact_frame.
+            codes, uniques = pd.factorize(pd.Series(new, dtype=object), sort=True)
+            remapped = np.where(values.cat.codes >= 0, codes[values.cat.codes], -1)
+            changes[col] = pd.Categorical.from_codes(remapped, categories=pd.Index(uniques.tolist()))
+        if changes:
+            df = df.assign(**changes)
+        return timing.out(df)
+
+
+def _concat_lists(lists: pd.Series) -> list:
+    return list(chain.from_iterable(lists))
+
+
+def recollapse_replicates(df: pd.DataFrame) -> pd.DataFrame:
+    """Merge collapsed rows that share a (Sample ID, Gene) pair, e.g. after a rename.
+
+    Unique pairs pass through untouched; only duplicated pairs are grouped,
+    and their replicate lists are joined in linear time.
+    """
+    with stage("recollapse_replicates", df) as timing:
+        dup = df.duplicated(COLLAPSE_KEYS, keep=False)
+        if dup.any():
+            merged = df[dup].groupby(COLLAPSE_KEYS, as_index=False, sort=False, observed=True).agg({
+                "Ct": "mean",
+                "Replicates": _concat_lists,
+                "n": "sum",
+                **{c: "first" for c in COLLAPSED_LABELS if c not in COLLAPSE_KEYS}
+            })
+            df = pd.concat([df[~dup], merged[df.columns]], ignore_index=True)
+        return timing.out(df.sort_values(COLLAPSE_KEYS, kind="stable", ignore_index=True))
@@ -0,0 +1,173 @@
+# ddct_pipeline/replicate_qc.py
+"""Technical-replicate outlier QC on the long (one row per well) Ct table.
+
+Replicate groups are the ``collapse_replicates`` groups. As in the collapse,
+groups of equal size are stacked into (groups × n) blocks, so every rule —
+distance from the group median, Grubbs, Dixon's Q and a maximum SD — is
+evaluated for all groups at once. Flagged wells keep their row and get
+``outlier``/``outlier_reason``; after a manual edit only the touched groups
+are collapsed again::
+
+    rows = flag_replicate_outliers(rows, ReplicateQCSettings(test="grubbs"))
+    df_long = collapse_replicates(rows[~rows["outlier"]])
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ddct_pipeline.converters import REPLICATE_KEYS, collapse_replicates
+from ddct_pipeline.dtypes import compact_frame
+from ddct_pipeline.instrumentation import stage
+from ddct_pipeline.statistics import t_sf_two_sided
+from ddct_pipeline.types import ReplicateQCSettings
+
+QC_TESTS = ("none", "grubbs", "dixon")
+TIE_TOLERANCE = 1e-9  # Ct has two decimals; closer distances are float noise, i.e. a tie
+COLLAPSED_KEYS = ["Sample ID", "Gene", "Source File", "Original Sample ID"]  # REPLICATE_KEYS, collapsed names
+
+# Two-sided Dixon Q critical values for n = 3..10 (Rorabacher 1991).
+DIXON_Q = {
+    0.1: [0.941, 0.765, 0.642, 0.560, 0.507, 0.468, 0.437, 0.412],
+    0.05: [0.970, 0.829, 0.710, 0.625, 0.568, 0.526, 0.493, 0.466],
+    0.01: [0.994, 0.926, 0.821, 0.740, 0.680, 0.634, 0.598, 0.568],
+}
+
+
+def grubbs_critical(n, alpha: float) -> np.ndarray:
+    """Two-sided Grubbs critical G for each group size in ``n`` (inf below 3)."""
+    n = np.atleast_1d(np.asarray(n, dtype=float))
+    dof = np.maximum(n - 2, 1)
+    # t quantile with two-sided tail alpha/n, by bisection on log t for all sizes at once.
+    lo, hi = np.full(n.shape, -10.0), np.full(n.shape, 15.0)
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        above = t_sf_two_sided(np.exp(mid), dof) > alpha / n
+        lo, hi = np.where(above, mid, lo), np.where(above, hi, mid)
+    t2 = np.exp(lo + hi)  # t² at the midpoint
+    critical = (n - 1) / np.sqrt(n) * np.sqrt(t2 / (n - 2 + t2))
+    return np.where(n >= 3, critical, np.inf)
+
+
+def _dixon_critical(n: int, alpha: float) -> float:
+    table = DIXON_Q.get(alpha)
+    if table is None:
+        raise ValueError(f"Dixon's Q test supports alpha of {sorted(DIXON_Q)}, not {alpha}.")
+    return table[n - 3] if 3 <= n <= 10 else np.nan
+
+
+def _block_rules(block: np.ndarray, settings: ReplicateQCSettings, grubbs_g: float) -> dict[str, np.ndarray]:
+    """Boolean (groups × n) masks, one per rule that fired somewhere in the block."""
+    n = block.shape[1]
+    rules = {}
+    if n < 3:
+        return rules  # with two wells there is no telling which one is off
+
+    median = np.median(block, axis=1, keepdims=True)
+    distance = np.abs(block - median)
+    farthest = distance == distance.max(axis=1, keepdims=True)
+    if settings.max_deviation is not None:
+        rules["median"] = distance > settings.max_deviation
+    if settings.max_sd is not None:
+        rules["sd"] = farthest & (block.std(axis=1, ddof=1, keepdims=True) > settings.max_sd)
+
+    if settings.test == "grubbs":
+        mean = block.mean(axis=1, keepdims=True)
+        sd = block.std(axis=1, ddof=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            g = np.abs(block - mean) / sd
+        rules["grubbs"] = (g == g.max(axis=1, keepdims=True)) & (g > grubbs_g)
+    elif settings.test == "dixon" and n <= 10:
+        ordered = np.sort(block, axis=1)
+        spread = ordered[:, -1] - ordered[:, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            q_low = (ordered[:, 1] - ordered[:, 0]) / spread
+            q_high = (ordered[:, -1] - ordered[:, -2]) / spread
+        critical = _dixon_critical(n, settings.alpha)
+        low = (q_low > critical) & (q_low >= q_high)
+        high = (q_high > critical) & (q_high > q_low)
+        rules["dixon"] = (low[:, None] & (block == ordered[:, :1])) | (high[:, None] & (block == ordered[:, -1:]))
+    return rules
+
+
+def flag_replicate_outliers(df: pd.DataFrame, settings: Optional[ReplicateQCSettings] = None) -> pd.DataFrame:
+    """Add ``outlier`` and ``outlier_reason`` (e.g. "median, grubbs") to every well row.
+
+    At most ``n - min_replicates`` wells of a group are flagged, those
+    farthest from the group median first; wells tied with one that has to
+    stay are not flagged.
+    """
+    settings = settings or ReplicateQCSettings()
+    if settings.test not in QC_TESTS:
+        raise ValueError(f"Unknown outlier test '{settings.test}'.")
+
+    with stage("flag_replicate_outliers", df) as timing:
+        out = df.copy()
+        out["outlier"] = False
+        out["outlier_reason"] = ""
+        valid = out[REPLICATE_KEYS + ["ct"]].notna().all(axis=1).to_numpy()
+        if not valid.any():
+            return timing.out(out)
+
+        positions = np.flatnonzero(valid)
+        group_ids = out.iloc[positions].groupby(REPLICATE_KEYS, observed=True, sort=True).ngroup().to_numpy()
+        order = np.argsort(group_ids, kind="stable")
+        sorted_ids = group_ids[order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        counts = np.diff(np.r_[starts, len(sorted_ids)])
+        ct = out["ct"].to_numpy(dtype=float)[positions[order]]
+
+        flagged = np.zeros(len(ct), dtype=bool)
+        reasons = np.full(len(ct), "", dtype=object)
+        sizes = np.unique(counts)
+        critical = grubbs_critical(sizes, settings.alpha) if settings.test == "grubbs" else np.full(len(sizes), np.inf)
+        for n, grubbs_g in zip(sizes, critical):
+            sel = starts[counts == n]
+            index = sel[:, None] + np.arange(n)
+            block = ct[index]
+            rules = _block_rules(block, settings, grubbs_g)
+            if not rules:
+                continue
+            hit = np.logical_or.reduce(list(rules.values()))
+
+            # Keep at least min_replicates wells: only the farthest n - min may go,
+            # and only if strictly farther than every kept well, so ties are
+            # never broken by well order.
+            removable = n - settings.min_replicates
+            if removable <= 0:
+                continue
+            if removable < n:
+                distance = np.abs(block - np.median(block, axis=1, keepdims=True))
+                kept_max = -np.sort(-distance, axis=1)[:, removable:removable + 1]
+                hit &= distance > kept_max + TIE_TOLERANCE
+
+            label = np.full(block.shape, "", dtype=object)
+            for name, mask in rules.items():
+                label = np.where(mask, np.where(label == "", name, label + ", " + name), label)
+            flagged[index[hit]] = True
+            reasons[index[hit]] = label[hit]
+
+        rows = positions[order]
+        out.iloc[rows, out.columns.get_loc("outlier")] = flagged
+        out.iloc[rows, out.columns.get_loc("outlier_reason")] = reasons
+        return timing.out(out)
+
+
+def recollapse_groups(collapsed: pd.DataFrame, rows: pd.DataFrame, groups: pd.DataFrame) -> pd.DataFrame:
+    """Re-collapse only the replicate ``groups`` (frame of REPLICATE_KEYS) from ``rows``.
+
+    ``rows`` are the wells to keep; the other collapsed rows pass through,
+    and the result has the same row order as collapsing everything again.
+    """
+    if groups.empty:
+        return collapsed
+    with stage("recollapse_groups", groups) as timing:
+        keys = pd.MultiIndex.from_frame(groups[REPLICATE_KEYS].astype(object))
+        touched_rows = pd.MultiIndex.from_frame(rows[REPLICATE_KEYS].astype(object)).isin(keys)
+        touched_collapsed = pd.MultiIndex.from_frame(collapsed[COLLAPSED_KEYS].astype(object)).isin(keys)
+
+        fresh = collapse_replicates(rows[touched_rows])
+        merged = pd.concat([collapsed[~touched_collapsed], fresh], ignore_index=True)
+        merged = compact_frame(merged, COLLAPSED_KEYS, float32=False)
+        return timing.out(merged.sort_values(COLLAPSED_KEYS, kind="stable", ignore_index=True))
@@ -0,0 +1,181 @@
+# ddct_pipeline/stability.py
+"""Reference-gene stability: geNorm M with stepwise exclusion and NormFinder.
+
+Both work on a samples × genes Ct matrix (Ct is already a log2 scale, so
+differences are log ratios). The geNorm pairwise variations — the SD over
+samples of every gene pair's log ratio — come from one broadcasted
+(samples × genes × genes) operation, chunked over samples to bound memory.
+Stepwise exclusion then only takes means of sub-matrices of that table::
+
+    ranking, variation = genorm(ct_matrix(ct_df))
+    suggested = suggest_reference_genes(ranking, variation)
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ddct_pipeline.instrumentation import stage
+
+PAIRWISE_CUTOFF = 0.15        # geNorm's V(n/n+1) cut-off for adding another gene
+MAX_CHUNK_ELEMENTS = 8_000_000
+
+
+def ct_matrix(ct_df: pd.DataFrame, genes: Optional[list[str]] = None) -> pd.DataFrame:
+    """Collapsed Ct table → samples × genes, keeping samples measured for every gene."""
+    data = ct_df if genes is None else ct_df[ct_df["Gene"].isin(genes)]
+    wide = data.pivot_table(index="Sample ID", columns="Gene", values="Ct", aggfunc="mean", observed=True)
+    wide.columns = pd.Index(wide.columns.astype(object), name="Gene")
+    wide.index = pd.Index(wide.index.astype(object), name="Sample ID")
+    return wide.dropna()
+
+
+def pairwise_variation(matrix: np.ndarray) -> np.ndarray:
+    """genes × genes SD (ddof=1) of every pair's log ratio across samples."""
+    n_samples, n_genes = matrix.shape
+    centered = matrix - matrix.mean(axis=0)
+    squares = np.zeros((n_genes, n_genes))
+    step = max(1, MAX_CHUNK_ELEMENTS // max(1, n_genes * n_genes))
+    for lo in range(0, n_samples, step):
+        part = centered[lo:lo + step]
+        squares += ((part[:, :, None] - part[:, None, :]) ** 2).sum(axis=0)
+    return np.sqrt(squares / max(n_samples - 1, 1))
+
+
+def genorm(matrix: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """geNorm ranking and the pairwise variations V(n/n+1) of normalization factors.
+
+    The ranking has one row per gene, most stable first: ``M`` over the full
+    panel, ``M_excluded`` when the gene was dropped (the last two tie) and
+    ``genorm_rank``.
+    """
+    with stage("stability.genorm", matrix) as timing:
+        genes = list(matrix.columns)
+        values = matrix.to_numpy(dtype=float)
+        v = pairwise_variation(values)
+
+        def m_values(keep: list[int]) -> np.ndarray:
+            sub = v[np.ix_(keep, keep)]
+            return sub.sum(axis=1) / max(len(keep) - 1, 1)
+
+        full_m = m_values(list(range(len(genes))))
+        remaining, excluded, m_at_exclusion = list(range(len(genes))), [], {}
+        while len(remaining) > 2:
+            m = m_values(remaining)
+            worst = int(np.argmax(m))
+            m_at_exclusion[remaining[worst]] = m[worst]
+            excluded.append(remaining.pop(worst))
+        m_at_exclusion.update(zip(remaining, m_values(remaining)))
+
+        order = remaining + excluded[::-1]  # best first
+        ranking = pd.DataFrame({
+            "gene": [genes[i] for i in order],
+            "M": full_m[order],
+            "M_excluded": [m_at_exclusion[i] for i in order],
+            "genorm_rank": np.arange(1, len(order) + 1),
+        })
+
+        # V(n/n+1): SD of log NF_n - log NF_n+1, NF_n = geometric mean of the n best genes.
+        ranked = values[:, order]
+        nf = np.cumsum(ranked, axis=1) / np.arange(1, len(order) + 1)
+        diffs = nf[:, 1:-1] - nf[:, 2:] if len(order) > 2 else np.empty((len(values), 0))
+        variation = pd.Series(
+            diffs.std(axis=0, ddof=1) if len(values) > 1 else np.full(diffs.shape[1], np.nan),
+            index=[f"V{n}/{n + 1}" for n in range(2, len(order))],
+            name="pairwise_variation",
+        )
+        return timing.out(ranking), variation
+
+
+def normfinder(matrix: pd.DataFrame, groups: Optional[pd.Series] = None) -> pd.Series:
+    """NormFinder stability value per gene (lower is more stable).
+
+    ``groups`` maps sample IDs to a group; samples without one, or in a
+    group of one, are left out. With fewer than two such groups all samples
+    form one group, so only the intragroup variation counts. Fewer than
+    three genes give NaN.
+    """
+    with stage("stability.normfinder", matrix) as timing:
+        genes = list(matrix.columns)
+        if len(genes) < 3:
+            return timing.out(pd.Series(np.nan, index=pd.Index(genes, name="gene"), name="normfinder"))
+        labels = None
+        if groups is not None:
+            labels = pd.Series(groups).reindex(matrix.index)
+            labels = labels.where(labels.map(labels.value_counts()) >= 2)
+        if labels is not None and labels.nunique() >= 2:
+            matrix = matrix[labels.notna().to_numpy()]
+            codes, uniques = pd.factorize(labels.dropna(), sort=True)
+        else:
+            codes, uniques = np.zeros(len(matrix), dtype=int), [None]
+        y = matrix.to_numpy(dtype=float)
+        k, n_groups = y.shape[1], len(uniques)
+
+        # Per-group means via a (groups × samples) indicator matrix.
+        onehot = np.zeros((n_groups, len(y)))
+        onehot[codes, np.arange(len(y))] = 1
+        n = onehot.sum(axis=1)
+        gene_group_mean = onehot @ y / n[:, None]          # groups × genes
+        sample_mean = y.mean(axis=1)                       # over genes
+        group_mean = gene_group_mean.mean(axis=1)          # over genes and samples
+
+        residual = y - gene_group_mean[codes] - sample_mean[:, None] + group_mean[codes, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            row_var = onehot @ (residual ** 2) / (n - 1)[:, None]
+            sigma2 = (row_var - row_var.sum(axis=1, keepdims=True) / (k * (k - 1))) / (1 - 2 / k)
+        sigma2 = np.clip(sigma2, 0, None)
+
+        if n_groups < 2:
+            stability = np.sqrt(sigma2[0])
+        else:
+            d = gene_group_mean - gene_group_mean.mean(axis=0) - group_mean[:, None] + gene_group_mean.mean()
+            noise = sigma2 / n[:, None]
+            gamma2 = max(0.0, (d ** 2).sum() / ((n_groups - 1) * (k - 1)) - noise.sum() / (n_groups * k))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                shrink = np.where(gamma2 + noise > 0, gamma2 / (gamma2 + noise), 0.0)
+            posterior_var = shrink * noise
+            stability = (np.abs(shrink * d) + np.sqrt(posterior_var + noise)).mean(axis=0)
+        return timing.out(pd.Series(stability, index=pd.Index(genes, name="gene"), name="normfinder"))
+
+
+def stability_ranking(
+    ct_df: pd.DataFrame,
+    genes: Optional[list[str]] = None,
+    groups: Optional[pd.Series] = None
+) -> tuple[pd.DataFrame, pd.Series, int]:
+    """geNorm and NormFinder side by side, in geNorm order.
+
+    Returns the ranking, geNorm's pairwise variations and the number of
+    samples used (those measured for every candidate gene).
+    """
+    matrix = ct_matrix(ct_df, genes)
+    if matrix.shape[1] < 2 or len(matrix) < 2:
+        empty = pd.DataFrame(columns=["gene", "M", "M_excluded", "genorm_rank", "normfinder", "normfinder_rank"])
+        return empty, pd.Series(dtype=float, name="pairwise_variation"), len(matrix)
+
+    ranking, variation = genorm(matrix)
+    nf = normfinder(matrix, groups)
+    ranking["normfinder"] = nf.reindex(ranking["gene"]).to_numpy()
+    ranking["normfinder_rank"] = ranking["normfinder"].rank(method="min").astype("Int64")
+    return ranking, variation, len(matrix)
+
+
+def suggest_reference_genes(
+    ranking: pd.DataFrame,
+    variation: pd.Series,
+    cutoff: float = PAIRWISE_CUTOFF,
+    min_genes: int = 2,
+    max_genes: Optional[int] = None
+) -> list[str]:
+    """The geNorm-best genes, adding more until V(n/n+1) drops below ``cutoff``.
+
+    At most ``max_genes`` are returned, by default all but one of the ranked
+    genes, so a ranking over the whole panel always leaves a target.
+    """
+    genes = list(ranking.sort_values("genorm_rank")["gene"])
+    if max_genes is None:
+        max_genes = len(genes) - 1
+    # V(n/n+1) below the cut-off: n genes are enough. Never reached: the min_genes best.
+    enough = [n for n, value in enumerate(variation.to_numpy(), start=2) if n >= min_genes and value < cutoff]
+    return genes[:max(0, min(enough[0] if enough else min_genes, max_genes))]
@@ -0,0 +1,264 @@
+# ddct_pipeline/statistics.py
+"""Welch t-tests, one-way ANOVA and p-value adjustment over ΔΔCt results.
+
+Every test is computed for all panels (e.g. every gene × contrast) at once:
+group counts, means and variances come from one groupby and are laid out as
+(panels × levels) arrays, so the test statistics and p-values are plain
+array math. Tail probabilities use a vectorized regularized incomplete beta
+function, so no SciPy is needed::
+
+    pairs = welch_tests(results, "Treatment", by=["gene"], reference="control")
+    anova = anova_oneway(results, "Treatment", by=["gene"])
+"""
+
+from itertools import combinations
+from typing import Literal, Optional
+
+import numpy as np
+import pandas as pd
+
+from ddct_pipeline.instrumentation import stage
+
+VALUE_COLUMN = "ΔΔCt"
+ADJUST_METHODS = ("bh", "holm", "none")
+
+_LANCZOS_G = 7
+_LANCZOS = np.array([
+    0.99999999999980993, 676.5203681218851, -1259.1392167224028,
+    771.32342877765313, -176.61502916214059, 12.507343278686905,
+    -0.13857109526572012, 9.9843695780195716e-6, 1.5056327351493116e-7,
+])
+_CF_MAX_ITER = 500
+_CF_EPS = 1e-15
+_FPMIN = 1e-300
+
+
+# --- Distributions ---
+
+def _lgamma(x: np.ndarray) -> np.ndarray:
+    """log Γ(x) for x > 0 (Lanczos approximation, ~1e-15 relative)."""
+    x = np.asarray(x, dtype=float)
+    small = x < 0.5
+    z = np.where(small, 1 - x, x) - 1
+    series = _LANCZOS[0] + sum(c / (z + i) for i, c in enumerate(_LANCZOS[1:], 1))
+    t = z + _LANCZOS_G + 0.5
+    lg = 0.5 * np.log(2 * np.pi) + (z + 0.5) * np.log(t) - t + np.log(series)
+    # Reflection for x < 0.5: Γ(x)Γ(1-x) = π / sin(πx)
+    return np.where(small, np.log(np.pi / np.abs(np.sin(np.pi * x))) - lg, lg)
+
+
+def _beta_cf(a: np.ndarray, b: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Continued fraction of the incomplete beta function (modified Lentz)."""
+    def guard(v):
+        return np.where(np.abs(v) < _FPMIN, _FPMIN, v)
+
+    qab, qap, qam = a + b, a + 1, a - 1
+    c = np.ones_like(x)
+    d = 1 / guard(1 - qab * x / qap)
+    h = d.copy()
+    for m in range(1, _CF_MAX_ITER + 1):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1 / guard(1 + aa * d)
+        c = guard(1 + aa / c)
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1 / guard(1 + aa * d)
+        c = guard(1 + aa / c)
+        delta = d * c
+        h *= delta
+        if np.all(np.abs(delta - 1) < _CF_EPS):
+            break
+    return h
+
+
+def betainc(a, b, x) -> np.ndarray:
+    """Regularized incomplete beta function I_x(a, b), elementwise; NaN where undefined."""
+    a, b, x = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (a, b, x)))
+    out = np.full(a.shape, np.nan)
+    valid = (a > 0) & (b > 0) & (x >= 0) & (x <= 1)
+    out[valid & (x == 0)] = 0.0
+    out[valid & (x == 1)] = 1.0
+
+    inner = valid & (x > 0) & (x < 1)
+    if inner.any():
+        a, b, x = a[inner], b[inner], x[inner]
+        # The continued fraction converges fast for x < (a+1)/(a+b+2);
+        # use I_x(a, b) = 1 - I_{1-x}(b, a) on the other side.
+        swap = x > (a + 1) / (a + b + 2)
+        aa, bb = np.where(swap, b, a), np.where(swap, a, b)
+        xx = np.where(swap, 1 - x, x)
+        log_front = (aa * np.log(xx) + bb * np.log1p(-xx)
+                     - (_lgamma(aa) + _lgamma(bb) - _lgamma(aa + bb)) - np.log(aa))
+        value = np.exp(log_front) * _beta_cf(aa, bb, xx)
+        out[inner] = np.where(swap, 1 - value, value)
+    return out
+
+
+def t_sf_two_sided(t, df) -> np.ndarray:
+    """P(|T| ≥ |t|) for Student's t with ``df`` (possibly fractional) degrees of freedom."""
+    t, df = np.asarray(t, dtype=float), np.asarray(df, dtype=float)
+    return betainc(df / 2, 0.5, df / (df + t * t))
+
+
+def f_sf(f, df1, df2) -> np.ndarray:
+    """P(F ≥ f) for the F distribution."""
+    f, df1, df2 = (np.asarray(v, dtype=float) for v in (f, df1, df2))
+    return betainc(df2 / 2, df1 / 2, df2 / (df2 + df1 * np.maximum(f, 0)))
+
+
+# --- Multiple testing ---
+
+def adjust_pvalues(p, method: Literal["bh", "holm", "none"] = "bh") -> np.ndarray:
+    """Benjamini-Hochberg or Holm adjusted p-values; NaNs are left out of the family."""
+    p = np.asarray(p, dtype=float)
+    if method == "none":
+        return p.copy()
+    if method not in ADJUST_METHODS:
+        raise ValueError(f"Unknown p-value adjustment '{method}'.")
+
+    out = np.full(p.shape, np.nan)
+    ok = np.flatnonzero(~np.isnan(p))
+    m = len(ok)
+    if not m:
+        return out
+
+    order = ok[np.argsort(p[ok], kind="stable")]
+    ranked = p[order]
+    if method == "bh":
+        scaled = ranked * m / np.arange(1, m + 1)
+        adjusted = np.minimum.accumulate(scaled[::-1])[::-1]
+    else:
+        adjusted = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    out[order] = np.minimum(adjusted, 1.0)
+    return out
+
+
+# --- Group summaries ---
+
+def _group_arrays(
+    df: pd.DataFrame,
+    group: str,
+    by: list[str],
+    value: str,
+    levels: Optional[list]
+) -> tuple[pd.DataFrame, list, dict[str, np.ndarray]]:
+    """(panels × levels) arrays of n, mean and variance; panels come back as a key frame."""
+    by = [k for k in by if k in df.columns and k != group]
+    data = df.dropna(subset=[value, group])
+    panel_cols = by or ["_panel"]
+    if not by:
+        data = data.assign(_panel=0)
+    stats = data.groupby(panel_cols + [group], observed=True, sort=True)[value].agg(["count", "mean", "var"])
+
+    # Requested order first; levels it doesn't mention follow in sorted order.
+    present = set(stats.index.get_level_values(group))
+    order = [lv for lv in levels or [] if lv in present]
+    levels = order + sorted(present - set(order), key=str)
+
+    wide = stats.unstack(group)
+    arrays = {
+        stat: wide[stat].reindex(columns=levels).to_numpy(dtype=float)
+        for stat in ("count", "mean", "var")
+    }
+    arrays["count"] = np.nan_to_num(arrays["count"])
+    keys = wide.index.to_frame(index=False)[by]
+    return keys, levels, arrays
+
+
+def welch_tests(
+    df: pd.DataFrame,
+    group: str,
+    by: Optional[list[str]] = None,
+    value: str = VALUE_COLUMN,
+    reference: Optional[str] = None,
+    levels: Optional[list] = None,
+    adjust: Literal["bh", "holm", "none"] = "bh"
+) -> pd.DataFrame:
+    """Welch two-sample t-tests between levels of ``group`` within every ``by`` panel.
+
+    Compares each level against ``reference`` if given, otherwise all pairs.
+    ``difference`` is ``mean_2 - mean_1``; ``p_adj`` is adjusted over the
+    whole table.
+    """
+    with stage("statistics.welch", df) as timing:
+        keys, levels, arr = _group_arrays(df, group, by or [], value, levels)
+        if reference is not None and reference in levels:
+            ref = levels.index(reference)
+            pairs = [(ref, j) for j in range(len(levels)) if j != ref]
+        else:
+            pairs = list(combinations(range(len(levels)), 2))
+
+        columns = [*keys.columns, "group_1", "group_2", "n_1", "n_2", "mean_1", "mean_2",
+                   "difference", "t", "df", "p", "p_adj"]
+        if not pairs or not len(keys):
+            return timing.out(pd.DataFrame(columns=columns))
+
+        i, j = np.array(pairs).T
+        n1, n2 = arr["count"][:, i], arr["count"][:, j]
+        m1, m2 = arr["mean"][:, i], arr["mean"][:, j]
+        w1, w2 = arr["var"][:, i] / n1, arr["var"][:, j] / n2
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            se2 = w1 + w2
+            t = (m2 - m1) / np.sqrt(se2)
+            dof = se2 ** 2 / (w1 ** 2 / (n1 - 1) + w2 ** 2 / (n2 - 1))
+        testable = (n1 >= 2) & (n2 >= 2) & (se2 > 0)
+        t, dof = np.where(testable, t, np.nan), np.where(testable, dof, np.nan)
+        p = np.full(t.shape, np.nan)
+        p[testable] = t_sf_two_sided(t[testable], dof[testable])
+
+        n_panels, n_pairs = t.shape
+        out = keys.loc[keys.index.repeat(n_pairs)].reset_index(drop=True)
+        lv = np.asarray(levels, dtype=object)
+        out["group_1"] = np.tile(lv[i], n_panels)
+        out["group_2"] = np.tile(lv[j], n_panels)
+        for name, values in [("n_1", n1), ("n_2", n2), ("mean_1", m1), ("mean_2", m2),
+                             ("difference", m2 - m1), ("t", t), ("df", dof), ("p", p)]:
+            out[name] = values.ravel()
+        out[["n_1", "n_2"]] = out[["n_1", "n_2"]].astype(int)
+        out = out[(out["n_1"] > 0) & (out["n_2"] > 0)].reset_index(drop=True)
+        out["p_adj"] = adjust_pvalues(out["p"].to_numpy(), adjust)
+        return timing.out(out)
+
+
+def anova_oneway(
+    df: pd.DataFrame,
+    group: str,
+    by: Optional[list[str]] = None,
+    value: str = VALUE_COLUMN,
+    levels: Optional[list] = None,
+    adjust: Literal["bh", "holm", "none"] = "bh"
+) -> pd.DataFrame:
+    """One-way ANOVA across the levels of ``group`` within every ``by`` panel."""
+    with stage("statistics.anova", df) as timing:
+        keys, levels, arr = _group_arrays(df, group, by or [], value, levels)
+        if not len(keys) or not levels:
+            return timing.out(pd.DataFrame(columns=[*keys.columns, "groups", "n", "F",
+                                                    "df_between", "df_within", "p", "p_adj"]))
+
+        n, mean = arr["count"], np.nan_to_num(arr["mean"])
+        var = np.nan_to_num(arr["var"])  # single-observation groups add no within-group spread
+        k = (n > 0).sum(axis=1)
+        total = n.sum(axis=1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            grand = (n * mean).sum(axis=1) / total
+            ss_between = (n * (mean - grand[:, None]) ** 2).sum(axis=1)
+            ss_within = ((n - 1).clip(min=0) * var).sum(axis=1)
+            df1, df2 = k - 1, total - k
+            f = (ss_between / df1) / (ss_within / df2)
+        testable = (df1 >= 1) & (df2 >= 1) & (ss_within > 0)
+        f = np.where(testable, f, np.nan)
+        p = np.full(f.shape, np.nan)
+        p[testable] = f_sf(f[testable], df1[testable], df2[testable])
+
+        out = keys.copy()
+        out["groups"] = k
+        out["n"] = total.astype(int)
+        out["F"] = f
+        out["df_between"] = df1
+        out["df_within"] = df2.astype(int)
+        out["p"] = p
+        out["p_adj"] = adjust_pvalues(p, adjust)
+        return timing.out(out)
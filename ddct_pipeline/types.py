@@ -1,7 +1,7 @@
 # ddct_pipeline/types.py
 
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 @dataclass
 class CtRow:
@@ -14,3 +14,60 @@ class CtRow:
 class GroupingVariable:
     name: str
     values: List[str]
+
+@dataclass
+class MetadataSheetReport:
+    matched: int
+    unmatched_samples: List[str]          # in the sheet, not in the Ct table
+    missing_samples: List[str]            # in the Ct table, not in the sheet
+    invalid_values: Dict[str, List[str]]  # variable → values not in GroupingVariable.values
+    missing_columns: List[str]
+    ignored_columns: List[str]
+
+@dataclass
+class RenameRule:
+    column: str        # "Sample ID" or "Gene"
+    pattern: str
+    replacement: str
+    kind: str = "prefix"  # "exact", "prefix" or "regex"
+
+@dataclass
+class Contrast:
+    grouping: str                     # grouping variable holding the baseline
+    condition: str                    # baseline value of that variable
+    genes: Optional[List[str]] = None  # restrict to these genes (default: all)
+
+    @property
+    def label(self) -> str:
+        scope = f" [{', '.join(self.genes)}]" if self.genes else ""
+        return f"{self.grouping}: {self.condition}{scope}"
+
+@dataclass
+class BootstrapSettings:
+    resamples: int = 10_000
+    confidence: float = 0.95
+    seed: int = 0
+    max_workers: Optional[int] = None  # None: pool only for large jobs; 1: in-process
+
+@dataclass
+class CtCallSettings:
+    method: str = "threshold"          # "threshold" crossing or "sdm" (second-derivative maximum)
+    threshold: Optional[float] = None  # on baseline-subtracted signal; None: auto from baseline noise
+    threshold_sd: float = 10.0         # auto threshold = this × median baseline SD across all wells
+    baseline_start: int = 3
+    baseline_end: int = 15
+
+@dataclass
+class MeltQCSettings:
+    smoothing: int = 3               # moving-average width of -dF/dT, in readings
+    min_peak_height: float = 0.2     # peaks below this fraction of the well's (or typical well's) tallest are ignored
+    min_separation: float = 2.0      # °C; of two closer peaks only the taller counts
+    tm_tolerance: float = 1.5        # °C from the target's median Tm before a well is flagged
+
+@dataclass
+class ReplicateQCSettings:
+    max_deviation: Optional[float] = 0.5  # cycles from the group median (groups of 3+)
+    max_sd: Optional[float] = None        # above this SD the replicate farthest from the median goes
+    test: str = "none"                    # "grubbs", "dixon" or "none"
+    alpha: float = 0.05                   # test level (Dixon: 0.1, 0.05 or 0.01)
+    min_replicates: int = 2               # never flag a group below this many wells
@@ -2,10 +2,18 @@
 import pandas as pd
 
 def validate_rows(rows, config) -> list[str]:
-    errors = []
-    genes = set(r.gene for r in rows)
-    samples = set(r.sample_id for r in rows)
+    errors = validate_config(set(r.gene for r in rows), config)
+
+    for row in rows:
+        if row.ct is None or pd.isna(row.ct):
+            errors.append(f"Missing Ct value for sample '{row.sample_id}', gene '{row.gene}'")
+
+    return errors
+
 
+def validate_config(genes, config) -> list[str]:
+    """Reference genes, condition and contrasts checked against the measured genes."""
+    errors = []
     for ref_gene in config["reference_genes"]:
         if ref_gene not in genes:
             errors.append(f"Missing reference gene: {ref_gene}")
@@ -15,8 +23,11 @@ def validate_rows(rows, config) -> list[str]:
     if ref_cond not in config["groups"].get(grouping_var, []):
         errors.append(f"Reference condition '{ref_cond}' not found in group '{grouping_var}'")
 
-    for row in rows:
-        if row.ct is None or pd.isna(row.ct):
-            errors.append(f"Missing Ct value for sample '{row.sample_id}', gene '{row.gene}'")
+    for contrast in config.get("contrasts") or []:
+        if contrast.condition not in config["groups"].get(contrast.grouping, []):
+            errors.append(f"Contrast '{contrast.label}': '{contrast.condition}' not found in group '{contrast.grouping}'")
+        missing = [g for g in contrast.genes or [] if g not in genes]
+        if missing:
+            errors.append(f"Contrast '{contrast.label}': unknown gene(s) {', '.join(missing)}")
 
     return errors
@@ -0,0 +1,127 @@
+# interface/backend/session_archive.py
+"""Compact session files: a zip holding a JSON manifest plus Parquet tables.
+
+Layout::
+
+    manifest.json        format/version, experiment_config, sample_metadata, table index
+    ct_data.parquet      st.session_state["ct_data_df"]
+    ddct_results.parquet st.session_state["ddct_results_df"] (if computed)
+
+Tables are streamed straight into/out of the zip members and load as
+DataFrames without building a Python object per row. Tables Arrow cannot
+represent (e.g. mixed-type object columns) fall back to a JSON member.
+"""
+
+import json
+import zipfile
+from dataclasses import asdict, is_dataclass
+from typing import IO, Any, Mapping
+
+import pandas as pd
+import pyarrow as pa
+
+from ddct_pipeline.types import Contrast, GroupingVariable
+
+FORMAT_NAME = "ddct-session"
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+# session_state key → archive member stem
+TABLES = {
+    "ct_data_df": "ct_data",
+    "ddct_results_df": "ddct_results",
+}
+
+
+def is_session_archive(head: bytes) -> bool:
+    return head[:4] == b"PK\x03\x04"
+
+
+def _config_to_json(config: Mapping[str, Any]) -> dict:
+    config = dict(config)  # never mutate the live session config
+    config["grouping_variables"] = [
+        asdict(gv) if is_dataclass(gv) else gv
+        for gv in config.get("grouping_variables", [])
+    ]
+    if "contrasts" in config:
+        config["contrasts"] = [asdict(c) if is_dataclass(c) else c for c in config["contrasts"]]
+    return config
+
+
+def _config_from_json(config: dict) -> dict:
+    config = dict(config)
+    config["grouping_variables"] = [
+        GroupingVariable(**gv) if isinstance(gv, dict) else gv
+        for gv in config.get("grouping_variables", [])
+    ]
+    if "contrasts" in config:
+        config["contrasts"] = [Contrast(**c) if isinstance(c, dict) else c for c in config["contrasts"]]
+    return config
+
+
+def _write_table(zf: zipfile.ZipFile, stem: str, df: pd.DataFrame) -> dict:
+    name = f"{stem}.parquet"
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        name = f"{stem}.json"
+        info = zipfile.ZipInfo(name)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with zf.open(info, "w", force_zip64=True) as fh:
+            fh.write(df.to_json(orient="split", index=False, force_ascii=False).encode())
+        return {"member": name, "format": "json", "rows": len(df)}
+
+    import pyarrow.parquet as pq
+    # Parquet is already compressed; store the member uncompressed.
+    with zf.open(zipfile.ZipInfo(name), "w", force_zip64=True) as fh:
+        pq.write_table(table, fh, compression="zstd")
+    return {"member": name, "format": "parquet", "rows": len(df)}
+
+
+def _read_table(zf: zipfile.ZipFile, entry: dict) -> pd.DataFrame:
+    with zf.open(entry["member"]) as fh:
+        if entry["format"] == "parquet":
+            import pyarrow.parquet as pq
+            return pq.read_table(fh).to_pandas()
+        return pd.read_json(fh, orient="split", dtype=False)
+
+
+def write_session_archive(fh: IO[bytes], state: Mapping[str, Any]):
+    """Stream the session tables and manifest into a binary file handle."""
+    tables = {}
+    with zipfile.ZipFile(fh, "w", compression=zipfile.ZIP_STORED) as zf:
+        for key, stem in TABLES.items():
+            df = state.get(key)
+            if isinstance(df, pd.DataFrame):
+                tables[key] = _write_table(zf, stem, df)
+
+        manifest = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "experiment_config": _config_to_json(state.get("experiment_config", {})),
+            "sample_metadata": state.get("sample_metadata", {}),
+            "tables": tables,
+        }
+        zf.writestr(
+            MANIFEST,
+            json.dumps(manifest, indent=2, ensure_ascii=False, default=str),
+            compress_type=zipfile.ZIP_DEFLATED
+        )
+
+
+def read_session_archive(fh: IO[bytes]) -> dict[str, Any]:
+    """Return the session_state entries stored in an archive."""
+    with zipfile.ZipFile(fh) as zf:
+        manifest = json.loads(zf.read(MANIFEST))
+        if manifest.get("format") != FORMAT_NAME:
+            raise ValueError("Not a ΔΔCt session file.")
+        if manifest.get("version", 0) > FORMAT_VERSION:
+            raise ValueError(f"Session file version {manifest['version']} is newer than this app supports.")
+
+        state = {
+            "experiment_config": _config_from_json(manifest.get("experiment_config", {})),
+            "sample_metadata": manifest.get("sample_metadata", {}),
+        }
+        for key, entry in manifest.get("tables", {}).items():
+            state[key] = _read_table(zf, entry)
+    return state
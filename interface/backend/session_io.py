@@ -1,13 +1,16 @@
 # interface/backend/session_io.py
 
+import io
 import json
 import streamlit as st
 from typing import Any, Dict
-from ddct_pipeline.types import CtRow, GroupingVariable
-from ddct_pipeline.converters import rows_to_df, df_to_rows
+from ddct_pipeline.types import Contrast, CtRow, GroupingVariable
 
 from interface.backend.session_schema import ExperimentConfig
 
+# converters and session_archive pull in pandas/pyarrow; this module is
+# imported by streamlit_app on every cold start, so they load on first use.
+
 # --- Core Session State Keys ---
 STATE_KEYS = {
     "experiment_config",
@@ -16,25 +19,9 @@ STATE_KEYS = {
     "ddct_results_df"
 }
 
-def serialize_session() -> Dict[str, Any]:
-    """Convert session state to a JSON-safe dict."""
-    config = st.session_state.get("experiment_config", {})
-    grouping_vars = [
-        gv.__dict__ if isinstance(gv, GroupingVariable) else gv
-        for gv in config.get("grouping_variables", [])
-    ]
-    config["grouping_variables"] = grouping_vars
-
-    session = {
-        "experiment_config": config,
-        "ct_rows": [r.__dict__ for r in df_to_rows(st.session_state.get("ct_data_df", rows_to_df([])))],
-    }
-    return session
-
-
 def deserialize_session(data: Dict[str, Any]):
-    """Restore session state from a previously exported session dict."""
-
+    """Restore session state from a legacy JSON session dict."""
+    from ddct_pipeline.converters import rows_to_df
 
     config: ExperimentConfig = data.get("experiment_config", {})
 
@@ -43,6 +30,8 @@ def deserialize_session(data: Dict[str, Any]):
             GroupingVariable(**gv) if isinstance(gv, dict) else gv
             for gv in config["grouping_variables"]
         ]
+    if "contrasts" in config:
+        config["contrasts"] = [Contrast(**c) if isinstance(c, dict) else c for c in config["contrasts"]]
     st.session_state["experiment_config"] = config
 
     ct_rows = [CtRow(**r) for r in data.get("ct_rows", [])]
@@ -51,25 +40,46 @@ def deserialize_session(data: Dict[str, Any]):
     st.rerun()
 
 
+def export_session_archive() -> bytes:
+    from interface.backend.session_archive import write_session_archive
+
+    buffer = io.BytesIO()
+    write_session_archive(buffer, st.session_state)
+    return buffer.getvalue()
+
+
+def import_session_archive(fh):
+    """Restore session state from a ``.ddct`` archive (see session_archive)."""
+    from interface.backend.session_archive import read_session_archive
+
+    for key, value in read_session_archive(fh).items():
+        st.session_state[key] = value
+    st.toast("Session imported.", icon="📥")
+    st.rerun()
+
+
 def session_export_button():
     if st.button("Export", use_container_width=True):
-        session_data = serialize_session()
         st.download_button(
-            label="Download JSON",
-            data=json.dumps(session_data, indent=2),
-            file_name="ddct_session.json",
-            mime="application/json",
+            label="Download session",
+            data=export_session_archive(),
+            file_name="ddct_session.ddct",
+            mime="application/zip",
             use_container_width=True
         )
 
 
 @st.dialog("Import Session")
 def session_import_dialog():
-    uploaded = st.file_uploader("Upload session JSON", type="json")
+    uploaded = st.file_uploader("Upload session (.ddct, or legacy .json)", type=["ddct", "zip", "json"])
     if uploaded:
         try:
-            data = json.load(uploaded)
-            deserialize_session(data)
+            from interface.backend.session_archive import is_session_archive
+
+            if is_session_archive(uploaded.getvalue()[:4]):
+                import_session_archive(uploaded)
+            else:
+                deserialize_session(json.load(uploaded))
         except Exception as e:
             st.error(f"Failed to load session: {e}")
 
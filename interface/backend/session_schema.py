@@ -1,7 +1,7 @@
 # interface/backend/session_schema.py
 
-from typing import TypedDict
-from ddct_pipeline.types import GroupingVariable
+from typing import NotRequired, TypedDict
+from ddct_pipeline.types import Contrast, GroupingVariable
 
 class ExperimentConfig(TypedDict):
     genes: list[str]
@@ -10,3 +10,4 @@ class ExperimentConfig(TypedDict):
     reference_grouping: str
     reference_condition: str
     groups: dict[str, list[str]]
+    contrasts: NotRequired[list[Contrast]]  # batch baselines; empty → reference_condition only
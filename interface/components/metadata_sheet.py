@@ -0,0 +1,80 @@
+# interface/components/metadata_sheet.py
+
+import streamlit as st
+import pandas as pd
+
+from ddct_pipeline.metadata import (
+    SAMPLE_ID_COLUMN,
+    merge_metadata_sheet,
+    metadata_frame,
+    read_metadata_sheet,
+    validate_metadata_sheet,
+)
+
+PREVIEW_LIMIT = 20
+
+
+def _preview(items: list[str]) -> str:
+    more = f" … (+{len(items) - PREVIEW_LIMIT} more)" if len(items) > PREVIEW_LIMIT else ""
+    return ", ".join(map(str, items[:PREVIEW_LIMIT])) + more
+
+
+def _template_csv(sample_ids, grouping_vars) -> bytes:
+    """Current metadata as a sheet, one row per sample, ready to fill in."""
+    names = [gv.name for gv in grouping_vars if gv.name != "Samples"]
+    ids = pd.Index(pd.unique(pd.Series(sample_ids, dtype=object)), name=SAMPLE_ID_COLUMN)
+    table = metadata_frame(st.session_state.get("sample_metadata", {}), names).reindex(ids)
+    return table.reset_index().to_csv(index=False).encode()
+
+
+def metadata_sheet_import(ct_df: pd.DataFrame, grouping_vars, key: str) -> bool:
+    """Upload a CSV/Excel sheet keyed by "Sample ID" and merge it into the session metadata.
+
+    Returns True once a sheet has been applied.
+    """
+    sample_ids = ct_df["Sample ID"]
+
+    with st.expander("📄 Import metadata sheet"):
+        st.caption(
+            f"CSV/TSV/Excel with a '{SAMPLE_ID_COLUMN}' column and one column per grouping variable. "
+            "Blank cells keep the current value."
+        )
+        st.download_button(
+            "Download template",
+            _template_csv(sample_ids, grouping_vars),
+            file_name="sample_metadata.csv",
+            mime="text/csv",
+            key=f"{key}_template"
+        )
+        uploaded = st.file_uploader(
+            "Metadata sheet", type=["csv", "tsv", "txt", "xls", "xlsx"], key=f"{key}_upload"
+        )
+        if uploaded is None:
+            return False
+
+        try:
+            sheet = read_metadata_sheet(uploaded)
+        except ValueError as e:
+            st.error(str(e))
+            return False
+
+        report = validate_metadata_sheet(sheet, grouping_vars, sample_ids)
+        st.info(f"{report.matched} of {sample_ids.nunique()} samples matched.")
+        if report.unmatched_samples:
+            st.warning(f"Not in the Ct data (ignored): {_preview(report.unmatched_samples)}")
+        if report.missing_samples:
+            st.warning(f"No row in the sheet: {_preview(report.missing_samples)}")
+        if report.missing_columns:
+            st.warning(f"Missing column(s): {', '.join(report.missing_columns)}")
+        if report.ignored_columns:
+            st.caption(f"Ignored column(s): {', '.join(report.ignored_columns)}")
+        for name, values in report.invalid_values.items():
+            st.error(f"**{name}**: value(s) not defined for this variable: {_preview(values)}")
+
+        if st.button("Apply sheet", disabled=bool(report.invalid_values) or not report.matched, key=f"{key}_apply"):
+            st.session_state["sample_metadata"] = merge_metadata_sheet(
+                st.session_state.get("sample_metadata", {}), sheet, grouping_vars, sample_ids
+            )
+            st.toast(f"Metadata applied to {report.matched} samples.", icon="✅")
+            return True
+    return False
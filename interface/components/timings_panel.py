@@ -0,0 +1,51 @@
+# interface/components/timings_panel.py
+
+import streamlit as st
+
+
+SESSION_FRAMES = {"ct_data_df": "Ct data", "ddct_results_df": "ΔΔCt results"}
+
+
+def render_timings_panel():
+    """Sidebar panel with the stage timings recorded on the previous run."""
+    with st.expander("Performance"):
+        st.checkbox("Store Ct as float32 (less memory, ~1e-5 precision)", key="float32_ct")
+        st.checkbox("Record stage timings", key="record_stage_timings")
+        st.checkbox("Track peak memory (slower)", key="track_stage_memory",
+                    disabled=not st.session_state.get("record_stage_timings"))
+
+        if st.session_state.get("record_stage_timings"):
+            _render_frame_memory()
+
+        records = st.session_state.get("stage_timings")
+        if not records:
+            st.caption("No stages recorded yet.")
+            return
+
+        rows = [{
+            "Stage": "  " * r.depth + r.stage,
+            "ms": round(r.seconds * 1000, 1),
+            "Rows in": r.rows_in,
+            "Rows out": r.rows_out,
+            "Peak MiB": None if r.peak_bytes is None else round(r.peak_bytes / 2**20, 2),
+        } for r in records]
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+
+
+def _render_frame_memory():
+    from ddct_pipeline.dtypes import format_bytes, memory_report
+
+    rows = []
+    for key, label in SESSION_FRAMES.items():
+        df = st.session_state.get(key)
+        if df is None:
+            continue
+        report = memory_report(df)
+        rows.append({
+            "Table": label,
+            "Memory": format_bytes(report["bytes"]),
+            "As strings/float64": format_bytes(report["plain_bytes"]),
+            "Saved": format_bytes(report["saved_bytes"]),
+        })
+    if rows:
+        st.dataframe(rows, hide_index=True, use_container_width=True)
@@ -3,8 +3,8 @@
 import streamlit as st
 import pandas as pd
 
-from ddct_pipeline.processor import process_ddct
-from ddct_pipeline.converters import df_to_rows
+from ddct_pipeline.incremental import IncrementalDDCT
+from interface.components.metadata_sheet import metadata_sheet_import
 
 def run():
     st.title("Assign Sample Metadata")
@@ -21,6 +21,8 @@ def run():
         st.info("No grouping variables configured.")
         return
 
+    metadata_sheet_import(df, grouping_vars, key="entry_meta_sheet")
+
     # Group by sample → list genes per sample
     sample_genes = df.groupby("Sample ID")["Gene"].unique().apply(list)
 
@@ -64,35 +66,19 @@ def run():
     )
 
     if st.button("💾 Save Metadata"):
-        sample_meta = {}
-        for _, row in edited.iterrows():
-            sid = row["Sample ID"]
-            sample_meta[sid] = {gv.name: row[gv.name] for gv in grouping_vars}
-        st.session_state["sample_metadata"] = sample_meta
+        names = [gv.name for gv in grouping_vars]
+        st.session_state["sample_metadata"] = edited.set_index("Sample ID")[names].to_dict("index")
         st.toast("Sample metadata updated.", icon="✅")
 
 
 
     if st.button("Run ΔΔCt Analysis", type="primary"):
-        df = st.session_state.get("ct_data_df").copy()
-
-        # Rename expected fields
-        df = df.rename(columns={
-            "Sample ID": "sample_id",
-            "Gene": "gene",
-            "Ct": "ct"
-        })
-
-        # Ensure 'ct' is numeric
-        df["ct"] = pd.to_numeric(df["ct"], errors="coerce")
-
-        # Merge in sample metadata if available
-        metadata = st.session_state.get("sample_metadata", {})
-        for gv in grouping_vars:
-            df[gv.name] = df["sample_id"].map(lambda sid: metadata.get(sid, {}).get(gv.name, None))
-
-        rows = df_to_rows(df)
-        result_df = process_ddct(rows, st.session_state["experiment_config"])
+        engine = st.session_state.setdefault("ddct_engine", IncrementalDDCT())
+        result_df = engine.run(
+            st.session_state.get("ct_data_df"),
+            st.session_state["experiment_config"],
+            st.session_state.get("sample_metadata", {})
+        )
         st.session_state["ddct_results_df"] = result_df
         st.success("ΔΔCt results computed.")
 
@@ -1,9 +1,224 @@
+import hashlib
+
 import streamlit as st
 import pandas as pd
+from typing import Optional
 
 from interface.components.excel_dialog import show_excel_import_dialog
-from ddct_pipeline.converters import parse_excel_ct_file, collapse_replicates
-from ddct_pipeline.types import GroupingVariable
+from ddct_pipeline.cache import get_default_cache, read_file_bytes
+from ddct_pipeline.converters import REPLICATE_KEYS, collapse_replicates
+from ddct_pipeline.ct_calling import CT_METHODS, call_ct_frame
+from ddct_pipeline.dtypes import compact_frame, format_bytes, memory_report
+from ddct_pipeline.melt import attach_melt_qc, melt_qc
+from ddct_pipeline.parallel import parse_files_parallel, concat_results
+from ddct_pipeline.renaming import RENAME_KINDS, check_rules, recollapse_replicates, rename_labels, valid_rules
+from ddct_pipeline.replicate_qc import QC_TESTS, flag_replicate_outliers, recollapse_groups
+from ddct_pipeline.types import CtCallSettings, GroupingVariable, MeltQCSettings, RenameRule, ReplicateQCSettings
+
+
+RULE_COLUMNS = ["Column", "Match", "Pattern", "Replace with"]
+
+
+def _mapping_editor(labels: pd.Series, key: str) -> dict:
+    """One row per distinct label; returns ``{old: new}`` for edited rows."""
+    names = pd.Index(labels.astype("category").cat.categories, dtype=object)
+    table = pd.DataFrame({"From": names.astype(str), "To": names.astype(str)})
+    edited = st.data_editor(
+        table,
+        column_config={"From": st.column_config.TextColumn("From", disabled=True)},
+        use_container_width=True,
+        hide_index=True,
+        key=key
+    )
+    new = edited["To"].fillna("").str.strip()
+    changed = (new != "") & (new != table["To"])
+    return dict(zip(names[changed.to_numpy()], new[changed]))
+
+
+def _rules_editor(key: str) -> list[RenameRule]:
+    edited = st.data_editor(
+        pd.DataFrame(columns=RULE_COLUMNS),
+        column_config={
+            "Column": st.column_config.SelectboxColumn(options=["Sample ID", "Gene"], default="Sample ID", required=True),
+            "Match": st.column_config.SelectboxColumn(options=list(RENAME_KINDS), default="prefix", required=True),
+            "Pattern": st.column_config.TextColumn(),
+            "Replace with": st.column_config.TextColumn(default=""),
+        },
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        key=key
+    )
+    rows = edited.astype(object).where(edited.notna(), "").to_dict("records")
+    return [
+        RenameRule(column=r["Column"], pattern=r["Pattern"], replacement=r["Replace with"], kind=r["Match"])
+        for r in rows
+        if r["Column"] and r["Match"] and r["Pattern"]
+    ]
+
+
+def _ct_call_settings() -> Optional[CtCallSettings]:
+    """Ct source controls; returns settings when Ct should be re-called from curves."""
+    source = st.radio(
+        "Ct values",
+        ["Instrument (Results sheet)", "Call from amplification curves"],
+        horizontal=True,
+        help="Re-calling applies one baseline and threshold to every run, whichever instrument produced it."
+    )
+    if source.startswith("Instrument"):
+        return None
+
+    col_method, col_start, col_end, col_threshold = st.columns(4)
+    with col_method:
+        method = st.selectbox(
+            "Method", CT_METHODS,
+            format_func={"threshold": "Threshold crossing", "sdm": "Second-derivative maximum"}.get
+        )
+    with col_start:
+        start = st.number_input("Baseline from cycle", min_value=1, value=3)
+    with col_end:
+        end = st.number_input("Baseline to cycle", min_value=int(start) + 1, value=max(15, int(start) + 1))
+    with col_threshold:
+        threshold = st.number_input(
+            "Threshold (0 = auto)", min_value=0.0, value=0.0, format="%.4f",
+            help="On baseline-subtracted fluorescence. Auto uses 10× the median baseline SD of all wells."
+        )
+    return CtCallSettings(
+        method=method,
+        threshold=threshold or None,
+        baseline_start=int(start),
+        baseline_end=int(end)
+    )
+
+
+def _melt_qc_settings() -> tuple[Optional[MeltQCSettings], bool]:
+    """Melt-curve QC controls; returns (settings or None when off, exclude flagged wells)."""
+    if not st.checkbox("Melt-curve QC", help="Read the 'Melt Curve Raw Data' sheets and flag non-specific wells."):
+        return None, False
+    col_height, col_separation, col_tolerance, col_exclude = st.columns(4)
+    with col_height:
+        height = st.number_input("Min. peak height", min_value=0.01, max_value=1.0, value=0.2, step=0.05,
+                                 help="Fraction of the tallest -dF/dT peak.")
+    with col_separation:
+        separation = st.number_input("Min. peak separation (°C)", min_value=0.1, value=2.0, step=0.5)
+    with col_tolerance:
+        tolerance = st.number_input("Tm tolerance (°C)", min_value=0.1, value=1.5, step=0.5,
+                                    help="Allowed distance from the target's median Tm.")
+    with col_exclude:
+        exclude = st.checkbox("Exclude flagged wells", value=True)
+    settings = MeltQCSettings(min_peak_height=height, min_separation=separation, tm_tolerance=tolerance)
+    return settings, exclude
+
+
+def _apply_melt_qc(files, rows: pd.DataFrame, settings: MeltQCSettings, exclude: bool, cache) -> pd.DataFrame:
+    """Flag wells from the melt sheets; drops flagged wells when ``exclude``."""
+    results = list(parse_files_parallel(files, cache=cache, melt=True))
+    for result in results:
+        if result.error is not None:
+            st.warning(f"`{result.name}`: no melt-curve data ({result.error}).")
+    melt = concat_results(results)
+    if melt is None:
+        st.warning("No melt-curve data found; melt QC skipped.")
+        return rows
+
+    rows = attach_melt_qc(rows, melt_qc(melt, settings))
+    flagged = rows[~rows["melt_ok"]]
+    st.caption(
+        f"Melt QC: {len(flagged)} of {len(rows)} well(s) flagged"
+        + (" and excluded." if exclude and len(flagged) else ".")
+    )
+    if len(flagged):
+        with st.expander("🌡️ Flagged wells"):
+            st.dataframe(
+                flagged[["source_file", "well", "sample_id", "gene", "ct", "tm", "n_peaks", "melt_flag"]],
+                use_container_width=True,
+                hide_index=True
+            )
+    return rows[rows["melt_ok"]] if exclude else rows
+
+
+def _replicate_qc_settings() -> Optional[ReplicateQCSettings]:
+    """Replicate outlier controls; None when QC is off."""
+    if not st.checkbox("Replicate outlier QC", help="Flag technical replicates that disagree with their group."):
+        return None
+    col_deviation, col_sd, col_test, col_alpha = st.columns(4)
+    with col_deviation:
+        deviation = st.number_input("Max. distance from median (0 = off)", min_value=0.0, value=0.5, step=0.1)
+    with col_sd:
+        max_sd = st.number_input("Max. replicate SD (0 = off)", min_value=0.0, value=0.0, step=0.1)
+    with col_test:
+        test = st.selectbox(
+            "Outlier test", QC_TESTS,
+            format_func={"none": "None", "grubbs": "Grubbs", "dixon": "Dixon's Q (n ≤ 10)"}.get
+        )
+    with col_alpha:
+        alpha = st.selectbox("Test level", [0.05, 0.01, 0.1], disabled=test == "none")
+    return ReplicateQCSettings(max_deviation=deviation or None, max_sd=max_sd or None, test=test, alpha=alpha)
+
+
+def _well_keys(rows: pd.DataFrame) -> pd.Series:
+    """Stable id per well (source file, well or sample + replicate number, gene) for remembering exclusions."""
+    if "well" in rows.columns:
+        position = rows["well"].astype(str)
+    else:
+        replicate = rows.groupby(REPLICATE_KEYS, observed=True).cumcount().astype(str)
+        position = rows["original_sample_id"].astype(str) + "#" + replicate
+    return rows["source_file"].astype(str) + "|" + position + "|" + rows["gene"].astype(str)
+
+
+def _outlier_editor(rows: pd.DataFrame, collapsed: pd.DataFrame) -> pd.DataFrame:
+    """Review flagged wells; toggling one re-collapses only its replicate group.
+
+    Manual decisions live in ``session_state["replicate_overrides"]`` keyed by
+    well, so they survive new QC settings and the "Show all wells" toggle.
+    """
+    flagged = rows["outlier"]
+    keys = _well_keys(rows)
+    overrides: dict = st.session_state.setdefault("replicate_overrides", {})
+    excluded = keys.map(overrides).fillna(flagged).astype(bool)
+
+    st.caption(
+        f"Replicate QC: {int(flagged.sum())} of {len(rows)} well(s) flagged as outliers; "
+        f"{int(excluded.sum())} excluded."
+    )
+    in_flagged_group = rows.groupby(REPLICATE_KEYS, observed=True)["outlier"].transform("any")
+    show_all = st.checkbox("Show all wells", help="Edit exclusions in groups without flagged wells too.")
+    shown = rows if show_all else rows[in_flagged_group | (excluded != flagged)]
+    if not shown.empty:
+        table = pd.DataFrame({
+            "Exclude": excluded[shown.index],
+            "Sample ID": shown["sample_id"].astype(str),
+            "Gene": shown["gene"].astype(str),
+            "Ct": shown["ct"],
+            **({"Well": shown["well"]} if "well" in shown.columns else {}),
+            "Source File": shown["source_file"].astype(str),
+            "Reason": shown["outlier_reason"],
+        })
+        # Editor edits are positional, so a different set of wells needs a fresh editor.
+        signature = hashlib.sha1("\n".join(keys[shown.index]).encode()).hexdigest()[:12]
+        with st.expander("🧪 Replicate outliers", expanded=True):
+            edited = st.data_editor(
+                table,
+                column_config={"Ct": st.column_config.NumberColumn(format="%.2f")},
+                disabled=[c for c in table.columns if c != "Exclude"],
+                use_container_width=True,
+                hide_index=True,
+                key=f"replicate_outliers_{signature}"
+            )
+        changed = edited.index[edited["Exclude"].to_numpy() != table["Exclude"].to_numpy()]
+        for i in changed:
+            value = bool(edited.at[i, "Exclude"])
+            if value == bool(flagged[i]):
+                overrides.pop(keys[i], None)
+            else:
+                overrides[keys[i]] = value
+            excluded[i] = value
+
+    manual = excluded != flagged
+    if not manual.any():
+        return collapsed
+    touched = rows.loc[manual, REPLICATE_KEYS].drop_duplicates()
+    return recollapse_groups(collapsed, rows[~excluded], touched)
 
 
 def run():
@@ -22,21 +237,63 @@ def run():
         st.info("Use the **Import Excel** button to upload files.")
         return
 
-    all_rows = []
+    ct_settings = _ct_call_settings()
+    melt_settings, exclude_flagged = _melt_qc_settings()
+    qc_settings = _replicate_qc_settings()
+    cache = get_default_cache()
+    results = []
+    parse_options = {"curves": ct_settings is not None, "include_well": melt_settings is not None}
 
-    for file in uploaded_files:
-        try:
-            df = parse_excel_ct_file(file)
-            all_rows.append(df)
-            st.success(f"✅ {file.name}: {len(df)} rows parsed.")
-        except Exception as e:
-            st.error(f"❌ `{file.name}`: {e}")
+    with st.status(f"Parsing {len(uploaded_files)} file(s)...", expanded=True) as status:
+        for result in parse_files_parallel(uploaded_files, cache=cache, **parse_options):
+            results.append(result)
+            if result.error is None:
+                st.success(f"✅ {result.name}: {len(result.df)} rows parsed.")
+            else:
+                st.error(f"❌ `{result.name}`: {result.error}")
+        failed = sum(r.error is not None for r in results)
+        status.update(
+            label=f"Parsed {len(results) - failed} of {len(results)} file(s).",
+            state="error" if failed else "complete"
+        )
 
-    if not all_rows:
+    combined = concat_results(results)
+    if combined is None:
         return
 
-    combined = pd.concat(all_rows, ignore_index=True)
-    df_long = collapse_replicates(combined)
+    if ct_settings is not None:
+        combined, threshold = call_ct_frame(combined, ct_settings, include_well=melt_settings is not None)
+        st.caption(f"Ct called for {len(combined)} well(s) at threshold {threshold:.4g}.")
+        if combined.empty:
+            st.error("No well crossed the threshold.")
+            return
+
+    parsed_files = [uploaded_files[r.index] for r in sorted(results, key=lambda r: r.index) if r.error is None]
+    if melt_settings is not None:
+        combined = _apply_melt_qc(parsed_files, combined, melt_settings, exclude_flagged, cache)
+
+    if qc_settings is not None:
+        combined = flag_replicate_outliers(combined, qc_settings)
+
+    collapse_key = cache.key_for(
+        "collapse",
+        repr(ct_settings),
+        repr((melt_settings, exclude_flagged)),
+        repr(qc_settings),
+        *(f.name for f in parsed_files),
+        *(read_file_bytes(f) for f in parsed_files)
+    )
+    if qc_settings is None:
+        df_long = cache.get_or_compute(collapse_key, lambda: collapse_replicates(combined))
+    else:
+        df_long = cache.get_or_compute(collapse_key, lambda: collapse_replicates(combined[~combined["outlier"]]))
+        df_long = _outlier_editor(combined, df_long)
+    memory = memory_report(df_long)
+    st.caption(
+        f"Parse cache: {cache.hits} hit(s), {cache.misses} miss(es). "
+        f"Ct table: {format_bytes(memory['bytes'])} in memory, "
+        f"{format_bytes(memory['saved_bytes'])} saved by categorical labels."
+    )
 
     # --- Step 2: Visual Summary Overview ---
     sample_names = sorted(df_long["Sample ID"].unique())
@@ -66,32 +323,31 @@ def run():
         st.dataframe(pd.DataFrame({"Gene": gene_names}), use_container_width=True, hide_index=True)
 
     with st.expander("Renaming"):
-        unique_samples = sorted(df_long["Sample ID"].unique())
-        unique_genes = sorted(df_long["Gene"].unique())
-
+        st.caption(
+            "Edit the **To** column to rename individual labels, or add rules that rename many at once. "
+            "Explicit renames win over rules; rules apply top to bottom. "
+            "Rows that end up with the same sample and gene are merged."
+        )
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("**Rename Samples**")
-            for sid in unique_samples:
-                new_val = st.text_input(f"Sample: `{sid}`", value=sid, key=f"rename_sample_{sid}")
-                if new_val != sid:
-                    df_long["Sample ID"] = df_long["Sample ID"].replace(sid, new_val)
-
+            sample_renames = _mapping_editor(df_long["Sample ID"], key="rename_samples")
         with col2:
             st.markdown("**Rename Genes**")
-            for g in unique_genes:
-                new_val = st.text_input(f"Gene: `{g}`", value=g, key=f"rename_gene_{g}")
-                if new_val != g:
-                    df_long["Gene"] = df_long["Gene"].replace(g, new_val)
+            gene_renames = _mapping_editor(df_long["Gene"], key="rename_genes")
+
+        st.markdown("**Rules**")
+        rules = _rules_editor(key="rename_rules")
+        for err in check_rules(rules):
+            st.error(f"{err} The rule is skipped.")
 
+        df_long = rename_labels(
+            df_long,
+            {"Sample ID": sample_renames, "Gene": gene_renames},
+            valid_rules(rules)
+        )
         # Collapse again if renaming caused duplicates
-        df_long = df_long.groupby(["Sample ID", "Gene"], as_index=False).agg({
-            "Ct": "mean",
-            "Replicates": lambda x: sum(x, []),
-            "n": "sum",
-            "Original Sample ID": "first",
-            "Source File": "first"
-        })
+        df_long = recollapse_replicates(df_long)
 
     # --- Step 3: Preview Table ---
     st.markdown("### Table Preview")
@@ -112,7 +368,7 @@ def run():
 
     # --- Step 5: Finalize + Load ---
     if st.button("Load into Session", type="primary", use_container_width=True):
-        df_export = df_long[["Sample ID", "Gene", "Ct"]].copy()
+        df_export = compact_frame(df_long[["Sample ID", "Gene", "Ct"]].copy(), ["Sample ID", "Gene"])
         st.session_state["ct_data_df"] = df_export
 
         # Inject grouping variable: "Samples"
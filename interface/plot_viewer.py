@@ -1,10 +1,11 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 
-import plotly.graph_objects as go
-from interface.plotting.plot_ddct import build_ddct_plot
-from interface.plotting.utils import render_plot_data_tables
+from ddct_pipeline.statistics import anova_oneway, welch_tests
+from ddct_pipeline.types import BootstrapSettings
+from interface.plotting.plot_ddct import build_ddct_plot, filter_ntc, FacetPage, FACETS_PER_PAGE, WEBGL_POINT_THRESHOLD
+from interface.plotting.figure_cache import FigureCache
+from interface.plotting.utils import render_plot_data_tables, render_statistics_tables
 
 from interface.backend.session_schema import ExperimentConfig
 
@@ -22,7 +23,7 @@ def render_filter(df, label: str, group_name: str):
     return []
 
 def _normalize_key(key: str) -> str:
-    return {"Gene": "gene", "Samples": "Samples"}.get(key, key)
+    return {"Gene": "gene", "Samples": "Samples", "Contrast": "contrast"}.get(key, key)
 
 
 def _get_config_options(df: pd.DataFrame, config: dict):
@@ -32,6 +33,10 @@ def _get_config_options(df: pd.DataFrame, config: dict):
     if "Samples" not in group_vars and "Samples" in df.columns:
         group_vars.append("Samples")
 
+    # Multi-contrast results (long format) can be split by baseline
+    if "contrast" in df.columns:
+        group_vars.append("Contrast")
+
     genes = sorted(df["gene"].unique())
     return genes, group_vars
 
@@ -72,11 +77,41 @@ def _plot_controls(genes: list[str], group_vars: list[str]):
         if k != "None" and v:
             filters[k_norm] = v
 
+    # Values from different baselines can't share an axis unless contrast is a plot role.
+    if "contrast" in df.columns and "Contrast" not in (x_axis, color_by, facet_by):
+        contrast = st.selectbox(
+            "Contrast", list(pd.unique(df["contrast"])),
+            help="Baseline the ΔΔCt values are relative to. Use Contrast as X-axis, Color or Facet to compare them."
+        )
+        filters["contrast"] = [contrast]
+
     # --- Plot options ---
     scale = st.radio("Y-axis Metric", ["ΔΔCt", "Fold Change (2^-ΔΔCt)"], horizontal=True)
     plot_type = st.radio("Plot Type", ["Bar", "Box"], horizontal=True)
     hide_ntc = st.checkbox("Hide NTC samples", value=True)
 
+    webgl_threshold, max_points, bootstrap = WEBGL_POINT_THRESHOLD, None, None
+    if plot_type == "Bar":
+        error_bars = st.radio("Error bars", ["SEM", "Bootstrap CI"], horizontal=True)
+        if error_bars == "Bootstrap CI":
+            with st.expander("Bootstrap settings"):
+                c1, c2, c3 = st.columns(3)
+                resamples = c1.number_input("Resamples", min_value=100, max_value=100_000, value=10_000, step=1000)
+                confidence = c2.select_slider("Confidence", [0.8, 0.9, 0.95, 0.99], value=0.95)
+                seed = c3.number_input("Seed", min_value=0, value=0, step=1)
+            bootstrap = BootstrapSettings(resamples=int(resamples), confidence=confidence, seed=int(seed))
+    if plot_type == "Box":
+        with st.expander("Point rendering"):
+            webgl_threshold = st.number_input(
+                "Use WebGL above this many points", min_value=0, value=WEBGL_POINT_THRESHOLD, step=1000
+            )
+            if st.checkbox("Draw a subsample of points (boxes still use all data)"):
+                max_points = st.number_input("Max points drawn", min_value=100, value=2000, step=500)
+
+    facets_per_page = FACETS_PER_PAGE
+    if facet_by != "None":
+        facets_per_page = st.select_slider("Facets per page", [4, 8, 12, 16, 24, 32, 48], value=FACETS_PER_PAGE)
+
     return {
         "selected_genes": selected_genes,
         "group_by": [_normalize_key(x_axis)],
@@ -85,6 +120,11 @@ def _plot_controls(genes: list[str], group_vars: list[str]):
         "scale": scale,
         "hide_ntc": hide_ntc,
         "plot_type": plot_type,
+        "webgl_threshold": int(webgl_threshold),
+        "max_points": int(max_points) if max_points else None,
+        "facets_per_page": facets_per_page,
+        "bootstrap": bootstrap,
+        "facet_page": st.session_state.get("facet_page", 1) - 1,
         "filters": filters
     }
 
@@ -100,6 +140,72 @@ def _has_plot_conflict(opts: dict) -> bool:
         seen.add(val)
     return False
 
+def _facet_pager(result: FacetPage):
+    if result.n_pages <= 1:
+        return
+    # The page may have been clamped, e.g. after a filter removed facets.
+    if st.session_state.get("facet_page", 1) != result.page + 1:
+        st.session_state["facet_page"] = result.page + 1
+
+    first = result.page * result.per_page + 1
+    col_page, col_info = st.columns([1, 3])
+    with col_page:
+        st.number_input("Facet page", min_value=1, max_value=result.n_pages, key="facet_page")
+    with col_info:
+        st.caption(f"Facets {first}–{first + len(result.facets) - 1} of {result.n_facets} (page {result.page + 1} of {result.n_pages})")
+
+
+def _cache_options(opts: dict) -> dict:
+    """Plot options that change the figure; gene and filter selections are unordered."""
+    return {
+        **{k: v for k, v in opts.items() if k not in {"selected_genes", "filters"}},
+        "selected_genes": set(opts["selected_genes"]),
+        "filters": {k: set(v) for k, v in opts["filters"].items()},
+    }
+
+
+def _apply_filters(df: pd.DataFrame, opts: dict) -> pd.DataFrame:
+    for col, allowed_vals in opts["filters"].items():
+        if col in df.columns:
+            df = df[df[col].isin(allowed_vals)]
+    return df
+
+
+def _statistics(df: pd.DataFrame, opts: dict, config: dict, level_orders: dict, figure_cache: FigureCache):
+    """Welch t-tests / ANOVA between the plotted groups, per gene and panel."""
+    roles = [*opts["group_by"], opts["color_by"], opts["facet_col"]]
+    group = next((r for r in roles if r and r != "gene" and r in df.columns), None)
+    if group is None:
+        st.caption("Pick a grouping variable (not Gene) as X-axis or Color to compare groups.")
+        return
+
+    by = list(dict.fromkeys(k for k in ["contrast", "gene", *roles] if k and k != group))
+    col_mode, col_adjust = st.columns(2)
+    with col_mode:
+        mode = st.radio("Compare", ["Against reference", "All pairs"], horizontal=True, key="stats_mode")
+    with col_adjust:
+        adjust = st.selectbox("Multiple-testing correction", ["BH", "Holm", "None"], key="stats_adjust")
+
+    levels = level_orders.get(group) or None
+    reference = None
+    if mode == "Against reference":
+        if group == config.get("reference_grouping"):
+            reference = config.get("reference_condition")
+        reference = reference or next(iter(levels or sorted(df[group].dropna().unique())), None)
+
+    def compute():
+        data = _apply_filters(df, opts)
+        data = data[data["gene"].isin(opts["selected_genes"])]
+        if opts["hide_ntc"]:
+            data = filter_ntc(data)
+        kwargs = {"group": group, "by": by, "levels": levels, "adjust": adjust.lower()}
+        return welch_tests(data, reference=reference, **kwargs), anova_oneway(data, **kwargs)
+
+    options = {**_cache_options(opts), "statistics": (group, tuple(by), reference, adjust), "levels": levels}
+    pairs, anova = figure_cache.get_or_build(df, options, compute)
+    render_statistics_tables(pairs, anova, group)
+
+
 def run():
     st.title("Gene Expression Analysis")
 
@@ -114,82 +220,43 @@ def run():
     genes, group_vars = _get_config_options(df, config)
     opts = _plot_controls(genes, group_vars)
 
-    for col, allowed_vals in opts["filters"].items():
-        if col in df.columns:
-            df = df[df[col].isin(allowed_vals)]
-
     if _has_plot_conflict(opts):
         st.warning("⚠️ You are using the same variable (e.g. 'Age') for multiple roles. Please adjust your selections.")
         return
 
-    plot_result = build_ddct_plot(
-        df=df,
-        genes=opts["selected_genes"],
-        group_by=opts["group_by"],
-        y_scale=opts["scale"],
-        kind=opts["plot_type"].lower(),
-        facet_col=opts["facet_col"],
-        facet_row=None,
-        color_by=opts["color_by"],
-        hide_ntc=opts["hide_ntc"]
-    )
-
-    if isinstance(plot_result, list):
-        all_y = np.concatenate([
-            d["plot_value"].values if "plot_value" in d.columns else d["mean"].values
-            for _, d, _ in plot_result
-        ])
-        y_min, y_max = float(np.nanmin(all_y)), float(np.nanmax(all_y))
-        num_plots = len(plot_result)
-
-        base_fig = plot_result[0][0]
-        legend_traces = [
-            go.Bar(
-                x=[None], y=[None],
-                name=trace.name,
-                marker=dict(color=trace.marker.color),
-                showlegend=True
-            )
-            for trace in base_fig.data
-            if trace.name and hasattr(trace, "marker") and getattr(trace.marker, "color", None)
-        ]
-
-        if legend_traces:
-            cols = st.columns([4] * num_plots + [1])
-        else:
-            cols = st.columns(num_plots)
-
-        for idx, (fig, _, _) in enumerate(plot_result):
-            fig.update_layout(
-                yaxis=dict(
-                    range=[y_min, y_max],
-                    showticklabels=(idx == 0),
-                    title_text="Fold Change" if idx == 0 else None
-                ),
-                showlegend=False
-            )
-            fig.update_xaxes(tickangle=0)
-            with cols[idx]:
-                st.plotly_chart(fig, use_container_width=True)
-
-        if legend_traces:
-            legend_fig = go.Figure(data=legend_traces)
-            legend_fig.update_layout(
-                showlegend=True,
-                legend=dict(orientation="v", yanchor="top", y=1.0, xanchor="left", x=0.0),
-                height=300,
-                margin=dict(l=0, r=0, t=10, b=10),
-                xaxis_visible=False,
-                yaxis_visible=False
-            )
-            with cols[-1]:
-                st.plotly_chart(legend_fig, use_container_width=True)
-
-        plot_df = next(
-            (d for _, d, _ in plot_result if "_x_label" in d.columns and "plot_value" in d.columns),
-            None
+    def build():
+        return build_ddct_plot(
+            df=_apply_filters(df, opts),
+            genes=opts["selected_genes"],
+            group_by=opts["group_by"],
+            y_scale=opts["scale"],
+            kind=opts["plot_type"].lower(),
+            facet_col=opts["facet_col"],
+            facet_row=None,
+            color_by=opts["color_by"],
+            hide_ntc=opts["hide_ntc"],
+            webgl_threshold=opts["webgl_threshold"],
+            max_points=opts["max_points"],
+            facet_page=opts["facet_page"],
+            facets_per_page=opts["facets_per_page"],
+            category_orders=level_orders,
+            bootstrap=opts["bootstrap"]
         )
 
+    # Axis and colour levels follow the order the values were defined in.
+    level_orders = {"gene": config.get("genes", []), **config.get("groups", {})}
+    if "contrast" in df.columns:
+        level_orders["contrast"] = list(pd.unique(df["contrast"]))
+
+    figure_cache = st.session_state.setdefault("figure_cache", FigureCache())
+    plot_result = figure_cache.get_or_build(df, {**_cache_options(opts), "level_orders": level_orders}, build)
+
+    if isinstance(plot_result, FacetPage):
+        st.plotly_chart(plot_result.figure, use_container_width=True)
+        _facet_pager(plot_result)
+        plot_df = plot_result.data
+        plot_result = [(None, d, label) for label, d in plot_result.facets]
+
     else:
         fig, summary, plot_df = plot_result
         st.plotly_chart(fig, use_container_width=True)
@@ -199,5 +266,8 @@ def run():
     else:
         st.warning("Could not display raw data — plotting frame missing or invalid.")
 
+    with st.expander("Statistics (ΔΔCt)"):
+        _statistics(df, opts, config, level_orders, figure_cache)
+
 
 run()
\ No newline at end of file
@@ -0,0 +1,72 @@
+# interface/plotting/figure_cache.py
+
+import hashlib
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import pandas as pd
+
+from ddct_pipeline.fingerprint import frame_fingerprint
+
+DEFAULT_MAX_ENTRIES = 16
+
+
+def _normalize(value: Any) -> Any:
+    """Hashable form of a plot option value; dicts and sets ignore order, lists keep it."""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _normalize(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((_normalize(v) for v in value), key=repr))
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    return value
+
+
+class FigureCache:
+    """Bounded LRU of ``build_ddct_plot`` results for one session.
+
+    Keys combine a fingerprint of the results frame with the normalized plot
+    options, so flipping between configurations reuses figures and summaries.
+    Cached figures are shared between reruns; callers may only apply
+    idempotent layout updates to them.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._frame_ref: Optional[weakref.ref] = None
+        self._frame_fp: Optional[str] = None
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def fingerprint(self, df: pd.DataFrame) -> str:
+        # Session frames are replaced, never edited in place, so the hash is
+        # reused for as long as the same object is passed back in.
+        if self._frame_ref is None or self._frame_ref() is not df:
+            self._frame_ref = weakref.ref(df)
+            self._frame_fp = frame_fingerprint(df)
+        return self._frame_fp
+
+    def key_for(self, df: pd.DataFrame, options: dict) -> str:
+        h = hashlib.sha1(self.fingerprint(df).encode())
+        h.update(repr(_normalize(options)).encode())
+        return h.hexdigest()
+
+    def get_or_build(self, df: pd.DataFrame, options: dict, build: Callable[[], Any]) -> Any:
+        key = self.key_for(df, options)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return self._entries[key]
+
+        self.stats["misses"] += 1
+        result = build()
+        self._entries[key] = result
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        return result
+
+    def clear(self):
+        self._entries.clear()
+        self._frame_ref = self._frame_fp = None
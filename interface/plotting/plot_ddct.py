@@ -5,7 +5,23 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.graph_objects import Figure
-from typing import Optional, Tuple, Literal, Union, List
+import math
+from dataclasses import dataclass
+from plotly.subplots import make_subplots
+from typing import Optional, Tuple, Literal, Union
+
+from ddct_pipeline.bootstrap import bootstrap_ci
+from ddct_pipeline.instrumentation import stage
+from ddct_pipeline.types import BootstrapSettings
+
+# Box plots with more points than this draw them as WebGL traces instead of
+# one SVG marker per sample.
+WEBGL_POINT_THRESHOLD = 5000
+
+FACETS_PER_PAGE = 12
+FACET_COLUMNS = 4
+
+PALETTE = px.colors.qualitative.Plotly
 
 
 def build_ddct_plot(
@@ -17,28 +33,52 @@ def build_ddct_plot(
     facet_col: Optional[str] = None,
     facet_row: Optional[str] = None,
     color_by: Optional[str] = None,
-    hide_ntc: bool = False
-) -> Union[Tuple[Figure, pd.DataFrame, pd.DataFrame], List[Tuple[Figure, pd.DataFrame, str]]]:
-
-    df = _filter_genes(df, genes)
-    if hide_ntc:
-        df = _filter_ntc(df)
-
-    df["plot_value"], ylabel = _get_plot_values(df, y_scale)
-    df["_x_label"] = _build_x_label(df, group_by)
-
-    group_keys = [color_by, facet_col, facet_row]
-    group_keys = [k for k in group_keys if k]
-
-    summary = _summarize_groups(df, group_keys)
-    summary = summary[(summary["mean"].notna()) & (summary["count"] > 0)]
-
-    if kind == "bar" and (facet_row or facet_col):
-        return _split_barplots(summary, df, genes, y_scale, ylabel, color_by, facet_col, facet_row)
-    if kind == "box" and (facet_row or facet_col):
-        return _split_boxplots(df, genes, y_scale, ylabel, color_by, facet_col, facet_row)
-
-    return _single_plot(df, summary, kind, genes, y_scale, ylabel, color_by, facet_col, facet_row)
+    hide_ntc: bool = False,
+    webgl_threshold: Optional[int] = WEBGL_POINT_THRESHOLD,
+    max_points: Optional[int] = None,
+    facet_page: int = 0,
+    facets_per_page: int = FACETS_PER_PAGE,
+    facet_cols: int = FACET_COLUMNS,
+    category_orders: Optional[dict[str, list]] = None,
+    bootstrap: Optional[BootstrapSettings] = None
+) -> Union[Tuple[Figure, pd.DataFrame, pd.DataFrame], "FacetPage"]:
+    """Bar or box plot of ΔΔCt results.
+
+    Bar error bars are ± SEM of the plotted values, or with ``bootstrap`` a
+    percentile CI of the mean ΔΔCt mapped onto the y scale (bars then show
+    the back-transformed mean ΔΔCt).
+    """
+
+    with stage("build_ddct_plot", df):
+        with stage("build_ddct_plot.prepare", df) as timing:
+            df = _filter_genes(df, genes)
+            if hide_ntc:
+                df = filter_ntc(df)
+
+            df["plot_value"], ylabel = _get_plot_values(df, y_scale)
+            df["_x_label"] = _build_x_label(df, group_by, category_orders)
+            timing.out(df)
+
+        group_keys = [color_by, facet_col, facet_row]
+        group_keys = [k for k in group_keys if k]
+
+        with stage("build_ddct_plot.summarize", df) as timing:
+            summary = _summarize_groups(df, group_keys)
+            if bootstrap is not None and kind == "bar":
+                summary = _bootstrap_errors(df, summary, group_keys, y_scale, bootstrap)
+            else:
+                summary["err_plus"] = summary["err_minus"] = summary["sem"]
+            summary = timing.out(summary[(summary["mean"].notna()) & (summary["count"] > 0)])
+
+        with stage("build_ddct_plot.figure", df):
+            if facet_row or facet_col:
+                facet_keys = [k for k in [facet_row, facet_col] if k]
+                return _facet_grid(df, summary, kind, ylabel, color_by, facet_keys,
+                                   facet_page, facets_per_page, facet_cols, webgl_threshold, max_points,
+                                   category_orders)
+
+            return _single_plot(df, summary, kind, genes, y_scale, ylabel, color_by, facet_col, facet_row,
+                                webgl_threshold, max_points, category_orders)
 
 
 # --- Plot paths ---
@@ -52,21 +92,29 @@ def _single_plot(
     ylabel: str,
     color_by: Optional[str],
     facet_col: Optional[str],
-    facet_row: Optional[str]
+    facet_row: Optional[str],
+    webgl_threshold: Optional[int] = None,
+    max_points: Optional[int] = None,
+    level_orders: Optional[dict[str, list]] = None
 ) -> Tuple[Figure, pd.DataFrame, pd.DataFrame]:
 
-    category_orders = {"_x_label": sorted(summary["_x_label"].unique())}
+    category_orders = {"_x_label": _x_order(summary["_x_label"])}
+    if color_by in summary.columns:
+        category_orders[color_by] = _color_levels(df, color_by, level_orders)
 
-    if kind == "bar":
+    if kind == "box" and not (facet_col or facet_row) and _use_webgl(df, webgl_threshold):
+        fig = _webgl_box(df, ylabel, color_by, category_orders["_x_label"], max_points, level_orders)
+    elif kind == "bar":
         fig = px.bar(
             summary,
             x="_x_label",
             y="mean",
-            error_y="sem",
+            error_y="err_plus",
+            error_y_minus="err_minus",
             color=color_by if color_by in summary.columns else None,
             facet_col=facet_col,
             facet_row=facet_row,
-            labels={"_x_label": "", "mean": ylabel, "sem": "SEM"},
+            labels={"_x_label": "", "mean": ylabel, "err_plus": "Error +", "err_minus": "Error −"},
             category_orders=category_orders
         )
         fig.update_layout(barmode="group")
@@ -88,74 +136,287 @@ def _single_plot(
     return fig, summary, df
 
 
-def _split_barplots(
-    summary: pd.DataFrame,
-    raw_df: pd.DataFrame,
-    genes: list[str],
-    y_scale: str,
-    ylabel: str,
-    color_by: Optional[str],
-    facet_col: Optional[str],
-    facet_row: Optional[str]
-) -> List[Tuple[Figure, pd.DataFrame, str]]:
-    facet_keys = [k for k in [facet_row, facet_col] if k]
-    figures = []
-
-    for facet_vals, subset in summary.groupby(facet_keys):
-        facet_vals = (facet_vals,) if isinstance(facet_vals, str) else facet_vals
-        label = ", ".join(f"{k}={v}" for k, v in zip(facet_keys, facet_vals))
-
-        # Match raw data subset
-        raw_subset = raw_df.copy()
-        for k, v in zip(facet_keys, facet_vals):
-            raw_subset = raw_subset[raw_subset[k] == v]
+# --- Facet grid ---
+# All facets of a page share one subplot grid and one set of axes. The data is
+# grouped once; only the facets on the requested page get traces, so a facet
+# variable with hundreds of levels costs no more to draw than a single page.
 
-        fig = px.bar(
-            subset,
-            x="_x_label",
-            y="mean",
-            error_y="sem",
-            color=color_by if color_by in subset.columns else None,
-            labels={"_x_label": "", "mean": ylabel, "sem": "SEM"},
-            category_orders={"_x_label": sorted(subset["_x_label"].unique())}
-        )
-        fig.update_layout(barmode="group", height=400)
-        fig.update_xaxes(tickangle=0, automargin=True)
-        figures.append((fig, raw_subset, label))
-
-    return figures
+@dataclass
+class FacetPage:
+    figure: Figure
+    facets: list[tuple[str, pd.DataFrame]]  # (label, rows) for each facet on this page
+    data: pd.DataFrame                      # rows of every facet on this page
+    page: int
+    per_page: int
+    n_pages: int
+    n_facets: int
 
 
-def _split_boxplots(
+def _facet_grid(
     df: pd.DataFrame,
-    genes: list[str],
-    y_scale: str,
+    summary: pd.DataFrame,
+    kind: str,
     ylabel: str,
     color_by: Optional[str],
-    facet_col: Optional[str],
-    facet_row: Optional[str]
-) -> List[Tuple[Figure, pd.DataFrame, str]]:
-    facet_keys = [k for k in [facet_row, facet_col] if k]
-    figures = []
+    facet_keys: list[str],
+    page: int,
+    per_page: int,
+    n_cols: int,
+    webgl_threshold: Optional[int],
+    max_points: Optional[int],
+    level_orders: Optional[dict[str, list]] = None
+) -> FacetPage:
+    facet_rows = df.groupby(facet_keys, sort=True, observed=True).indices
+    keys = list(facet_rows)
+    per_page = max(1, per_page)
+    n_pages = max(1, math.ceil(len(keys) / per_page))
+    page = min(max(page, 0), n_pages - 1)
+    visible = keys[page * per_page:(page + 1) * per_page]
+
+    facets = [(_facet_label(facet_keys, key), df.iloc[facet_rows[key]]) for key in visible]
+    data = df.iloc[np.concatenate([facet_rows[key] for key in visible])] if visible else df.iloc[:0]
+
+    color = color_by if color_by in df.columns else None
+    colors = _color_levels(df, color, level_orders)
+    x_order = _x_order(df["_x_label"])
+    webgl = kind == "box" and _use_webgl(data, webgl_threshold)
+    summary_rows = summary.groupby(facet_keys, sort=False, observed=True).indices if kind == "bar" else {}
+
+    n_cols = max(1, min(n_cols, len(facets)))
+    n_rows = max(1, math.ceil(len(facets) / n_cols))
+    fig = make_subplots(
+        rows=n_rows,
+        cols=n_cols,
+        shared_xaxes="all",
+        shared_yaxes="all",
+        subplot_titles=[label for label, _ in facets],
+        horizontal_spacing=0.03,
+        vertical_spacing=min(0.12, 0.3 / n_rows)
+    )
+
+    n_points = int(data["plot_value"].notna().sum())
+    shown = 0
+    for n, ((_, rows), key) in enumerate(zip(facets, visible)):
+        if kind == "bar":
+            traces = _bar_traces(summary.iloc[summary_rows.get(key, [])], color, colors)
+        elif webgl:
+            share = max(1, round(max_points * len(rows) / len(data))) if max_points else None
+            traces, drawn = _webgl_box_traces(rows, color, colors, x_order, share)
+            shown += drawn
+        else:
+            traces = _box_traces(rows, color, colors)
+        for trace in traces:
+            fig.add_trace(trace, row=n // n_cols + 1, col=n % n_cols + 1)
+
+    # One legend entry per colour level, not one per facet.
+    seen = set()
+    for trace in fig.data:
+        if trace.showlegend:
+            trace.showlegend = trace.legendgroup not in seen
+            seen.add(trace.legendgroup)
+
+    if webgl:
+        fig.update_xaxes(**_position_axis(x_order))
+        if max_points and shown < n_points:
+            _annotate_subsample(fig, shown, n_points)
+    else:
+        fig.update_xaxes(categoryorder="array", categoryarray=x_order)
+    fig.update_xaxes(tickangle=0, automargin=True)
+    fig.update_yaxes(title_text=ylabel, col=1)
+    fig.update_layout(
+        barmode="group",
+        boxmode="group",
+        height=max(400, 280 * n_rows),
+        margin=dict(t=40, b=40)
+    )
+    return FacetPage(fig, facets, data, page, per_page, n_pages, len(keys))
+
+
+def _facet_label(facet_keys: list[str], key) -> str:
+    values = key if isinstance(key, tuple) else (key,)
+    return ", ".join(f"{k}={v}" for k, v in zip(facet_keys, values))
+
+
+def _color_levels(df: pd.DataFrame, color_by: Optional[str], level_orders: Optional[dict[str, list]] = None) -> list:
+    """Colour levels in a fixed order so every facet and page maps them alike."""
+    if not color_by:
+        return [None]
+    return _level_order(pd.unique(df[color_by].dropna()), (level_orders or {}).get(color_by))
+
+
+def _bar_traces(summary: pd.DataFrame, color_by: Optional[str], colors: list) -> list:
+    traces = []
+    for i, color in enumerate(colors):
+        rows = summary if color is None else summary[summary[color_by] == color]
+        if rows.empty:
+            continue
+        name = None if color is None else str(color)
+        traces.append(go.Bar(
+            x=rows["_x_label"],
+            y=rows["mean"],
+            error_y=dict(type="data", symmetric=False, array=rows["err_plus"], arrayminus=rows["err_minus"]),
+            name=name,
+            marker=dict(color=PALETTE[i % len(PALETTE)]),
+            offsetgroup=name,
+            legendgroup=name,
+            showlegend=color is not None
+        ))
+    return traces
+
+
+def _box_traces(df: pd.DataFrame, color_by: Optional[str], colors: list) -> list:
+    traces = []
+    for i, color in enumerate(colors):
+        rows = df if color is None else df[df[color_by] == color]
+        if rows.empty:
+            continue
+        name = None if color is None else str(color)
+        traces.append(go.Box(
+            x=rows["_x_label"],
+            y=rows["plot_value"],
+            boxpoints="all",
+            name=name,
+            marker=dict(color=PALETTE[i % len(PALETTE)]),
+            offsetgroup=name,
+            legendgroup=name,
+            showlegend=color is not None
+        ))
+    return traces
+
+
+# --- Large box plots ---
+# Boxes are drawn from quartiles computed here over every sample, so only the
+# (optionally subsampled) points travel to the browser, as one WebGL trace per
+# colour group.
+
+def _use_webgl(df: pd.DataFrame, threshold: Optional[int]) -> bool:
+    return threshold is not None and int(df["plot_value"].notna().sum()) > threshold
+
+
+def _box_stats(df: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    """Quartiles and Tukey fences (furthest points within 1.5 IQR) per group."""
+    grouped = df.groupby(keys, observed=True, sort=False)["plot_value"]
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ["q1", "median", "q3"]
+    iqr = stats["q3"] - stats["q1"]
+    stats["lo"] = stats["q1"] - 1.5 * iqr
+    stats["hi"] = stats["q3"] + 1.5 * iqr
+
+    bounds = df[keys].join(stats[["lo", "hi"]], on=keys)
+    inside = df["plot_value"].between(bounds["lo"], bounds["hi"])
+    fenced = df[inside].groupby(keys, observed=True, sort=False)["plot_value"]
+    stats["lowerfence"] = fenced.min()
+    stats["upperfence"] = fenced.max()
+    return stats.reset_index()
+
+
+def _point_hash(df: pd.DataFrame) -> np.ndarray:
+    """Stable per-row hash in [0, 1) so subsamples and jitter survive reruns."""
+    cols = [c for c in ["sample_id", "gene"] if c in df.columns] or ["plot_value"]
+    h = pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+    return (h >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def _subsample_points(df: pd.DataFrame, keys: list[str], stats: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """Stratified subsample: each group keeps its share of ``max_points``, outliers first."""
+    if len(df) <= max_points:
+        return df
+    bounds = df[keys].join(stats.set_index(keys)[["lowerfence", "upperfence"]], on=keys)
+    outlier = ~df["plot_value"].between(bounds["lowerfence"], bounds["upperfence"])
+    size = df.groupby(keys, observed=True, sort=False)["plot_value"].transform("size")
+    quota = np.maximum(1, np.round(max_points * size / len(df)))
+
+    ranked = df.assign(_inlier=~outlier, _quota=quota).sort_values(["_inlier", "_hash"], kind="stable")
+    rank = ranked.groupby(keys, observed=True, sort=False).cumcount()
+    return ranked[rank < ranked["_quota"]].drop(columns=["_inlier", "_quota"]).sort_index()
+
+
+def _webgl_box_traces(
+    df: pd.DataFrame,
+    color_by: Optional[str],
+    colors: list,
+    x_order: list[str],
+    max_points: Optional[int]
+) -> Tuple[list, int]:
+    """Box + Scattergl traces on a numeric x axis; also returns how many points are drawn."""
+    df = df[df["plot_value"].notna()]
+    keys = ["_x_label"] + ([color_by] if color_by else [])
+    stats = _box_stats(df, keys)
+    position = {x: i for i, x in enumerate(x_order)}
+    width = 0.8 / len(colors)
+
+    points = df.assign(_hash=_point_hash(df))
+    if max_points:
+        points = _subsample_points(points, keys, stats, max_points)
+
+    traces = []
+    for i, color in enumerate(colors):
+        group = stats if color is None else stats[stats[color_by] == color]
+        if group.empty:
+            continue
+        pts = points if color is None else points[points[color_by] == color]
+        offset = -0.4 + width * (i + 0.5)
+        marker = PALETTE[i % len(PALETTE)]
+        name = None if color is None else str(color)
+
+        traces.append(go.Box(
+            x=_x_positions(group["_x_label"], position) + offset,
+            q1=group["q1"], median=group["median"], q3=group["q3"],
+            lowerfence=group["lowerfence"], upperfence=group["upperfence"],
+            width=width * 0.9,
+            name=name,
+            marker=dict(color=marker),
+            legendgroup=name,
+            showlegend=color is not None,
+            boxpoints=False
+        ))
+        jitter = (pts["_hash"].to_numpy() - 0.5) * width * 0.7
+        traces.append(go.Scattergl(
+            x=_x_positions(pts["_x_label"], position) + offset + jitter,
+            y=pts["plot_value"],
+            mode="markers",
+            marker=dict(color=marker, size=4, opacity=0.6),
+            text=pts["sample_id"] if "sample_id" in pts.columns else None,
+            hovertemplate="%{text}<br>%{y:.3g}<extra></extra>",
+            legendgroup=name,
+            showlegend=False
+        ))
+    return traces, len(points)
+
+
+def _webgl_box(
+    df: pd.DataFrame,
+    ylabel: str,
+    color_by: Optional[str],
+    x_order: list[str],
+    max_points: Optional[int],
+    level_orders: Optional[dict[str, list]] = None
+) -> Figure:
+    colors = _color_levels(df, color_by, level_orders)
+    traces, shown = _webgl_box_traces(df, color_by, colors, x_order, max_points)
+    fig = go.Figure(traces)
+    fig.update_xaxes(**_position_axis(x_order), title_text="")
+    fig.update_yaxes(title_text=ylabel)
+    n_points = int(df["plot_value"].notna().sum())
+    if shown < n_points:
+        _annotate_subsample(fig, shown, n_points)
+    return fig
 
-    for facet_vals, subset in df.groupby(facet_keys):
-        facet_vals = (facet_vals,) if isinstance(facet_vals, str) else facet_vals
-        label = ", ".join(f"{k}={v}" for k, v in zip(facet_keys, facet_vals))
 
-        fig = px.box(
-            subset,
-            x="_x_label",
-            y="plot_value",
-            points="all",
-            color=color_by if color_by in subset.columns else None,
-            labels={"_x_label": "", "plot_value": ylabel},
-            category_orders={"_x_label": sorted(subset["_x_label"].unique())}
-        )
-        fig.update_layout(height=400)
-        fig.update_xaxes(tickangle=0, automargin=True)
-        figures.append((fig, subset, label))
+def _x_positions(labels: pd.Series, position: dict[str, int]) -> np.ndarray:
+    return labels.astype(object).map(position).to_numpy(dtype=float)
+
+
+def _position_axis(x_order: list[str]) -> dict:
+    return dict(tickvals=list(range(len(x_order))), ticktext=x_order, range=[-0.5, len(x_order) - 0.5])
 
-    return figures
+
+def _annotate_subsample(fig: Figure, shown: int, total: int):
+    fig.add_annotation(
+        text=f"showing {shown:,} of {total:,} points",
+        xref="paper", yref="paper", x=1, y=1.02, xanchor="right", yanchor="bottom",
+        showarrow=False, font=dict(size=11, color="gray")
+    )
 
 
 # --- Helpers ---
@@ -164,7 +425,7 @@ def _filter_genes(df: pd.DataFrame, genes: list[str]) -> pd.DataFrame:
     return df[df["gene"].isin(genes)].copy()
 
 
-def _filter_ntc(df: pd.DataFrame) -> pd.DataFrame:
+def filter_ntc(df: pd.DataFrame) -> pd.DataFrame:
     if "sample_id" not in df.columns and "Sample ID" in df.columns:
         df = df.rename(columns={"Sample ID": "sample_id"})
     return df[~df["sample_id"].str.contains(r"\bntc\b", case=False, na=False)]
@@ -188,9 +449,88 @@ def _get_plot_values(df: pd.DataFrame, y_scale: str) -> Tuple[pd.Series, str]:
     return df["Fold Change"], "Fold Change (2^-ΔΔCt)"
 
 
-def _build_x_label(df: pd.DataFrame, group_by: list[str]) -> pd.Series:
+def _from_ddct(y_scale: str):
+    """Map ΔΔCt onto the plotted scale (monotonic, so CI bounds map to bounds)."""
+    scale = y_scale.casefold()
+    if scale in {"ddct", "δδct", "ΔΔct".casefold()}:
+        return lambda v: v
+    if scale in {"log2foldchange", "log₂(fold change)"}:
+        return lambda v: -v
+    return lambda v: 2.0 ** (-v)
+
+
+def _bootstrap_errors(
+    df: pd.DataFrame,
+    summary: pd.DataFrame,
+    group_keys: list[str],
+    y_scale: str,
+    settings: BootstrapSettings
+) -> pd.DataFrame:
+    """Replace SEM bars with bootstrap CIs of the mean ΔΔCt, resampling samples within groups."""
+    group_cols = ["_x_label"] + [k for k in group_keys if k in df.columns]
+    # Same keys and sort as _summarize_groups, so group codes are summary rows;
+    # rows with a missing key (NaN code) get -1 and are left out, as in the SEM path.
+    ids = df.groupby(group_cols, observed=True, sort=True).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    ci = bootstrap_ci(df["ΔΔCt"].to_numpy(dtype=float), ids, len(summary), settings)
+
+    to_scale = _from_ddct(y_scale)
+    center = to_scale(ci["mean"].to_numpy())
+    bounds = np.sort([to_scale(ci["ci_low"].to_numpy()), to_scale(ci["ci_high"].to_numpy())], axis=0)
+
+    summary = summary.copy()
+    summary["mean"] = center
+    summary["ci_low"], summary["ci_high"] = bounds
+    summary["err_plus"] = bounds[1] - center
+    summary["err_minus"] = center - bounds[0]
+    return summary
+
+
+def _level_order(levels, preferred: Optional[list] = None) -> list:
+    """Distinct ``levels``: those in ``preferred`` first, in that order, then the rest sorted."""
+    present = set(levels)
+    head = [v for v in dict.fromkeys(preferred or []) if v in present]
+    return head + sorted(present.difference(head), key=str)
+
+
+def _build_x_label(df: pd.DataFrame, group_by: list[str], level_orders: Optional[dict[str, list]] = None) -> pd.Series:
+    """Categorical x labels ("a_b" for several variables) ordered by ``level_orders``.
+
+    Rows are combined through the integer codes of each grouping column;
+    only the handful of distinct combinations are turned into strings.
+    """
     group_by = ["gene" if g == "Gene" else g for g in group_by]
-    return df[group_by].astype(str).agg("_".join, axis=1) if len(group_by) > 1 else df[group_by[0]].astype(str)
+    level_orders = level_orders or {}
+
+    combined = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    levels = []
+    for col in group_by:
+        codes, uniques = pd.factorize(df[col])
+        order = _level_order(uniques, level_orders.get(col))
+        codes = np.where(codes >= 0, pd.Index(order).get_indexer(uniques)[codes], -1).astype(np.int64)
+        missing |= codes < 0
+        combined = combined * max(len(order), 1) + np.maximum(codes, 0)
+        levels.append(order)
+
+    # Mixed-radix codes sort like the per-column orders, so np.unique keeps them.
+    uniques, inverse = np.unique(combined[~missing], return_inverse=True)
+    labels = []
+    for code in uniques:
+        parts = []
+        for order in reversed(levels):
+            code, i = divmod(code, len(order))
+            parts.append(str(order[i]))
+        labels.append("_".join(reversed(parts)))
+
+    # Distinct combinations can still join to the same text ("a_b" + "c" vs "a" + "b_c").
+    relabel, categories = pd.factorize(pd.Index(labels, dtype=object))
+    codes = np.full(len(df), -1, dtype=np.int64)
+    codes[~missing] = relabel[inverse]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=df.index)
+
+
+def _x_order(labels: pd.Series) -> list[str]:
+    return list(labels.cat.remove_unused_categories().cat.categories)
 
 
 def _summarize_groups(df: pd.DataFrame, extra_group_cols: list[str]) -> pd.DataFrame:
@@ -205,7 +545,7 @@ def _summarize_groups(df: pd.DataFrame, extra_group_cols: list[str]) -> pd.DataF
             safe_df = safe_df.rename(columns={col: new_col})
             group_cols = [rename_map.get(c, c) for c in group_cols]
 
-    grouped = safe_df.groupby(group_cols)["plot_value"]
+    grouped = safe_df.groupby(group_cols, observed=True)["plot_value"]
     summary = grouped.agg(mean="mean", std="std", count="count").reset_index()
     summary["sem"] = summary["std"] / summary["count"] ** 0.5
 
@@ -64,3 +64,20 @@ def _render_facet_table(
 
     except Exception as e:
         st.error(f"Error rendering table for facet '{label}': {e}")
+
+
+def render_statistics_tables(pairs: pd.DataFrame, anova: pd.DataFrame, group: str):
+    """Welch t-test and ANOVA tables for the plotted data."""
+    number_format = {
+        "p": st.column_config.NumberColumn("p", format="%.3g"),
+        "p_adj": st.column_config.NumberColumn("p (adjusted)", format="%.3g"),
+    }
+    st.markdown(f"**Welch t-tests by `{group}`**")
+    if pairs.empty:
+        st.caption("*(no groups with at least two values to compare)*")
+    else:
+        st.dataframe(pairs, column_config=number_format, use_container_width=True, hide_index=True)
+
+    if not anova.empty and (anova["groups"] > 2).any():
+        st.markdown(f"**One-way ANOVA across `{group}`**")
+        st.dataframe(anova, column_config=number_format, use_container_width=True, hide_index=True)
@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
-from ddct_pipeline.converters import df_to_rows
-from ddct_pipeline.processor import process_ddct
-from ddct_pipeline.types import GroupingVariable
+from ddct_pipeline.incremental import IncrementalDDCT
+from ddct_pipeline.stability import stability_ranking, suggest_reference_genes
+from ddct_pipeline.types import Contrast, GroupingVariable
 from interface.components.excel_dialog import show_excel_import_dialog
+from interface.components.metadata_sheet import metadata_sheet_import
 
 # --- Dialogs ---
 @st.dialog("Add Grouping Variable")
@@ -98,11 +99,75 @@ def step_grouping_variables():
         st.session_state["experiment_config"]["reference_grouping"] = group_vars[0].name
 
 # --- Step 3: Reference Genes ---
+def _stability_groups(config: dict):
+    """Sample → condition of the reference grouping, for NormFinder's between-group term."""
+    grouping = config.get("reference_grouping")
+    if not grouping or grouping == "Samples":
+        return None
+    metadata = st.session_state.get("sample_metadata", {})
+    labels = pd.Series({sid: values.get(grouping) for sid, values in metadata.items()}, dtype=object)
+    labels = labels[labels.notna() & ~labels.isin(["", "N/A"])]
+    return labels if labels.nunique() >= 2 else None
+
+
 def step_reference_genes():
-    genes = st.session_state["experiment_config"].get("genes", [])
-    default_refs = st.session_state["experiment_config"].get("reference_genes", [])
-    selected = st.multiselect("Select reference gene(s)", options=genes, default=default_refs)
-    st.session_state["experiment_config"]["reference_genes"] = selected
+    config = st.session_state["experiment_config"]
+    genes = config.get("genes", [])
+    candidates = st.multiselect(
+        "Reference gene candidates (to rank)", options=genes, key="reference_candidates_select",
+        help="Housekeeping genes that could serve as references; targets are never ranked."
+    )
+    # Without two candidates the whole panel is ranked, as advice only.
+    advice_only = len(candidates) < 2 or len(genes) <= 2
+    ranked = genes if len(candidates) < 2 else candidates
+    ranking, variation, n_samples = stability_ranking(st.session_state["ct_data_df"], ranked, _stability_groups(config))
+    # Never the whole panel: at least one gene stays a target.
+    suggested = suggest_reference_genes(ranking, variation, max_genes=len(genes) - 1) if len(ranking) else []
+
+    # Pre-select the suggestion once per panel and candidate set; later choices are left alone.
+    panel = (tuple(genes), tuple(candidates))
+    if (suggested and not advice_only and not config.get("reference_genes")
+            and st.session_state.get("suggested_refs_for") != panel):
+        config["reference_genes"] = suggested
+        st.session_state["suggested_refs_for"] = panel
+
+    # The widget follows the config whenever something else (suggestion, session import) changed it.
+    refs = [g for g in config.get("reference_genes", []) if g in genes]
+    if "reference_genes_select" not in st.session_state or refs != st.session_state.get("reference_genes_written"):
+        st.session_state["reference_genes_select"] = refs
+    selected = st.multiselect("Select reference gene(s)", options=genes, key="reference_genes_select")
+    config["reference_genes"] = selected
+    st.session_state["reference_genes_written"] = selected
+
+    if not len(ranking):
+        return
+    if advice_only:
+        hint = (
+            "With two genes, pick the reference yourself." if len(genes) <= 2
+            else "Mark two or more reference candidates to rank only those and pre-select the best."
+        )
+        st.caption(f"Most stable (geNorm, advice only): {', '.join(suggested)}. {hint}")
+    else:
+        st.caption(f"Suggested (geNorm): {', '.join(suggested)}")
+        if selected != suggested and st.button("Use suggested", key="use_suggested_refs"):
+            config["reference_genes"] = suggested
+            st.rerun()
+    with st.expander("Stability ranking"):
+        st.dataframe(
+            ranking[["gene", "genorm_rank", "M", "normfinder_rank", "normfinder"]].rename(columns={
+                "gene": "Gene", "genorm_rank": "geNorm rank", "M": "geNorm M",
+                "normfinder_rank": "NormFinder rank", "normfinder": "NormFinder"
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption(
+            f"Lower is more stable; the geNorm rank comes from stepwise exclusion. "
+            f"Based on {n_samples} sample(s) measured for every gene; "
+            "NormFinder uses the reference grouping's conditions once they are assigned."
+        )
+        if len(variation):
+            st.caption("Pairwise variation: " + ", ".join(f"{k} = {v:.3f}" for k, v in variation.items()))
 
 # --- Step 4: Reference Condition ---
 def step_reference_condition():
@@ -117,6 +182,19 @@ def step_reference_condition():
     ref_cond = st.selectbox("Select reference condition", options=possible_values)
     st.session_state["experiment_config"]["reference_condition"] = ref_cond
 
+    # Extra baselines are computed in the same run (long table, one block per contrast).
+    config = st.session_state["experiment_config"]
+    primary = Contrast(grouping=ref_grouping, condition=ref_cond)
+    candidates = {
+        c.label: c
+        for name, values in config["groups"].items() if name != "Samples"
+        for c in (Contrast(grouping=name, condition=v) for v in values if v != "N/A")
+        if c.label != primary.label
+    }
+    previous = [c.label for c in config.get("contrasts", [])[1:] if c.label in candidates]
+    extra = st.multiselect("Additional baselines (optional)", options=list(candidates), default=previous)
+    config["contrasts"] = [primary] + [candidates[label] for label in extra] if extra else []
+
 # --- Step 5: Assign Metadata ---
 def step_assign_metadata():
     df = st.session_state.get("ct_data_df")
@@ -125,6 +203,9 @@ def step_assign_metadata():
     if df is None or df.empty or not grouping_vars:
         return
 
+    if metadata_sheet_import(df, grouping_vars, key="quick_meta_sheet"):
+        st.session_state.pop("quick_meta_editor", None)  # show the imported values
+
     sample_genes = df.groupby("Sample ID")["Gene"].unique().apply(list)
     rows = []
 
@@ -158,27 +239,20 @@ def step_assign_metadata():
     )
 
     if st.button("💾 Save Metadata", use_container_width=True):
-        sample_meta = {}
-        for _, row in edited.iterrows():
-            sid = row["Sample ID"]
-            sample_meta[sid] = {gv.name: row[gv.name] for gv in grouping_vars}
-        st.session_state["sample_metadata"] = sample_meta
+        names = [gv.name for gv in grouping_vars]
+        st.session_state["sample_metadata"] = edited.set_index("Sample ID")[names].to_dict("index")
         st.toast("Sample metadata saved!", icon="✅")
 
 
 # --- Step 6: Run Analysis ---
 def step_run_analysis():
     if st.button("Run Analysis", type="primary", use_container_width=True):
-        df_copy = st.session_state["ct_data_df"].copy()
-        df_copy = df_copy.rename(columns={"Sample ID": "sample_id", "Gene": "gene", "Ct": "ct"})
-        df_copy["ct"] = pd.to_numeric(df_copy["ct"], errors="coerce")
-
-        metadata = st.session_state.get("sample_metadata", {})
-        for gv in st.session_state["experiment_config"].get("grouping_variables", []):
-            df_copy[gv.name] = df_copy["sample_id"].map(lambda sid: metadata.get(sid, {}).get(gv.name, sid if gv.name == "Samples" else None))
-
-        rows = df_to_rows(df_copy)
-        result = process_ddct(rows, st.session_state["experiment_config"])
+        engine = st.session_state.setdefault("ddct_engine", IncrementalDDCT())
+        result = engine.run(
+            st.session_state["ct_data_df"],
+            st.session_state["experiment_config"],
+            st.session_state.get("sample_metadata", {})
+        )
         st.session_state["ddct_results_df"] = result
         st.success("∆∆Ct analysis complete.")
         st.page_link("interface/plot_viewer.py", label="→ Go to Plots", icon="📊", use_container_width=True)
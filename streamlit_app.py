@@ -1,6 +1,9 @@
 import streamlit as st
+from contextlib import ExitStack
 
+from ddct_pipeline.instrumentation import collect
 from interface.backend.session import initialize_session_state
+from interface.components.timings_panel import render_timings_panel
 
 st.set_page_config(page_title="ΔΔCt Calculator", layout="wide")
 
@@ -45,7 +48,17 @@ def main():
 
 
     page = st.navigation(custom_pages)
-    page.run()
+
+    recording = st.session_state.get("record_stage_timings", False)
+    track_memory = recording and st.session_state.get("track_stage_memory", False)
+    with ExitStack() as stack:
+        timings = stack.enter_context(collect(track_memory)) if recording else None
+        if st.session_state.get("float32_ct", False):
+            from ddct_pipeline.dtypes import float32_ct  # pulls in pandas; only when enabled
+            stack.enter_context(float32_ct())
+        page.run()
+    if timings is not None and timings.records:
+        st.session_state["stage_timings"] = timings.records
 
     st.divider()
 
@@ -62,6 +75,8 @@ def main():
         with col_del:
             session_restart_button()
 
+        render_timings_panel()
+
     st.divider()
     st.caption(f"[qpcr-analysis v {__VERSION__}{': ' + __COMMENT__ if __COMMENT__ else ''}](https://github.com/ericksamera/fla-analysis) | Developed by Erick Samera ([@ericksamera](https://github.com/ericksamera))")
 